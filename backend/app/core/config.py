@@ -20,6 +20,12 @@ class Settings(BaseSettings):
     pinecone_cloud: str = "aws"  # Cloud provider: aws, gcp, or azure
     pinecone_region: str = "us-east-1"  # Cloud region
 
+    # Vector Store Configuration
+    vector_backend: str = "pinecone"  # "pinecone" or "local" (in-process NumPy index)
+    local_index_dir: str = ""  # Local index directory (default: <state dir>/local_index)
+    state_dir: str = ""  # Generated index state: BM25 model, manifest, citation index, corpus version (default: data/)
+    local_index_dtype: str = "float16"  # Local dense storage: float16 or int8
+
     # Model Configuration (December 2025 latest)
     embedding_model: str = "models/text-embedding-004"  # Gemini text-embedding-004
     llm_model: str = "gemini-2.5-flash"  # Latest Gemini Flash model
@@ -29,11 +35,89 @@ class Settings(BaseSettings):
     # Retrieval Configuration
     top_k: int = 20  # Initial retrieval count (hybrid search)
     top_n: int = 5   # Final count after reranking
+    rerank_timeout: float = 2.0  # Max seconds to wait for Cohere before falling back to hybrid order
+    rerank_latency_budget: float = 3.0  # Seconds for retrieval + rerank per request; rerank gets what is left
+    rerank_skip_margin: float = 0.3  # Skip rerank when the top hybrid score leads the next by this fraction (0 disables)
     alpha: float = 0.5  # Hybrid search balance (0.0=BM25, 1.0=semantic, 0.5=balanced)
+    citation_max_hits: int = 5  # Exact citation-index matches per query (0 disables the index)
+    cross_ref_hops: int = 1  # Cross-reference hops followed from retrieved chunks (0 disables)
+    cross_ref_fan_out: int = 2  # References followed per chunk
+    cross_ref_max_chunks: int = 2  # Cross-referenced chunks added to the chat context
+    cross_ref_max_chars: int = 4000  # Context budget for cross-referenced chunks
+    context_max_tokens: int = 6000  # Prompt budget for retrieved context, ~4 chars per token (0 = unlimited)
+    context_dedup_threshold: float = 0.9  # Word-shingle similarity at which a chunk counts as a duplicate
+
+    # Cache Configuration
+    query_cache_size: int = 2048  # Cached query embeddings + BM25 vectors (0 disables)
+    query_cache_ttl: int = 3600  # Seconds before a cached query vector expires
+    retrieval_cache_size: int = 1024  # Cached retrieval results per (query, top_k, alpha)
+    retrieval_cache_ttl: int = 900
+    answer_cache_size: int = 512  # Cached answers per (query, context fingerprint)
+    answer_cache_ttl: int = 3600
+    rerank_cache_size: int = 8192  # Cached Cohere scores per (query, chunk)
+    rerank_cache_ttl: int = 3600
+    coalesce_requests: bool = True  # Identical concurrent chat requests share one retrieval + generation
+
+    # Session Configuration (server-side conversation state, per worker)
+    session_max: int = 10000  # Sessions kept in memory (least recently used evicted first)
+    session_ttl: int = 1800  # Seconds of inactivity before a session expires
+    session_max_turns: int = 3  # Recent turns repeated verbatim in the prompt; older ones are summarized
+    session_summary_max_chars: int = 1500  # Rolling summary budget
+    session_followup_chunks: int = 3  # New chunks retrieved for a follow-up on top of the reused context
 
     # Chunking Configuration
     chunk_size: int = 1000
     chunk_overlap: int = 200
+    chunking_strategy: str = "statute"  # "statute" (section/subsection boundaries) or "recursive"
+    sparse_tokenizer: str = "legal"  # BM25 tokenizer: "legal" (built-in, offline) or "nltk" (pinecone-text)
+
+    # Concurrency Configuration
+    executor_max_workers: int = 32  # Thread pool for blocking SDK calls
+    retrieval_concurrency: int = 16  # Max in-flight embedding + Pinecone queries
+    rerank_concurrency: int = 8  # Max in-flight Cohere rerank calls
+    generation_concurrency: int = 8  # Max in-flight Gemini generations
+    stream_queue_size: int = 32  # Buffered stream chunks before the producer blocks
+    search_batch_max_queries: int = 500  # Max queries per /api/search/batch request
+    search_batch_concurrency: int = 8  # Concurrent index queries per batch
+
+    # Observability Configuration
+    response_timings: bool = False  # Attach per-stage timings (seconds) to chat, search and ingest responses
+    admin_token: str = ""  # Sent as X-Admin-Token for admin-only debug features (empty disables them)
+    profile_interval: float = 0.005  # Seconds between stack samples of a profiled request
+    profile_dir: str = ""  # Saved request profiles (default: data/profiles)
+    profile_max_files: int = 100  # Oldest profiles are deleted beyond this many
+
+    # Provider Clients (pooled keep-alive connections, shared by queries and ingestion)
+    embeddings_max_in_flight: int = 16  # Max concurrent Gemini embedding calls per worker
+    pinecone_max_in_flight: int = 16  # Max concurrent Pinecone data-plane calls per worker
+    cohere_max_in_flight: int = 8  # Max concurrent Cohere rerank calls per worker
+    gemini_max_in_flight: int = 8  # Max concurrent Gemini generations per worker
+    provider_keepalive_seconds: float = 60.0  # Idle pooled connections are kept this long
+    provider_timeout: float = 60.0  # Per-request timeout for pooled HTTP clients
+
+    # Offline Provider Stand-ins (load testing; see app/services/fakes.py)
+    provider_backend: str = "live"  # "live" or "fake" (local stand-ins with simulated latency, no API keys)
+    fake_latency_jitter: float = 0.3  # Log-normal spread of simulated latencies (0 = always the mean)
+    fake_embedding_latency: float = 0.05  # Mean seconds per embedding request
+    fake_index_latency: float = 0.03  # Mean seconds per index query, fetch or upsert
+    fake_rerank_latency: float = 0.12  # Mean seconds per rerank request
+    fake_llm_first_token: float = 0.4  # Mean seconds to the first generated token
+    fake_llm_token_interval: float = 0.015  # Seconds between generated tokens
+    fake_llm_tokens: int = 150  # Tokens per generated answer
+    fake_seed: int = 0  # Seeds simulated results and latencies
+
+    # Ingestion Configuration
+    ingest_workers: int = 0  # Parallel parse/chunk processes (0 = CPU count, 1 = in-process)
+    ingest_batch_size: int = 32  # Chunks per embedding request / upsert
+    ingest_max_in_flight: int = 4  # Concurrent embed + upsert batches
+    ingest_max_retries: int = 5  # Attempts per provider call on rate limits / transient errors
+    ingest_retry_base_delay: float = 1.0  # Backoff base in seconds (doubles per retry)
+
+    # Startup Configuration
+    warmup_on_startup: bool = True  # Build clients and indexes before serving; /ready reports progress
+    warmup_queries: list[str] = []  # Queries replayed through search at startup to fill the caches
+    warmup_retry_delay: float = 2.0  # Seconds before rebuilding failed components, doubling per retry (0 = no retries)
+    warmup_retry_max_delay: float = 60.0  # Cap on the retry backoff; retries go on until every component is built
 
     # API Configuration
     cors_origins: list[str] = ["http://localhost:3000"]
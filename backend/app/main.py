@@ -1,14 +1,31 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
+import asyncio
+import hmac
 import json
 
 from app.core.config import get_settings
 
 settings = get_settings()
 
-app = FastAPI(title="Wisconsin Legal RAG API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: /health answers at once, /ready once warm
+    task = None
+    if settings.warmup_on_startup:
+        from app.services.warmup import warm_up
+        task = asyncio.create_task(warm_up(settings.warmup_queries))
+    yield
+    if task is not None and not task.done():
+        task.cancel()
+
+
+app = FastAPI(title="Wisconsin Legal RAG API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +45,9 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     query: str
     history: list[ChatMessage] = []
+    # From a previous response; history is only used to seed a new session,
+    # which is not kept (and its ID not returned) unless a session_id was sent
+    session_id: Optional[str] = None
 
 
 class SearchRequest(BaseModel):
@@ -35,6 +55,36 @@ class SearchRequest(BaseModel):
     top_k: int = 10
 
 
+class BatchSearchRequest(BaseModel):
+    queries: list[str]
+    top_k: int = 10
+
+
+def _require_admin(http_request: Request) -> None:
+    token = http_request.headers.get("x-admin-token", "")
+    if not settings.admin_token or not hmac.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def _profile_requested(http_request: Request) -> bool:
+    """Whether an admin asked for this request to be profiled (X-Profile: 1 or ?profile=1)."""
+    flag = http_request.headers.get("x-profile") or http_request.query_params.get("profile")
+    if not flag or flag.lower() in ("0", "false", "no"):
+        return False
+    _require_admin(http_request)
+    return True
+
+
+async def _run_profiled(operation: str, http_request: Request, call):
+    """Await ``call()``, under the sampling profiler if requested; the report is added as "profile"."""
+    if not _profile_requested(http_request):
+        return await call()
+    from app.services import profiling
+    with profiling.profile(operation) as profile:
+        result = await call()
+    return {**result, "profile": profile.report()}
+
+
 # Endpoints
 @app.get("/")
 async def root():
@@ -46,11 +96,22 @@ async def health():
     return {"status": "healthy", "model": settings.llm_model}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until every component is built and warm."""
+    from app.services.warmup import readiness
+    status = readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 @app.post("/api/chat")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     from app.services.rag import chat
     try:
-        return await chat(request.query, request.history)
+        return await _run_profiled("chat", http_request,
+                                   lambda: chat(request.query, request.history, request.session_id))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -61,7 +122,7 @@ async def chat_stream_endpoint(request: ChatRequest):
 
     async def generate():
         try:
-            async for chunk in chat_stream(request.query, request.history):
+            async for chunk in chat_stream(request.query, request.history, request.session_id):
                 yield f"data: {json.dumps(chunk)}\n\n"
         except Exception as e:
             yield f"data: {json.dumps({'type': 'error', 'data': str(e)})}\n\n"
@@ -69,15 +130,73 @@ async def chat_stream_endpoint(request: ChatRequest):
     return StreamingResponse(generate(), media_type="text/event-stream")
 
 
+@app.delete("/api/sessions/{session_id}")
+async def end_session_endpoint(session_id: str):
+    from app.services.rag import end_session
+    if not end_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "ended": True}
+
+
 @app.post("/api/search")
-async def search_endpoint(request: SearchRequest):
+async def search_endpoint(request: SearchRequest, http_request: Request):
     from app.services.rag import search
     try:
-        return await search(request.query, request.top_k)
+        return await _run_profiled("search", http_request, lambda: search(request.query, request.top_k))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/search/batch")
+async def search_batch_endpoint(request: BatchSearchRequest):
+    """NDJSON stream: one line per query, in completion order, each with its "index"."""
+    from app.services.rag import search_many
+    if len(request.queries) > settings.search_batch_max_queries:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {settings.search_batch_max_queries} queries per batch")
+
+    async def generate():
+        try:
+            async for result in search_many(request.queries, request.top_k):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@app.get("/api/cache/stats")
+async def cache_stats_endpoint():
+    from app.services.rag import get_cache_stats
+    return get_cache_stats()
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint: stage latency histograms, cache and in-flight metrics."""
+    from app.services.rag import get_metrics
+    return PlainTextResponse(get_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/admin/profiles/{name}")
+async def profile_endpoint(name: str, http_request: Request):
+    """Collapsed stacks of a saved request profile (for flamegraph.pl or speedscope)."""
+    from app.services.profiling import read_profile
+    _require_admin(http_request)
+    collapsed = read_profile(name)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(collapsed)
+
+
+@app.get("/api/providers/stats")
+async def provider_stats_endpoint():
+    from app.services.providers import provider_stats
+    return provider_stats()
+
+
 @app.get("/api/sources")
 async def sources_endpoint():
     from app.services.rag import get_sources
@@ -88,10 +207,10 @@ async def sources_endpoint():
 
 
 @app.post("/api/ingest")
-async def ingest_endpoint():
+async def ingest_endpoint(full: bool = False):
     from app.services.rag import ingest_documents
     try:
-        return await ingest_documents()
+        return await ingest_documents(full=full)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
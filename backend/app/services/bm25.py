@@ -0,0 +1,231 @@
+"""
+Binary BM25 model for hybrid search sparse vectors.
+
+Scores exactly like pinecone_text's BM25Encoder (mmh3-hashed tokens, Okapi
+BM25 document weights, normalized IDF query weights) given the same
+tokenizer. Models fit here use the built-in LegalTokenizer by default;
+models converted from pinecone_text keep its NLTK tokenizer. Document
+frequencies are stored as sorted uint32 hash / count arrays in .npy files.
+Loading memory-maps them instead of parsing a JSON dict whose size grows
+with the vocabulary, and query encoding looks up all terms with one
+searchsorted call.
+
+Convert an existing pinecone_text JSON model with:
+    python -m app.services.bm25 data/bm25_encoder.json data/bm25
+"""
+import json
+import os
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import mmh3
+import numpy as np
+
+SparseVector = Dict[str, list]
+
+PARAMS_FILE = "params.json"
+HASHES_FILE = "hashes.npy"
+DOC_FREQ_FILE = "doc_freq.npy"
+
+# Tokenizer settings stored with a model; "nltk" is pinecone_text's BM25Tokenizer
+LEGAL_TOKENIZER = {"tokenizer": "legal"}
+NLTK_TOKENIZER = {
+    "tokenizer": "nltk",
+    "lower_case": True,
+    "remove_punctuation": True,
+    "remove_stopwords": True,
+    "stem": True,
+    "language": "english",
+}
+TOKENIZERS = {"legal": LEGAL_TOKENIZER, "nltk": NLTK_TOKENIZER}
+
+
+def make_tokenizer(params: Dict) -> Callable[[str], List[str]]:
+    """Tokenizer for stored tokenizer settings (models without a name predate LegalTokenizer)."""
+    if params.get("tokenizer", "nltk") == "legal":
+        from app.services.tokenizer import LegalTokenizer
+        return LegalTokenizer()
+    from pinecone_text.sparse.bm25_tokenizer import BM25Tokenizer
+    return BM25Tokenizer(**{key: params[key] for key in NLTK_TOKENIZER if key != "tokenizer"})
+
+
+def _tokenizer_params(params: Dict) -> Dict:
+    return {key: params[key] for key in NLTK_TOKENIZER if key in params} or dict(NLTK_TOKENIZER)
+
+
+class BM25Model:
+    """
+    Okapi BM25 over mmh3 token hashes.
+
+    ``tokenizer`` maps text to tokens; by default one is built (lazily)
+    from ``tokenizer_params``, which are saved with the model so queries are
+    always tokenized the way the corpus was.
+    """
+
+    def __init__(
+        self,
+        b: float = 0.75,
+        k1: float = 1.2,
+        tokenizer_params: Optional[Dict] = None,
+        tokenizer: Optional[Callable[[str], List[str]]] = None
+    ):
+        self.b = b
+        self.k1 = k1
+        self.tokenizer_params = dict(tokenizer_params or LEGAL_TOKENIZER)
+        self._tokenizer = tokenizer
+        self.n_docs: Optional[int] = None
+        self.avgdl: Optional[float] = None
+        self.hashes = np.zeros(0, dtype=np.uint32)
+        self.doc_freq = np.zeros(0, dtype=np.uint32)
+        # params.json mtime of the files last loaded or saved
+        self.mtime_ns: Optional[int] = None
+
+    @property
+    def tokenizer(self) -> Callable[[str], List[str]]:
+        if self._tokenizer is None:
+            self._tokenizer = make_tokenizer(self.tokenizer_params)
+        return self._tokenizer
+
+    @property
+    def tokenizer_name(self) -> str:
+        return self.tokenizer_params.get("tokenizer", "nltk")
+
+    def _tf(self, text: str) -> Tuple[List[int], List[int]]:
+        """Token hashes (in first-occurrence order) and their counts."""
+        counts = Counter(mmh3.hash(token, signed=False) for token in self.tokenizer(text))
+        return list(counts.keys()), list(counts.values())
+
+    def _check_fit(self) -> None:
+        if self.n_docs is None or self.avgdl is None:
+            raise ValueError("BM25 must be fit before encoding")
+
+    def fit(self, corpus: Iterable[str]) -> "BM25Model":
+        """Count document frequencies over the corpus (empty documents are skipped)."""
+        n_docs = 0
+        sum_doc_len = 0
+        doc_freq: Counter = Counter()
+        for doc in corpus:
+            indices, tf = self._tf(doc)
+            if not indices:
+                continue
+            n_docs += 1
+            sum_doc_len += sum(tf)
+            doc_freq.update(indices)
+        if not n_docs:
+            raise ValueError("BM25 needs at least one non-empty document")
+
+        self.n_docs = n_docs
+        self.avgdl = sum_doc_len / n_docs
+        self._set_doc_freq(doc_freq.keys(), doc_freq.values())
+        return self
+
+    def _set_doc_freq(self, hashes: Iterable[int], counts: Iterable[float]) -> None:
+        hashes = np.fromiter(hashes, dtype=np.uint32)
+        counts = np.fromiter(counts, dtype=np.float64)
+        if len(counts) and (counts.min() < 0 or not np.array_equal(counts, np.floor(counts))):
+            raise ValueError("BM25 document frequencies must be non-negative integers")
+        order = np.argsort(hashes, kind="stable")
+        self.hashes = hashes[order]
+        self.doc_freq = counts[order].astype(np.uint32)
+
+    def encode_documents(self, texts: Union[str, List[str]]) -> Union[SparseVector, List[SparseVector]]:
+        """Sparse vectors for documents; one vectorized pass over the whole batch."""
+        self._check_fit()
+        if isinstance(texts, str):
+            return self.encode_documents([texts])[0]
+
+        tfs = [self._tf(text) for text in texts]
+        lengths = [len(indices) for indices, _ in tfs]
+        tf = np.fromiter(chain.from_iterable(counts for _, counts in tfs), dtype=np.int64, count=sum(lengths))
+        doc_sums = np.array([sum(counts) for _, counts in tfs], dtype=np.int64)
+        doc_len = np.repeat(doc_sums, lengths)
+        values = (tf / (self.k1 * (1.0 - self.b + self.b * (doc_len / self.avgdl)) + tf)).tolist()
+
+        vectors = []
+        start = 0
+        for (indices, _), length in zip(tfs, lengths):
+            vectors.append({"indices": indices, "values": values[start:start + length]})
+            start += length
+        return vectors
+
+    def encode_queries(self, texts: Union[str, List[str]]) -> Union[SparseVector, List[SparseVector]]:
+        """Sparse vectors for queries: IDF weights normalized to sum to one."""
+        self._check_fit()
+        if not isinstance(texts, str):
+            return [self.encode_queries(text) for text in texts]
+
+        indices, _ = self._tf(texts)
+        df = self.lookup(indices)
+        idf = np.log((self.n_docs + 1) / (df + 0.5))
+        return {"indices": indices, "values": (idf / idf.sum()).tolist()}
+
+    def lookup(self, indices: List[int]) -> np.ndarray:
+        """Document frequencies for token hashes (1 for hashes never seen)."""
+        query = np.array(indices, dtype=np.uint32)
+        if not len(self.hashes):
+            return np.ones(len(query), dtype=np.uint32)
+        pos = self.hashes.searchsorted(query)
+        found = self.hashes.take(pos, mode="clip") == query
+        return np.where(found, self.doc_freq.take(pos, mode="clip"), 1)
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self, path: Path) -> None:
+        """Write params.json plus the hash and count arrays, each replaced atomically."""
+        self._check_fit()
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name, array in ((HASHES_FILE, self.hashes), (DOC_FREQ_FILE, self.doc_freq)):
+            tmp = path / f"{name}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp, path / name)
+        params = {"avgdl": self.avgdl, "n_docs": self.n_docs, "b": self.b, "k1": self.k1,
+                  "vocab_size": int(len(self.hashes)), **self.tokenizer_params}
+        tmp = path / f"{PARAMS_FILE}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(params, f)
+        os.replace(tmp, path / PARAMS_FILE)
+        self.mtime_ns = os.stat(path / PARAMS_FILE).st_mtime_ns
+
+    @classmethod
+    def load(cls, path: Path, tokenizer: Optional[Callable[[str], List[str]]] = None) -> "BM25Model":
+        """Open a saved model; the arrays are memory-mapped, not read."""
+        path = Path(path)
+        with open(path / PARAMS_FILE, encoding="utf-8") as f:
+            params = json.load(f)
+            mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        model = cls(params["b"], params["k1"], _tokenizer_params(params), tokenizer)
+        model.n_docs = params["n_docs"]
+        model.avgdl = params["avgdl"]
+        model.mtime_ns = mtime_ns
+        model.hashes = np.load(path / HASHES_FILE, mmap_mode="r")
+        model.doc_freq = np.load(path / DOC_FREQ_FILE, mmap_mode="r")
+        return model
+
+    @classmethod
+    def from_json(cls, path: Path, tokenizer: Optional[Callable[[str], List[str]]] = None) -> "BM25Model":
+        """Convert a pinecone_text BM25Encoder.dump() file."""
+        with open(path, encoding="utf-8") as f:
+            params = json.load(f)
+        model = cls(params["b"], params["k1"], _tokenizer_params(params), tokenizer)
+        model.n_docs = params["n_docs"]
+        model.avgdl = params["avgdl"]
+        model._set_doc_freq(params["doc_freq"]["indices"], params["doc_freq"]["values"])
+        return model
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (Path(path) / PARAMS_FILE).exists()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m app.services.bm25 <bm25_encoder.json> <output dir>")
+    converted = BM25Model.from_json(Path(sys.argv[1]))
+    converted.save(Path(sys.argv[2]))
+    print(f"Wrote {len(converted.hashes)} terms to {sys.argv[2]}")
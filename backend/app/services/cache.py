@@ -0,0 +1,139 @@
+"""
+In-process caches for the RAG pipeline.
+Thread-safe LRU eviction with per-entry TTL and hit/miss counters, plus a
+corpus version that cache keys include so ingestion invalidates them.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(query: str) -> str:
+    """Normalize query text for use as a cache key (Unicode, case, whitespace)."""
+    text = unicodedata.normalize("NFKC", query)
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+class TTLCache:
+    """LRU cache with a time-to-live per entry. A maxsize of 0 disables caching."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if self.ttl and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value (expired or missing entries return default)."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None or (self.ttl and entry[1] < time.monotonic()):
+            return default
+        return entry[0]
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def fingerprint(parts: Iterable[str]) -> str:
+    """Stable short hash of an ordered sequence of strings (e.g. chunk IDs)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class CorpusVersion:
+    """
+    Monotonic corpus version persisted to a small file.
+
+    Every change to the indexed documents bumps the version. Cache keys include
+    it, so entries computed against an older corpus are never served again. The
+    file is re-read when its mtime changes, so other workers pick up bumps too.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._value = 0
+
+    def current(self) -> int:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return self._value
+        if mtime != self._mtime:
+            with self._lock:
+                try:
+                    self._value = int(self.path.read_text().strip() or 0)
+                except (OSError, ValueError):
+                    pass
+                self._mtime = mtime
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                value = int(self.path.read_text().strip() or 0)
+            except (OSError, ValueError):
+                value = self._value
+            self._value = max(value, self._value) + 1
+            self.path.write_text(str(self._value))
+            self._mtime = os.stat(self.path).st_mtime_ns
+            return self._value
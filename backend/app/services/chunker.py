@@ -0,0 +1,309 @@
+"""
+Statute-structure-aware chunking.
+
+Walks a Wisconsin statute once, line by line, and cuts chunks on section and
+subsection boundaries instead of fixed character windows. Every chunk inherits
+chapter, section and subsection metadata from the structure it was cut from,
+so nothing has to be re-derived per chunk, and structural chunks need no
+overlap. Only a single subsection too long for one chunk falls back to
+character splitting, with a small overlap.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.services.legal_parser import (
+    PARAGRAPH_PATTERN,
+    SECTION_HEADER_PATTERN,
+    SUBPARAGRAPH_PATTERN,
+    SUBSECTION_PATTERN,
+)
+
+# Enhanced separators that respect legal structure
+LEGAL_SEPARATORS = [
+    "\n\n\n",  # Major section breaks
+    "\n\n",    # Paragraph breaks
+    "\n",      # Line breaks
+    ". ",      # Sentences
+    " ",       # Words
+    ""         # Characters
+]
+
+# Sections (or section tails) shorter than chunk_size // SMALL_SECTION_DIVISOR
+# are packed together: tables of contents, repealed or one-line sections
+SMALL_SECTION_DIVISOR = 2
+
+# Overlap used only when a single subsection has to be split by characters;
+# the inherited section metadata already ties those pieces together
+OVERSIZED_OVERLAP = 50
+
+_SECTION_HEADER_RE = re.compile(SECTION_HEADER_PATTERN)
+_SECTION_HEADER_SCAN_RE = re.compile(SECTION_HEADER_PATTERN, re.MULTILINE)
+_SUBSECTION_RE = re.compile(SUBSECTION_PATTERN)
+_PARAGRAPH_RE = re.compile(f"{PARAGRAPH_PATTERN}|{SUBPARAGRAPH_PATTERN}")
+_DIGITS = re.compile(r'\d+')
+
+
+@dataclass
+class _Block:
+    """Lines of one section from its header or a subsection marker up to the next one."""
+    metadata: Dict
+    subsection: Optional[str] = None
+    lines: List[str] = field(default_factory=list)
+
+    def text(self) -> str:
+        return "\n".join(self.lines).strip()
+
+
+@dataclass
+class _Section:
+    number: str
+    title: str
+    blocks: List[_Block]
+
+    def text(self) -> str:
+        return "\n\n".join(block.text() for block in self.blocks).strip()
+
+
+def _header(line: str) -> Optional[re.Match]:
+    """
+    Match a real section header line ("940.01 First-degree intentional homicide.").
+    Wrapped citation lines such as "940.01 (2) did not exist" or "806.04 as to
+    whether ..." also fit SECTION_HEADER_PATTERN; a title must start upper-case.
+    """
+    match = _SECTION_HEADER_RE.match(line)
+    if match and match.group(2)[:1].isupper():
+        return match
+    return None
+
+
+def has_statute_structure(docs: list) -> bool:
+    """True if any page contains a statute section header."""
+    return any(
+        match.group(2)[:1].isupper()
+        for doc in docs
+        for match in _SECTION_HEADER_SCAN_RE.finditer(doc.page_content)
+    )
+
+
+def _running_headers(docs: list) -> set:
+    """Page header lines (digits ignored) repeated at the top of most pages."""
+    counts = Counter()
+    for doc in docs:
+        top = doc.page_content.lstrip().split("\n", 2)[:2]
+        counts.update({_DIGITS.sub("#", line.strip()) for line in top if line.strip()})
+    threshold = max(3, len(docs) // 2)
+    return {line for line, count in counts.items() if count >= threshold}
+
+
+def _walk(docs: list) -> Iterator[Tuple[Optional[_Section], List[str], Dict]]:
+    """
+    Single pass over the pages of one statute.
+
+    Yields (section, [], {}) for each completed section and (None, lines,
+    page metadata) for text before the first section header on a page.
+    """
+    skip = _running_headers(docs)
+    section: Optional[_Section] = None
+    last_subsection = 0
+    title_open = False
+
+    for doc in docs:
+        preamble = []
+        for line in doc.page_content.split("\n"):
+            if skip and _DIGITS.sub("#", line.strip()) in skip:
+                continue
+            match = _header(line)
+            if match:
+                if section is not None:
+                    yield section, [], {}
+                elif preamble:
+                    yield None, preamble, doc.metadata
+                    preamble = []
+                # The pattern drops a trailing period, so look for it in the line itself
+                title, period, _ = line[match.start(2):].partition(".")
+                section = _Section(match.group(1), title.strip(), [_Block(doc.metadata, lines=[line])])
+                last_subsection = 0
+                title_open = not period
+                continue
+            if section is None:
+                preamble.append(line)
+                continue
+
+            block = section.blocks[-1]
+            if title_open and len(block.lines) < 3:
+                # Header titles can wrap onto the next line ("duty to re-" / "port.")
+                head, period, _ = line.partition(".")
+                joiner = "" if section.title.endswith("-") else " "
+                section.title = (section.title.rstrip("-") + joiner + head.strip()).strip()
+                title_open = not period
+            else:
+                title_open = False
+
+            sub = _SUBSECTION_RE.match(line)
+            # Subsection numbers only increase within a section; anything else is a wrapped citation
+            if sub and int(sub.group(1)) > last_subsection:
+                last_subsection = int(sub.group(1))
+                section.blocks.append(_Block(doc.metadata, sub.group(1), [line]))
+            else:
+                block.lines.append(line)
+        if preamble:
+            yield None, preamble, doc.metadata
+
+    if section is not None:
+        yield section, [], {}
+
+
+def _paragraph_pieces(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Split one subsection at its paragraph lines ("(a)", "(A)"); a paragraph
+    longer than chunk_size is split further by characters.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    groups: List[List[str]] = [[]]
+    for line in text.split("\n"):
+        if groups[-1] and _PARAGRAPH_RE.match(line):
+            groups.append([])
+        groups[-1].append(line)
+
+    splitter = None
+    pieces = []
+    for group in groups:
+        piece = "\n".join(group).strip()
+        if len(piece) <= chunk_size:
+            pieces.append(piece)
+            continue
+        if splitter is None:
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                length_function=len,
+                separators=LEGAL_SEPARATORS
+            )
+        pieces.extend(splitter.split_text(piece))
+    return [piece for piece in pieces if piece]
+
+
+def _structure_metadata(section: _Section, subsection: Optional[str], level: int) -> Dict:
+    chapter, _, section_part = section.number.partition(".")
+    metadata = {
+        "chapter": chapter,
+        "section": section_part,
+        "section_number": section.number,
+        "section_title": section.title,
+        "statute_num": section.number + (f"({subsection})" if subsection else ""),
+        "sections": [section.number],
+        "hierarchy_level": level,
+    }
+    if subsection:
+        metadata["subsection"] = subsection
+    return metadata
+
+
+def _fill(piece: str, room: int) -> Tuple[str, str]:
+    """Split a piece at the last line break that keeps its head within ``room`` characters."""
+    cut = piece.rfind("\n", 0, room + 1)
+    if cut <= 0:
+        return "", piece
+    return piece[:cut].rstrip(), piece[cut + 1:].lstrip()
+
+
+def _section_chunks(section: _Section, chunk_size: int, chunk_overlap: int) -> Iterator[Tuple[str, Dict]]:
+    """
+    Cut one section into chunks on subsection, then paragraph, boundaries.
+    A chunk less than half full is topped up with whole lines of the next piece
+    rather than cut early.
+    """
+    current: List[str] = []
+    current_len = 0
+    first: Optional[_Block] = None
+    level = 1
+
+    def emit():
+        return "\n".join(current), {**first.metadata, **_structure_metadata(section, first.subsection, level)}
+
+    for block in section.blocks:
+        text = block.text()
+        if not text:
+            continue
+        block_level = 1 if block.subsection is None else 2
+        pieces = [text] if len(text) <= chunk_size - current_len else _paragraph_pieces(text, chunk_size, chunk_overlap)
+        for index, piece in enumerate(pieces):
+            starts_block = index == 0
+            if current and current_len + len(piece) + 1 > chunk_size:
+                if current_len < chunk_size // 2:
+                    head, piece = _fill(piece, chunk_size - current_len - 1)
+                    if head:
+                        current.append(head)
+                        starts_block = False
+                yield emit()
+                current, current_len = [], 0
+            if not current:
+                first = block
+                # A chunk starting mid-subsection begins at a paragraph (or line) boundary
+                level = block_level if starts_block else 3
+            current.append(piece)
+            current_len += len(piece) + 1
+
+    if current:
+        yield emit()
+
+
+def iter_statute_chunks(docs: list, chunk_size: int, chunk_overlap: int) -> Iterator:
+    """
+    Yield LangChain Documents cut on statute structure, in document order.
+
+    Text before the first section header on a page (title pages) is split by
+    characters with ``chunk_overlap``. Small sections, and the short last chunk
+    of a long one, are packed with the sections that follow; such chunks list
+    every section they cover under "sections".
+    """
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=LEGAL_SEPARATORS
+    )
+    oversized_overlap = min(chunk_overlap, OVERSIZED_OVERLAP)
+    small_limit = chunk_size // SMALL_SECTION_DIVISOR
+    pending: List[Tuple[str, Dict]] = []
+    pending_len = 0
+
+    def flush_pending():
+        metadata = dict(pending[0][1])
+        metadata["sections"] = list(dict.fromkeys(number for _, meta in pending for number in meta["sections"]))
+        return Document(page_content="\n\n".join(text for text, _ in pending), metadata=metadata)
+
+    for section, lines, page_metadata in _walk(docs):
+        if section is None:
+            for text in splitter.split_text("\n".join(lines)):
+                yield Document(page_content=text, metadata=dict(page_metadata))
+            continue
+
+        text = section.text()
+        if not text:
+            continue
+        if len(text) <= small_limit:
+            chunks = [(text, {**section.blocks[0].metadata, **_structure_metadata(section, None, 1)})]
+        else:
+            chunks = list(_section_chunks(section, chunk_size, oversized_overlap))
+
+        for index, (chunk_text, metadata) in enumerate(chunks):
+            tail = index == len(chunks) - 1 and len(chunk_text) <= small_limit
+            if pending and (not tail or pending_len + len(chunk_text) + 2 > chunk_size):
+                yield flush_pending()
+                pending, pending_len = [], 0
+            if tail:
+                # Short section or section tail: hold it back and pack it with what follows
+                pending.append((chunk_text, metadata))
+                pending_len += len(chunk_text) + 2
+            else:
+                yield Document(page_content=chunk_text, metadata=metadata)
+
+    if pending:
+        yield flush_pending()
@@ -0,0 +1,214 @@
+"""
+Exact citation index: normalized statute numbers and Wisconsin case citations
+mapped to chunk IDs, built at ingest time.
+
+A query that is only a citation ("§ 346.63", "Wis. Stat. 940.01(2)(a)",
+"2020 WI 45") is answered from this index without an embedding call, a vector
+query or a rerank. For mixed queries the exact hits are merged ahead of the
+semantic results.
+"""
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.legal_parser import extract_case_citations, extract_statute_citations, normalize_statute_number
+
+# Bare statute numbers as typed by users ("346.63", "940.01(2)(a)", "940.01 (2)")
+_BARE_STATUTE = re.compile(r'(?<![\w.])(\d{1,3}\.\d{2,4})((?:\s?\(\w{1,4}\))*)(?!\w|\.\d)')
+# Case captions accompanying a case citation ("State v. Smith,", "In re Doe")
+_CASE_CAPTION = re.compile(r"\b(?:[A-Z][\w.'&-]*\s+)+v\.\s+(?:[A-Z][\w.'&-]*\s*)+,?|\bIn re\s+[A-Z][\w.'-]*")
+_STATUTE_NUMBER = re.compile(r'^\d+\.\d+')
+# Statute numbers inside a cross-reference target ("940.01(2), 940.02 to 940.05")
+_TARGET_NUMBER = re.compile(r'\d+\.\d+(?:\(\w+\))*')
+_SUBDIVISION = re.compile(r'\(\w+\)$')
+_WHITESPACE = re.compile(r'\s+')
+_WORD = re.compile(r'\w+')
+
+# Words that may accompany a citation without making it a question
+_CITATION_WORDS = {
+    "wis", "wisc", "wisconsin", "stat", "stats", "statute", "statutes", "section", "sec", "s", "ss",
+    "sub", "par", "chapter", "ch", "state", "v", "app", "see", "cite", "citation", "lookup", "show", "me",
+}
+
+
+def case_key(citation: str) -> str:
+    """Canonical case citation ("2021  WI App 123" -> "2021 WI App 123")."""
+    return _WHITESPACE.sub(" ", citation).strip()
+
+
+def statute_keys(number: str) -> List[str]:
+    """A statute number and its parents: "940.01(2)(a)" -> ["940.01(2)(a)", "940.01(2)", "940.01"]."""
+    keys = [number]
+    while _SUBDIVISION.search(keys[-1]):
+        keys.append(_SUBDIVISION.sub("", keys[-1]))
+    return keys
+
+
+def citation_keys(metadata: Dict) -> Tuple[List[str], List[str]]:
+    """
+    (defines, cites) index keys for one chunk.
+
+    A chunk *defines* the statute location it was cut from (structure-aware
+    chunks carry section_number / sections) and *cites* every statute and case
+    it references. Cross-reference targets ("under s. 939.44", "as defined in
+    s. 939.22") come first, so they are followed first in the cross-reference
+    graph.
+    """
+    defines: List[str] = []
+    if metadata.get("section_number"):
+        defines.extend(statute_keys(metadata.get("statute_num") or metadata["section_number"]))
+        defines.extend(metadata.get("sections") or [])
+
+    cites: List[str] = []
+    for ref in metadata.get("cross_references") or []:
+        for number in _TARGET_NUMBER.findall(ref.get("target", "")):
+            cites.extend(statute_keys(normalize_statute_number(number)))
+    for cite in metadata.get("statutes_cited") or []:
+        number = normalize_statute_number(cite)
+        if _STATUTE_NUMBER.match(number):
+            cites.extend(statute_keys(number))
+    cites.extend(case_key(cite) for cite in metadata.get("cases_cited") or [])
+    return list(dict.fromkeys(defines)), [key for key in dict.fromkeys(cites) if key not in defines]
+
+
+def parse_citation_query(query: str) -> Tuple[List[str], bool]:
+    """
+    Citation keys found in a query, and whether the query is *only* citations
+    (no other words left once citations and words like "Wis. Stat." are removed).
+    """
+    keys: List[str] = []
+    spans: List[Tuple[int, int]] = []
+
+    for cite in extract_statute_citations(query):
+        if cite.citation_type == "statute":
+            keys.append(normalize_statute_number(cite.full_cite))
+    for match in _BARE_STATUTE.finditer(query):
+        keys.append(match.group(1) + match.group(2).replace(" ", ""))
+        spans.append(match.span())
+    cases = extract_case_citations(query)
+    for case in cases:
+        keys.append(case_key(case["citation"]))
+        start = query.find(case["citation"])
+        spans.append((start, start + len(case["citation"])))
+    if cases:
+        spans.extend(match.span() for match in _CASE_CAPTION.finditer(query))
+
+    if not keys:
+        return [], False
+
+    residual = list(query)
+    for start, end in spans:
+        residual[start:end] = " " * (end - start)
+    words = [word.lower() for word in _WORD.findall("".join(residual))]
+    citation_only = all(word in _CITATION_WORDS for word in words)
+    return list(dict.fromkeys(keys)), citation_only
+
+
+class CitationIndex:
+    """
+    Persisted map of source file -> [(chunk_id, defines, cites)], with an
+    inverted key -> chunk IDs view built lazily for lookups.
+    """
+
+    def __init__(self, path: Path, files: Optional[Dict[str, List[Tuple[str, List[str], List[str]]]]] = None):
+        self.path = Path(path)
+        self.files = files or {}
+        self.mtime_ns: Optional[int] = None
+        self._lock = threading.Lock()
+        self._inverted: Optional[Tuple[Dict[str, List[str]], Dict[str, List[str]]]] = None
+
+    @classmethod
+    def load(cls, path: Path) -> "CitationIndex":
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(path, {rel: [tuple(entry) for entry in entries] for rel, entries in data.get("files", {}).items()})
+        index.mtime_ns = os.stat(path).st_mtime_ns
+        return index
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": {rel: [list(entry) for entry in entries]
+                                 for rel, entries in sorted(self.files.items())}}, f)
+        os.replace(tmp, self.path)
+        self.mtime_ns = os.stat(self.path).st_mtime_ns
+
+    def replace_file(self, rel: str, entries: Iterable[Tuple[str, List[str], List[str]]]) -> None:
+        """Set a file's chunks (in document order); repeated chunk IDs keep their first entry."""
+        unique: Dict[str, Tuple[str, List[str], List[str]]] = {}
+        for chunk_id, defines, cites in entries:
+            unique.setdefault(chunk_id, (chunk_id, list(defines), list(cites)))
+        with self._lock:
+            self.files[rel] = [entry for entry in unique.values() if entry[1] or entry[2]]
+            self._inverted = None
+
+    def remove_file(self, rel: str) -> None:
+        with self._lock:
+            self.files.pop(rel, None)
+            self._inverted = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self.files.clear()
+            self._inverted = None
+
+    def _build(self) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        defines: Dict[str, List[Tuple[int, str]]] = {}
+        cites: Dict[str, List[str]] = {}
+        for rel in sorted(self.files):
+            for chunk_id, chunk_defines, chunk_cites in self.files[rel]:
+                for key in chunk_defines:
+                    defines.setdefault(key, []).append((len(chunk_defines), chunk_id))
+                for key in chunk_cites:
+                    cites.setdefault(key, []).append(chunk_id)
+        # A chunk defining fewer locations is more specific: the section itself
+        # ranks before a packed table of contents that merely lists it
+        ordered = {key: [chunk_id for _, chunk_id in sorted(ids, key=lambda item: item[0])]
+                   for key, ids in defines.items()}
+        return ordered, cites
+
+    def _tables(self) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        inverted = self._inverted
+        if inverted is None:
+            with self._lock:
+                if self._inverted is None:
+                    self._inverted = self._build()
+                inverted = self._inverted
+        return inverted
+
+    def resolve(self, key: str) -> Optional[str]:
+        """The chunk that best defines a statute location, or its nearest parent."""
+        defines, _ = self._tables()
+        for candidate in statute_keys(key):
+            ids = defines.get(candidate)
+            if ids:
+                return ids[0]
+        return None
+
+    def lookup(self, keys: Iterable[str], limit: int) -> List[str]:
+        """
+        Chunk IDs for citation keys, best first: chunks that define the most
+        specific matching location, then its parents, then chunks citing them.
+        """
+        defines, cites = self._tables()
+
+        candidates = [statute_keys(key) for key in keys]
+        ids: Dict[str, None] = {}
+        for table in (defines, cites):
+            for chain in candidates:
+                for key in chain:
+                    for chunk_id in table.get(key, ()):
+                        ids.setdefault(chunk_id)
+                        if len(ids) >= limit:
+                            return list(ids)
+        return list(ids)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.files.values())
@@ -0,0 +1,168 @@
+"""
+Concurrency helpers for the RAG pipeline.
+Offloads blocking SDK calls to a bounded thread pool and caps in-flight
+work per pipeline stage so one slow provider cannot stall the event loop.
+"""
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services import profiling
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Pipeline stages with their own concurrency limit
+STAGES = ("retrieval", "rerank", "generation")
+
+_executor = None
+_executor_lock = threading.Lock()
+# stage -> (event loop, semaphore); semaphores are bound to the loop that created them
+_semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+# Sentinel marking the end of a bridged stream
+_DONE = object()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.executor_max_workers,
+                    thread_name_prefix="rag-io"
+                )
+    return _executor
+
+
+def stage_limit(stage: str) -> int:
+    """Configured max in-flight calls for a pipeline stage."""
+    limits = {
+        "retrieval": settings.retrieval_concurrency,
+        "rerank": settings.rerank_concurrency,
+        "generation": settings.generation_concurrency,
+    }
+    if stage not in limits:
+        raise ValueError(f"Unknown pipeline stage: {stage}")
+    return max(1, limits[stage])
+
+
+def _get_semaphore(stage: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    entry = _semaphores.get(stage)
+    if entry is None or entry[0] is not loop:
+        entry = (loop, asyncio.Semaphore(stage_limit(stage)))
+        _semaphores[stage] = entry
+    return entry[1]
+
+
+@asynccontextmanager
+async def stage_slot(stage: str):
+    """Hold one of the stage's concurrency slots (for native async calls)."""
+    async with _get_semaphore(stage):
+        yield
+
+
+async def run_blocking(stage: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call in the shared thread pool under the stage's limit."""
+    async with stage_slot(stage):
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the caller's context, so metrics spans report to its trace
+        call = partial(contextvars.copy_context().run, profiling.bind(fn), *args, **kwargs)
+        return await loop.run_in_executor(_get_executor(), call)
+
+
+async def iterate_in_thread(
+    stage: str,
+    make_iter: Callable[[], Iterable[Any]],
+    maxsize: Optional[int] = None
+) -> AsyncIterator[Any]:
+    """
+    Consume a blocking iterator from async code.
+
+    A producer thread pulls items from ``make_iter()`` and feeds them through a
+    bounded queue. When the consumer falls behind, the queue fills up and the
+    producer blocks, so slow clients apply backpressure to the upstream stream
+    instead of buffering it. Closing the async iterator stops the producer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize or settings.stream_queue_size)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        future = asyncio.run_coroutine_threadsafe(queue.put(entry), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except FutureTimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return False
+
+    def produce():
+        try:
+            for item in make_iter():
+                if stop.is_set() or not put((item, None)):
+                    return
+        except Exception as e:
+            if not stop.is_set():
+                put((_DONE, e))
+            return
+        if not stop.is_set():
+            put((_DONE, None))
+
+    async with stage_slot(stage):
+        loop.run_in_executor(_get_executor(), produce)
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is _DONE:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stop.set()
+
+
+# Exception class names treated as transient (rate limits, timeouts, 5xx)
+_RETRYABLE_NAMES = (
+    "ResourceExhausted", "TooManyRequests", "RateLimit", "ServiceUnavailable",
+    "InternalServerError", "DeadlineExceeded", "Timeout", "Connection",
+)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Heuristic for provider errors worth retrying (HTTP 429/5xx, timeouts, resets)."""
+    status = getattr(error, "status_code", None) or getattr(error, "status", None) or getattr(error, "code", None)
+    if isinstance(status, int) and (status == 429 or 500 <= status < 600):
+        return True
+    return any(name in cls.__name__ for cls in type(error).__mro__ for name in _RETRYABLE_NAMES)
+
+
+def call_with_retry(fn: Callable[..., Any], *args, attempts: int = 5, base_delay: float = 1.0,
+                    max_delay: float = 30.0, **kwargs) -> Any:
+    """Call fn, retrying transient errors with exponential backoff and full jitter."""
+    attempts = max(1, attempts)
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            logger.warning(f"{getattr(fn, '__qualname__', fn)} failed ({type(e).__name__}: {e}); "
+                           f"retry {attempt}/{attempts - 1} in {delay:.1f}s")
+            time.sleep(delay)
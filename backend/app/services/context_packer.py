@@ -0,0 +1,189 @@
+"""
+Token-budgeted context packing for the generation prompt.
+
+Retrieved chunks often repeat text: character-split chunks share an overlap
+with their neighbour, and the same statute can appear in two PDFs. The
+packer merges chunks from the same source whose text overlaps (or contains
+one another) into one passage, drops passages that are near-duplicates of a
+more relevant one (word-shingle Jaccard similarity), then adds passages in
+relevance order while they fit the token budget. Tokens are estimated at
+CHARS_PER_TOKEN characters each, which is close enough for budgeting Gemini
+prompts without a tokenizer round trip.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+CHARS_PER_TOKEN = 4
+SEPARATOR = "\n\n---\n\n"
+EMPTY_CONTEXT = "No relevant documents found."
+
+# Shortest shared text treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 40
+SHINGLE_WORDS = 3
+
+_WORD = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _shingles(text: str) -> FrozenSet[int]:
+    words = _WORD.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return frozenset([hash(tuple(words))])
+    return frozenset(hash(tuple(words[i:i + SHINGLE_WORDS])) for i in range(len(words) - SHINGLE_WORDS + 1))
+
+
+def _similarity(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    return len(a & b) / len(a | b)
+
+
+def _overlap(head: str, tail: str) -> int:
+    """Length of the longest suffix of ``head`` that is a prefix of ``tail`` (0 if under MIN_OVERLAP_CHARS)."""
+    if len(head) < MIN_OVERLAP_CHARS or len(tail) < MIN_OVERLAP_CHARS:
+        return 0
+    probe = tail[:MIN_OVERLAP_CHARS]
+    start = head.find(probe, max(0, len(head) - len(tail)))
+    while start != -1:
+        if tail.startswith(head[start:]):
+            return len(head) - start
+        start = head.find(probe, start + 1)
+    return 0
+
+
+def _merge(a: str, b: str) -> str:
+    """a and b as one passage if one contains the other or they overlap, else ""."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    k = _overlap(a, b)
+    if k:
+        return a + b[k:]
+    k = _overlap(b, a)
+    if k:
+        return b + a[k:]
+    return ""
+
+
+@dataclass
+class _Passage:
+    rank: int
+    source: str
+    text: str
+    members: Tuple[int, ...] = ()  # Positions in docs of the chunks it holds
+    shingles: FrozenSet[int] = field(default_factory=frozenset)
+
+    def render(self) -> str:
+        return f"[Source: {self.source}]\n{self.text}"
+
+
+@dataclass
+class PackedContext:
+    """
+    Prompt context plus what packing did to it. ``included`` holds the
+    positions in docs of the chunks whose text is in the context; duplicates,
+    omitted and empty count chunks left out.
+    """
+    text: str
+    tokens: int
+    tokens_unpacked: int
+    chunks: int
+    passages: int
+    merged: int = 0
+    duplicates: int = 0
+    omitted: int = 0
+    empty: int = 0
+    included: Tuple[int, ...] = ()
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_unpacked - self.tokens)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "tokens": self.tokens,
+            "tokens_saved": self.tokens_saved,
+            "chunks": self.chunks,
+            "passages": self.passages,
+            "merged": self.merged,
+            "duplicates": self.duplicates,
+            "omitted": self.omitted,
+            "empty": self.empty,
+        }
+
+
+def unpacked_context(docs: list) -> str:
+    """Every chunk verbatim, in order (the context before packing)."""
+    if not docs:
+        return EMPTY_CONTEXT
+    return SEPARATOR.join(f"[Source: {doc.metadata.get('source', 'Unknown Source')}]\n{doc.page_content}"
+                          for doc in docs)
+
+
+def pack_context(docs: list, max_tokens: int = 0, dedup_threshold: float = 0.9) -> PackedContext:
+    """
+    Merge, deduplicate and budget ``docs`` (most relevant first) into prompt
+    context. ``max_tokens`` of 0 means no budget. The most relevant passage is
+    truncated rather than dropped if it alone exceeds the budget.
+    """
+    tokens_unpacked = estimate_tokens(unpacked_context(docs))
+    passages: List[_Passage] = []
+    merged = duplicates = empty = 0
+
+    for rank, doc in enumerate(docs):
+        text = doc.page_content.strip()
+        if not text:
+            empty += 1
+            continue
+        passage = _Passage(rank, doc.metadata.get("source", "Unknown Source"), text, (rank,))
+
+        # Fold in same-source passages this one overlaps; a merge can connect more
+        while True:
+            for other in passages:
+                combined = _merge(other.text, passage.text) if other.source == passage.source else ""
+                if combined:
+                    passages.remove(other)
+                    passage = _Passage(min(other.rank, passage.rank), passage.source, combined,
+                                       other.members + passage.members)
+                    merged += 1
+                    break
+            else:
+                break
+
+        # Of two near-duplicates, the more relevant one is kept
+        passage.shingles = _shingles(passage.text)
+        twin = next((other for other in passages
+                     if _similarity(passage.shingles, other.shingles) >= dedup_threshold), None)
+        if twin is not None:
+            if twin.rank < passage.rank:
+                duplicates += len(passage.members)
+                continue
+            passages.remove(twin)
+            duplicates += len(twin.members)
+        passages.append(passage)
+
+    passages.sort(key=lambda p: p.rank)
+    parts: List[str] = []
+    included: List[int] = []
+    used = omitted = 0
+    separator_tokens = estimate_tokens(SEPARATOR)
+    for passage in passages:
+        rendered = passage.render()
+        cost = estimate_tokens(rendered) + (separator_tokens if parts else 0)
+        if not max_tokens or used + cost <= max_tokens:
+            parts.append(rendered)
+            used += cost
+        elif not parts:
+            parts.append(rendered[:max_tokens * CHARS_PER_TOKEN])
+            used = max_tokens
+        else:
+            omitted += len(passage.members)
+            continue
+        included.extend(passage.members)
+
+    text = SEPARATOR.join(parts) if parts else EMPTY_CONTEXT
+    return PackedContext(text, estimate_tokens(text), tokens_unpacked, len(docs), len(parts),
+                         merged, duplicates, omitted, empty, tuple(sorted(included)))
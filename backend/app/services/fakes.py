@@ -0,0 +1,236 @@
+"""
+Deterministic local stand-ins for the external providers.
+
+With PROVIDER_BACKEND=fake, the provider factories return these instead of
+the Gemini, Pinecone and Cohere clients. They implement the subset of each
+SDK's interface that the RAG service calls, need no network or API keys,
+and sleep for a simulated latency drawn from a log-normal distribution
+around the configured mean. Both the results and the latencies are seeded
+from the inputs and FAKE_SEED, so a replayed load test sees the same work.
+They are for load tests and capacity planning: the retrieval quality of
+hashed bag-of-words embeddings and lexical rerank scores is not meaningful.
+"""
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Matches the Gemini text-embedding-004 dimension the index is created with
+EMBEDDING_DIM = 768
+
+_WORD = re.compile(r"\w+")
+_STATUTE = re.compile(r"\b\d{2,3}\.\d{2,3}\b")
+
+
+def _digest(*parts: Any) -> int:
+    text = "\x1f".join(str(part) for part in (settings.fake_seed, *parts))
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+def simulated_latency(mean: float, *key: Any) -> float:
+    """Seconds for one call: log-normal around ``mean``, fixed for a given key."""
+    if mean <= 0:
+        return 0.0
+    sigma = settings.fake_latency_jitter
+    if sigma <= 0:
+        return mean
+    # mu chosen so the distribution's mean is ``mean``
+    return mean * math.exp(random.Random(_digest(*key)).gauss(-sigma * sigma / 2, sigma))
+
+
+def _pause(mean: float, *key: Any) -> None:
+    delay = simulated_latency(mean, *key)
+    if delay:
+        time.sleep(delay)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+@lru_cache(maxsize=65536)
+def _word_vector(word: str) -> np.ndarray:
+    return np.random.default_rng(_digest("word", word)).standard_normal(EMBEDDING_DIM).astype(np.float32)
+
+
+class FakeEmbeddings:
+    """Hashed bag-of-words embeddings: texts sharing words get similar unit vectors."""
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+        for word in _words(text):
+            vector += _word_vector(word)
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        _pause(settings.fake_embedding_latency, "embed", text)
+        return self._embed(text)
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        # One request per batch, as with the real API
+        _pause(settings.fake_embedding_latency, "embed", len(texts), texts[0] if texts else "")
+        return [self._embed(text) for text in texts]
+
+
+class FakeIndex:
+    """In-memory dotproduct index with the Pinecone data-plane methods the vector store uses."""
+
+    def __init__(self, dimension: int = EMBEDDING_DIM):
+        self.dimension = dimension
+        self._vectors: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._matrix = None
+
+    def _snapshot(self):
+        # (ids, dense matrix, sparse postings) rebuilt after writes
+        with self._lock:
+            if self._matrix is None:
+                ids = list(self._vectors)
+                dense = np.array([self._vectors[i][0] for i in ids], dtype=np.float32).reshape(len(ids), -1)
+                postings: Dict[int, list] = {}
+                for row, doc_id in enumerate(ids):
+                    sparse = self._vectors[doc_id][1]
+                    for index, value in zip(sparse.get("indices", ()), sparse.get("values", ())):
+                        postings.setdefault(index, []).append((row, value))
+                self._matrix = (ids, dense, postings)
+            return self._matrix
+
+    def query(self, vector: List[float], sparse_vector: Optional[dict] = None, top_k: int = 10,
+              include_metadata: bool = True, namespace: Optional[str] = None) -> Dict[str, Any]:
+        _pause(settings.fake_index_latency, "query", top_k, vector[:4])
+        ids, dense, postings = self._snapshot()
+        if not ids:
+            return {"matches": []}
+        scores = dense @ np.asarray(vector, dtype=np.float32)
+        for index, value in zip((sparse_vector or {}).get("indices", ()), (sparse_vector or {}).get("values", ())):
+            for row, weight in postings.get(index, ()):
+                scores[row] += value * weight
+        top = np.argsort(-scores)[:top_k]
+        return {"matches": [
+            {"id": ids[row], "score": float(scores[row]), "metadata": dict(self._vectors[ids[row]][2])}
+            for row in top
+        ]}
+
+    def fetch(self, ids: Sequence[str], namespace: Optional[str] = None) -> SimpleNamespace:
+        _pause(settings.fake_index_latency, "fetch", len(ids))
+        with self._lock:
+            found = {doc_id: SimpleNamespace(id=doc_id, metadata=dict(self._vectors[doc_id][2]))
+                     for doc_id in ids if doc_id in self._vectors}
+        return SimpleNamespace(vectors=found)
+
+    def upsert(self, vectors: Sequence[dict], namespace: Optional[str] = None) -> Dict[str, int]:
+        _pause(settings.fake_index_latency, "upsert", len(vectors))
+        with self._lock:
+            for vector in vectors:
+                self._vectors[vector["id"]] = (vector["values"], vector.get("sparse_values") or {},
+                                               vector.get("metadata") or {})
+            self._matrix = None
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: Optional[Sequence[str]] = None, delete_all: bool = False,
+               namespace: Optional[str] = None) -> None:
+        with self._lock:
+            if delete_all:
+                self._vectors.clear()
+            for doc_id in ids or ():
+                self._vectors.pop(doc_id, None)
+            self._matrix = None
+
+    def describe_index_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"total_vector_count": len(self._vectors), "dimension": self.dimension}
+
+    def list(self, namespace: Optional[str] = None, limit: int = 100) -> Iterator[List[str]]:
+        with self._lock:
+            ids = list(self._vectors)
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+
+# Indexes live for the life of the process, shared by every FakePinecone client
+_indexes: Dict[str, tuple] = {}
+_indexes_lock = threading.Lock()
+
+
+class FakePinecone:
+    """Pinecone control plane over process-local FakeIndex instances."""
+
+    def list_indexes(self) -> List[Dict[str, Any]]:
+        with _indexes_lock:
+            return [{"name": name, "metric": metric, "dimension": index.dimension}
+                    for name, (metric, index) in _indexes.items()]
+
+    def create_index(self, name: str, dimension: int, metric: str = "cosine", spec: Any = None) -> None:
+        with _indexes_lock:
+            _indexes[name] = (metric, FakeIndex(dimension))
+
+    def describe_index(self, name: str) -> SimpleNamespace:
+        return SimpleNamespace(name=name, status={"ready": name in _indexes})
+
+    def delete_index(self, name: str) -> None:
+        with _indexes_lock:
+            _indexes.pop(name, None)
+
+    def Index(self, name: Optional[str] = None, host: Optional[str] = None, **pool_options) -> FakeIndex:
+        name = name or settings.pinecone_index_name
+        with _indexes_lock:
+            if name not in _indexes:
+                # Like Pinecone, an index must be created (by ingestion) before it serves queries
+                raise KeyError(f"Index {name} does not exist")
+            return _indexes[name][1]
+
+
+class FakeReranker:
+    """Cohere rerank stand-in scoring documents by word overlap with the query."""
+
+    def rerank(self, documents: Sequence[Any], query: str, top_n: Optional[int] = -1) -> List[Dict[str, Any]]:
+        _pause(settings.fake_rerank_latency, "rerank", query, len(documents))
+        terms = set(_words(query))
+        results = []
+        for i, doc in enumerate(documents):
+            words = set(_words(getattr(doc, "page_content", doc)))
+            overlap = len(terms & words) / len(terms | words) if terms | words else 0.0
+            results.append({"index": i, "relevance_score": round(min(1.0, 4 * overlap), 4)})
+        results.sort(key=lambda r: -r["relevance_score"])
+        return results if top_n is None or top_n < 0 else results[:top_n]
+
+
+class FakeGenerativeModel:
+    """Gemini stand-in: time to first token, then one word per token interval."""
+
+    def _answer(self, prompt: str) -> List[str]:
+        cited = list(dict.fromkeys(_STATUTE.findall(prompt)))[:3]
+        words = ["Under", "Wisconsin", "law,"]
+        words += [f"§ {number}" for number in cited]
+        rng = random.Random(_digest("answer", prompt))
+        vocabulary = _words(prompt)[-400:] or ["context"]
+        while len(words) < settings.fake_llm_tokens:
+            words.append(rng.choice(vocabulary))
+        return words
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        words = self._answer(prompt)
+        first_token = simulated_latency(settings.fake_llm_first_token, "ttft", prompt)
+        if not stream:
+            time.sleep(first_token + settings.fake_llm_token_interval * (len(words) - 1))
+            return SimpleNamespace(text=" ".join(words))
+        return self._stream(words, first_token)
+
+    def _stream(self, words: List[str], first_token: float) -> Iterator[SimpleNamespace]:
+        time.sleep(first_token)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(settings.fake_llm_token_interval)
+            yield SimpleNamespace(text=f" {word}" if i else word)
@@ -0,0 +1,252 @@
+"""
+Streaming ingestion pipeline: load -> split -> enrich -> embed -> upsert.
+
+Each source file is parsed independently in a process pool (results come back
+in input order, and a failure in one file does not affect the others). Chunks
+then flow in fixed-size batches through a bounded number of in-flight
+embed + upsert tasks. Every stage is bounded, so parsing, embedding and
+upserting overlap while memory stays flat as the corpus grows.
+"""
+import logging
+import multiprocessing
+import pickle
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.chunker import LEGAL_SEPARATORS, has_statute_structure, iter_statute_chunks
+from app.services.legal_parser import extract_legal_metadata_batch
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FileResult:
+    """Chunks produced from one source file, or the error that stopped it."""
+    rel: str
+    documents: int = 0
+    chunks: List = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class FileOutcome:
+    """Result of embedding and upserting one file's chunks."""
+    rel: str
+    documents: int = 0
+    chunk_ids: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def load_file(path: Path) -> list:
+    """Load one source file into LangChain documents (one per PDF page)."""
+    from langchain_community.document_loaders import PyPDFLoader, TextLoader
+
+    if Path(path).suffix.lower() == ".pdf":
+        return PyPDFLoader(str(path)).load()
+    return TextLoader(str(path)).load()
+
+
+def split_and_enrich(docs: list, chunk_size: int, chunk_overlap: int, strategy: str = "statute") -> list:
+    """
+    Split documents into chunks carrying legal metadata.
+
+    With the "statute" strategy, files that contain statute section headers are
+    chunked on their structure (see chunker.py) and keep the inherited chapter,
+    section and subsection metadata; everything else is split by characters.
+    """
+    if strategy == "statute" and has_statute_structure(docs):
+        return _chunk_statute(docs, chunk_size, chunk_overlap)
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    # Extract legal metadata from documents before chunking
+    doc_metas = extract_legal_metadata_batch(
+        [doc.page_content for doc in docs],
+        [doc.metadata.get('source', '') for doc in docs]
+    )
+    for doc, legal_meta in zip(docs, doc_metas):
+        # Merge legal metadata with existing metadata
+        doc.metadata.update(legal_meta)
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=LEGAL_SEPARATORS
+    )
+    chunks = text_splitter.split_documents(docs)
+
+    # Re-extract metadata at chunk level for better granularity
+    chunks_with_text = [chunk for chunk in chunks if chunk.page_content]
+    chunk_metas = extract_legal_metadata_batch(
+        [chunk.page_content for chunk in chunks_with_text],
+        [chunk.metadata.get('source', '') for chunk in chunks_with_text]
+    )
+    for chunk, chunk_legal_meta in zip(chunks_with_text, chunk_metas):
+        # Preserve parent metadata, only update with chunk-specific info
+        for key, value in chunk_legal_meta.items():
+            if value and (key not in chunk.metadata or not chunk.metadata[key]):
+                chunk.metadata[key] = value
+    return chunks
+
+
+def _chunk_statute(docs: list, chunk_size: int, chunk_overlap: int) -> list:
+    """Structure-aware chunks; citations are extracted once per chunk, structure is inherited."""
+    chunks = [chunk for chunk in iter_statute_chunks(docs, chunk_size, chunk_overlap) if chunk.page_content]
+    chunk_metas = extract_legal_metadata_batch(
+        [chunk.page_content for chunk in chunks],
+        [chunk.metadata.get('source', '') for chunk in chunks]
+    )
+    for chunk, chunk_legal_meta in zip(chunks, chunk_metas):
+        structure = chunk.metadata
+        chunk.metadata = {**chunk_legal_meta, **structure, "doc_type": "statute"}
+    return chunks
+
+
+def process_file(rel: str, path: str, chunk_size: int, chunk_overlap: int, strategy: str = "statute") -> FileResult:
+    """Load, split and enrich one file. Runs in a worker process."""
+    try:
+        docs = load_file(Path(path))
+        return FileResult(rel, len(docs), split_and_enrich(docs, chunk_size, chunk_overlap, strategy))
+    except Exception as e:
+        return FileResult(rel, error=f"{type(e).__name__}: {e}")
+
+
+def process_files(
+    files: Dict[str, Path],
+    chunk_size: int,
+    chunk_overlap: int,
+    workers: int = 1,
+    strategy: str = "statute"
+) -> Iterator[FileResult]:
+    """
+    Process files and yield a FileResult per file, in input order.
+
+    With workers > 1 files are parsed in a spawn-based process pool (safe to
+    start from a threaded server); with workers <= 1 they are parsed in-process.
+    At most ``2 * workers`` files are parsed ahead of the consumer.
+    """
+    items = list(files.items())
+    if workers <= 1 or len(items) <= 1:
+        for rel, path in items:
+            yield process_file(rel, str(path), chunk_size, chunk_overlap, strategy)
+        return
+
+    workers = min(workers, len(items))
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        queued = iter(items)
+        pending = deque()
+        for rel, path in queued:
+            pending.append((rel, pool.submit(process_file, rel, str(path), chunk_size, chunk_overlap, strategy)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            rel, future = pending.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. BrokenProcessPool)
+                result = FileResult(rel, error=f"{type(e).__name__}: {e}")
+            next_item = next(queued, None)
+            if next_item is not None:
+                pending.append((next_item[0], pool.submit(process_file, next_item[0], str(next_item[1]),
+                                                          chunk_size, chunk_overlap, strategy)))
+            yield result
+
+
+class ChunkSpool:
+    """
+    Temporary on-disk buffer of FileResults.
+
+    A full re-ingest must fit BM25 on every chunk before any sparse vector can
+    be encoded; spooling parsed files to disk keeps that pass at flat memory.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+
+    def append(self, result: FileResult) -> None:
+        pickle.dump(result, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __iter__(self) -> Iterator[FileResult]:
+        self._file.seek(0)
+        while True:
+            try:
+                yield pickle.load(self._file)
+            except EOFError:
+                return
+
+    def texts(self) -> Iterator[str]:
+        for result in self:
+            for chunk in result.chunks:
+                yield chunk.page_content
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def embed_and_upsert(
+    results: Iterable[FileResult],
+    store,
+    encode: Callable[[List[str]], Tuple[list, list]],
+    chunk_id: Callable[[str, str], str],
+    batch_size: int = 32,
+    max_in_flight: int = 4,
+    retry: Callable = None
+) -> Iterator[FileOutcome]:
+    """
+    Embed and upsert chunks in batches, yielding a FileOutcome per file in input order.
+
+    ``encode(texts)`` returns (dense vectors, sparse vectors). At most
+    ``max_in_flight`` batches are being embedded or upserted at once; when all
+    slots are busy the caller (and the parsing stage behind it) waits. ``retry``
+    wraps each provider call, e.g. concurrency.call_with_retry.
+    """
+    retry = retry or (lambda fn, *args, **kwargs: fn(*args, **kwargs))
+    slots = threading.BoundedSemaphore(max_in_flight)
+
+    def run_batch(ids, texts, metadatas):
+        try:
+            dense, sparse = retry(encode, texts)
+            retry(store.upsert, ids, texts, dense, sparse, metadatas)
+        finally:
+            slots.release()
+
+    def outcome(entry) -> FileOutcome:
+        result, ids, futures = entry
+        wait(futures)
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if result.error or errors:
+            error = result.error or f"{type(errors[0]).__name__}: {errors[0]}"
+            return FileOutcome(result.rel, result.documents, error=error)
+        return FileOutcome(result.rel, result.documents, ids)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="ingest") as pool:
+        pending = deque()
+        for result in results:
+            by_id = {}
+            for chunk in result.chunks:
+                # Identical chunks within a file collapse to one vector
+                by_id.setdefault(chunk_id(result.rel, chunk.page_content), chunk)
+            ids = list(by_id)
+            futures = []
+            for start in range(0, len(ids), batch_size):
+                batch_ids = ids[start:start + batch_size]
+                batch = [by_id[i] for i in batch_ids]
+                slots.acquire()
+                futures.append(pool.submit(
+                    run_batch, batch_ids, [c.page_content for c in batch], [c.metadata for c in batch]
+                ))
+            pending.append((result, ids, futures))
+            # Chunks are handed off; drop the parsed file so memory stays flat
+            result.chunks = []
+            while pending and all(f.done() for f in pending[0][2]):
+                yield outcome(pending.popleft())
+        while pending:
+            yield outcome(pending.popleft())
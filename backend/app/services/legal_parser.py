@@ -62,25 +62,89 @@ SUBSECTION_PATTERN = r'^\((\d+)\)\s+'
 PARAGRAPH_PATTERN = r'^\(([a-z])\)\s+'
 SUBPARAGRAPH_PATTERN = r'^\(([A-Z])\)\s+'
 
+# Keyword groups for document type detection, checked in priority order
+DOC_TYPE_KEYWORDS = [
+    ('statute', ('statute', 'chapter', 'section')),
+    ('case_law', ('state v.', 'court of appeals', 'supreme court')),
+    ('policy', ('policy', 'procedure', 'department')),
+    ('training', ('training', 'guide', 'manual')),
+]
+
+# Sensitive topic keywords, checked in priority order
+SENSITIVE_KEYWORDS = {
+    'use_of_force': ('deadly force', 'use of force', 'shooting', 'firearm discharge'),
+    'civil_rights': ('miranda', 'search and seizure', 'warrant', 'fourth amendment'),
+    'juvenile': ('juvenile', 'minor', 'child under'),
+}
+
+# Characters that match ASCII letters under re.IGNORECASE but lowercase to
+# something else (or to two characters). Text containing any of them is
+# scanned with the case-insensitive patterns instead of the folded ones.
+_UNFOLDABLE = re.compile('[\u0130\u0131\u017f\u212a]')
+
+
+def _compile_folded(pattern: str, flags: int = 0) -> Tuple[re.Pattern, re.Pattern]:
+    """
+    Compile a case-insensitive pattern twice: lowercased, for matching against
+    text.lower() (which lets the regex engine use its fast literal-prefix
+    search), and with re.IGNORECASE as the fallback for text that cannot be
+    folded position-for-position.
+    """
+    if re.search(r'\\[A-Z]', pattern):
+        raise ValueError(f"Pattern cannot be case-folded: {pattern}")
+    return re.compile(pattern.lower(), flags), re.compile(pattern, flags | re.IGNORECASE)
+
+
+_STATUTE_REGEXES = [(_compile_folded(pattern, re.MULTILINE), kind) for pattern, kind in STATUTE_PATTERNS]
+_CASE_REGEXES = [(re.compile(pattern), court) for pattern, court in CASE_PATTERNS]
+_CROSS_REFERENCE_REGEXES = [(ref_type, _compile_folded(pattern)) for ref_type, pattern in CROSS_REFERENCE_PATTERNS.items()]
+_SECTION_HEADER_RE = re.compile(SECTION_HEADER_PATTERN, re.MULTILINE)
+_SUBSECTION_RE = re.compile(SUBSECTION_PATTERN)
+_PARAGRAPH_RE = re.compile(PARAGRAPH_PATTERN)
+_SUBPARAGRAPH_RE = re.compile(SUBPARAGRAPH_PATTERN)
+
+
+def _fold(text: str, text_lower: Optional[str] = None) -> Optional[str]:
+    """Lowercased text aligned character-for-character with the original, or None."""
+    if _UNFOLDABLE.search(text):
+        return None
+    return text.lower() if text_lower is None else text_lower
+
+
+def _finditer(regexes: Tuple[re.Pattern, re.Pattern], text: str, folded: Optional[str]):
+    """Case-insensitive finditer; group spans always index into the original text."""
+    if folded is None:
+        return regexes[1].finditer(text)
+    return regexes[0].finditer(folded)
+
+
+def _groups(text: str, match: re.Match) -> Tuple[Optional[str], ...]:
+    """Groups of a match, sliced from the original (unfolded) text."""
+    spans = (match.span(i) for i in range(1, match.re.groups + 1))
+    return tuple(text[start:end] if start >= 0 else None for start, end in spans)
+
 
 def extract_statute_citations(text: str) -> List[StatuteCitation]:
     """Extract all Wisconsin statute citations from text."""
+    return _extract_statute_citations(text, _fold(text))
+
+
+def _extract_statute_citations(text: str, folded: Optional[str]) -> List[StatuteCitation]:
     citations = []
 
-    for pattern, pattern_type in STATUTE_PATTERNS:
-        matches = re.finditer(pattern, text, re.MULTILINE | re.IGNORECASE)
-        for match in matches:
+    for regexes, pattern_type in _STATUTE_REGEXES:
+        for match in _finditer(regexes, text, folded):
+            full_cite = text[match.start():match.end()]
+            groups = _groups(text, match)
             if pattern_type == 'chapter_only':
                 # Just a chapter reference
-                chapter = match.group(1)
                 citations.append(StatuteCitation(
-                    full_cite=match.group(0),
-                    chapter=chapter,
+                    full_cite=full_cite,
+                    chapter=groups[0],
                     section="",
                     citation_type="chapter"
                 ))
             else:
-                groups = match.groups()
                 chapter = groups[0]
                 section = groups[1] if len(groups) > 1 else ""
 
@@ -95,7 +159,7 @@ def extract_statute_citations(text: str) -> List[StatuteCitation]:
                 year = groups[4] if len(groups) > 4 else None
 
                 citations.append(StatuteCitation(
-                    full_cite=match.group(0),
+                    full_cite=full_cite,
                     chapter=chapter,
                     section=section,
                     subsection=subsection,
@@ -109,16 +173,15 @@ def extract_statute_citations(text: str) -> List[StatuteCitation]:
 def extract_case_citations(text: str) -> List[Dict[str, str]]:
     """Extract Wisconsin case law citations."""
     cases = []
+    if "WI" not in text:
+        return cases
 
-    for pattern, court_type in CASE_PATTERNS:
-        matches = re.finditer(pattern, text)
-        for match in matches:
-            year = match.group(1)
-            number = match.group(2)
+    for regex, court_type in _CASE_REGEXES:
+        for match in regex.finditer(text):
             cases.append({
                 "citation": match.group(0),
-                "year": year,
-                "number": number,
+                "year": match.group(1),
+                "number": match.group(2),
                 "court": court_type,
                 "type": "case_law"
             })
@@ -128,22 +191,24 @@ def extract_case_citations(text: str) -> List[Dict[str, str]]:
 
 def extract_cross_references(text: str, current_location: str = "") -> List[CrossReference]:
     """Extract cross-references to other legal provisions."""
+    return _extract_cross_references(text, _fold(text), current_location)
+
+
+def _extract_cross_references(text: str, folded: Optional[str], current_location: str) -> List[CrossReference]:
     references = []
 
-    for ref_type, pattern in CROSS_REFERENCE_PATTERNS.items():
-        matches = re.finditer(pattern, text, re.IGNORECASE)
-        for match in matches:
-            target = match.group(1)
+    for ref_type, regexes in _CROSS_REFERENCE_REGEXES:
+        for match in _finditer(regexes, text, folded):
+            start, end = match.span(1)
             # Get surrounding context (100 chars before and after)
-            start = max(0, match.start() - 100)
-            end = min(len(text), match.end() + 100)
-            context = text[start:end].strip()
+            context_start = max(0, match.start() - 100)
+            context_end = min(len(text), match.end() + 100)
 
             references.append(CrossReference(
                 source_location=current_location,
-                target=target,
+                target=text[start:end],
                 reference_type=ref_type,
-                context=context
+                context=text[context_start:context_end].strip()
             ))
 
     return references
@@ -161,8 +226,10 @@ def detect_hierarchical_level(text: str) -> Tuple[int, Dict[str, str]]:
         3 = Paragraph (a)
         4 = Subparagraph (A)
     """
+    text = text.strip()
+
     # Check for section header (e.g., "940.01 First-degree intentional homicide")
-    section_match = re.match(SECTION_HEADER_PATTERN, text.strip(), re.MULTILINE)
+    section_match = _SECTION_HEADER_RE.match(text)
     if section_match:
         return 1, {
             "section_number": section_match.group(1),
@@ -170,18 +237,18 @@ def detect_hierarchical_level(text: str) -> Tuple[int, Dict[str, str]]:
         }
 
     # Check for subsection (1)
-    if re.match(SUBSECTION_PATTERN, text.strip()):
-        subsec_match = re.match(SUBSECTION_PATTERN, text.strip())
+    subsec_match = _SUBSECTION_RE.match(text)
+    if subsec_match:
         return 2, {"subsection": subsec_match.group(1)}
 
     # Check for paragraph (a)
-    if re.match(PARAGRAPH_PATTERN, text.strip()):
-        para_match = re.match(PARAGRAPH_PATTERN, text.strip())
+    para_match = _PARAGRAPH_RE.match(text)
+    if para_match:
         return 3, {"paragraph": para_match.group(1)}
 
     # Check for subparagraph (A)
-    if re.match(SUBPARAGRAPH_PATTERN, text.strip()):
-        subpara_match = re.match(SUBPARAGRAPH_PATTERN, text.strip())
+    subpara_match = _SUBPARAGRAPH_RE.match(text)
+    if subpara_match:
         return 4, {"subparagraph": subpara_match.group(1)}
 
     # Default to chapter level if none match
@@ -208,8 +275,12 @@ def extract_legal_metadata(text: str, source: str = "") -> Dict:
         "jurisdiction": "wisconsin",
     }
 
+    # One lowercase pass shared by every case-insensitive scan below
+    text_lower = text.lower()
+    folded = _fold(text, text_lower)
+
     # Extract statute citations
-    statute_cites = extract_statute_citations(text)
+    statute_cites = _extract_statute_citations(text, folded)
     if statute_cites:
         primary_cite = statute_cites[0]  # First citation is likely the primary one
         metadata["statute_num"] = f"{primary_cite.chapter}.{primary_cite.section}"
@@ -227,7 +298,7 @@ def extract_legal_metadata(text: str, source: str = "") -> Dict:
 
     # Extract cross-references
     current_location = metadata.get("statute_num", "")
-    cross_refs = extract_cross_references(text, current_location)
+    cross_refs = _extract_cross_references(text, folded, current_location)
     if cross_refs:
         metadata["cross_references"] = [
             {
@@ -244,24 +315,13 @@ def extract_legal_metadata(text: str, source: str = "") -> Dict:
     metadata.update(hierarchy_meta)
 
     # Detect document type based on content
-    if any(kw in text.lower() for kw in ['statute', 'chapter', 'section']):
-        metadata["doc_type"] = "statute"
-    elif any(kw in text.lower() for kw in ['state v.', 'court of appeals', 'supreme court']):
-        metadata["doc_type"] = "case_law"
-    elif any(kw in text.lower() for kw in ['policy', 'procedure', 'department']):
-        metadata["doc_type"] = "policy"
-    elif any(kw in text.lower() for kw in ['training', 'guide', 'manual']):
-        metadata["doc_type"] = "training"
+    for doc_type, keywords in DOC_TYPE_KEYWORDS:
+        if any(kw in text_lower for kw in keywords):
+            metadata["doc_type"] = doc_type
+            break
 
     # Detect sensitive topics
-    sensitive_keywords = {
-        'use_of_force': ['deadly force', 'use of force', 'shooting', 'firearm discharge'],
-        'civil_rights': ['miranda', 'search and seizure', 'warrant', 'fourth amendment'],
-        'juvenile': ['juvenile', 'minor', 'child under'],
-    }
-
-    text_lower = text.lower()
-    for topic, keywords in sensitive_keywords.items():
+    for topic, keywords in SENSITIVE_KEYWORDS.items():
         if any(kw in text_lower for kw in keywords):
             metadata["is_sensitive"] = True
             metadata["sensitive_topic"] = topic
@@ -270,6 +330,13 @@ def extract_legal_metadata(text: str, source: str = "") -> Dict:
     return metadata
 
 
+def extract_legal_metadata_batch(texts: List[str], sources: Optional[List[str]] = None) -> List[Dict]:
+    """Extract legal metadata for many texts (e.g. all chunks of a document) in one call."""
+    if sources is None:
+        sources = [""] * len(texts)
+    return [extract_legal_metadata(text, source) for text, source in zip(texts, sources)]
+
+
 def parse_effective_date(text: str) -> Optional[str]:
     """Extract effective date from statute text."""
     # Common patterns: "Effective January 1, 2023", "(2023-24)", etc.
@@ -0,0 +1,86 @@
+"""
+Ingestion manifest: which source files are indexed, at which content hash,
+and under which chunk IDs. Lets ingestion touch only new, changed or removed
+files instead of rebuilding the whole index.
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+@dataclass
+class FileEntry:
+    """Indexed state of one source file."""
+    sha256: str
+    size: int
+    mtime_ns: int
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+def file_sha256(path: Path) -> str:
+    """Streaming SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """Persisted map of relative file path -> FileEntry."""
+
+    def __init__(self, path: Path, files: Optional[Dict[str, FileEntry]] = None, chunking: str = ""):
+        self.path = Path(path)
+        self.files: Dict[str, FileEntry] = files or {}
+        # Chunking parameters the recorded chunk IDs were produced with
+        self.chunking = chunking
+
+    @classmethod
+    def load(cls, path: Path) -> "IngestManifest":
+        path = Path(path)
+        if not path.exists():
+            return cls(path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        files = {rel: FileEntry(**entry) for rel, entry in data.get("files", {}).items()}
+        return cls(path, files, data.get("chunking", ""))
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "chunking": self.chunking,
+                "files": {rel: asdict(entry) for rel, entry in sorted(self.files.items())}
+            }, f)
+        os.replace(tmp, self.path)
+
+    def fingerprint(self, rel: str, path: Path) -> FileEntry:
+        """
+        Current FileEntry (without chunk IDs) for a file on disk.
+        Reuses the stored hash when size and mtime are unchanged.
+        """
+        stat = path.stat()
+        entry = self.files.get(rel)
+        if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            sha256 = entry.sha256
+        else:
+            sha256 = file_sha256(path)
+        return FileEntry(sha256=sha256, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    def is_changed(self, rel: str, current: FileEntry) -> bool:
+        entry = self.files.get(rel)
+        return entry is None or entry.sha256 != current.sha256
+
+    def chunk_ids(self, rel: str) -> List[str]:
+        entry = self.files.get(rel)
+        return list(entry.chunk_ids) if entry else []
+
+    def record(self, rel: str, current: FileEntry, chunk_ids: List[str]) -> None:
+        self.files[rel] = FileEntry(current.sha256, current.size, current.mtime_ns, list(chunk_ids))
+
+    def remove(self, rel: str) -> None:
+        self.files.pop(rel, None)
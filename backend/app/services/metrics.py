@@ -0,0 +1,166 @@
+"""
+Per-stage latency instrumentation and Prometheus text exposition.
+
+Pipeline code wraps each stage in span("stage"). A span records its duration
+in the rag_stage_seconds histogram, labelled with the operation (chat,
+chat_stream, search, ingest, ...) of the enclosing trace(), and adds it to
+that trace's per-request breakdown, which responses can include. The trace
+lives in a context variable, so spans in tasks and in run_blocking() threads
+started by the request report to it. Observing is a bisect and a few integer
+updates under a lock; no third-party client library is needed to serve
+/metrics.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds; sub-10ms cache hits up to multi-minute ingestion stages
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+# Operation label for spans outside any trace (e.g. warm-up)
+NO_OPERATION = "other"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Thread-safe cumulative histogram with a fixed label set."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """Count, sum and mean per label set (for JSON stats and tests)."""
+        with self._lock:
+            return {labels: {"count": count, "sum": round(total, 6), "mean": round(total / count, 6)}
+                    for labels, (_, total, count) in self._series.items()}
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total, count)
+                            for labels, (counts, total, count) in self._series.items())
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = _labels(self.label_names, labels, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Duration of RAG pipeline stages in seconds.",
+                          ("operation", "stage"))
+
+
+class Trace:
+    """Stage durations of one request; repeated stages accumulate."""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.stages: Dict[str, float] = {}
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def timings(self) -> Dict[str, float]:
+        """Seconds per stage, plus the total so far."""
+        with self._lock:
+            timings = {stage: round(seconds, 4) for stage, seconds in self.stages.items()}
+        timings["total"] = round(time.perf_counter() - self.start, 4)
+        return timings
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("rag_trace", default=None)
+
+
+def record(stage: str, seconds: float, operation: Optional[str] = None) -> None:
+    """Record a stage duration measured by the caller (e.g. time to first token)."""
+    current = _current.get()
+    if current is not None:
+        current.add(stage, seconds)
+    STAGE_SECONDS.observe(seconds, operation or (current.operation if current else NO_OPERATION), stage)
+
+
+@contextmanager
+def span(stage: str, operation: Optional[str] = None) -> Iterator[None]:
+    """Time the enclosed block as ``stage`` (failures are recorded too)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, operation)
+
+
+@contextmanager
+def trace(operation: str) -> Iterator[Trace]:
+    """Collect the spans of one request; its total duration is recorded as the "total" stage."""
+    current = Trace(operation)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        record("total", time.perf_counter() - current.start)
+        try:
+            _current.reset(token)
+        except ValueError:
+            # An async generator closed from another context (e.g. by the GC)
+            pass
+
+
+def family(name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> str:
+    """One metric family in Prometheus text format; None values are skipped."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    return "\n".join(lines)
+
+
+def render(families: List[str]) -> str:
+    """Stage histograms plus the given families, as a /metrics response body."""
+    return "\n".join([STAGE_SECONDS.render(), *families]) + "\n"
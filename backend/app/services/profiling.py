@@ -0,0 +1,264 @@
+"""
+On-demand sampling profiler for single requests.
+
+An admin can ask for one /api/chat or /api/search request to be profiled.
+While it runs, a sampler thread captures the stacks of the threads doing that
+request's work every few milliseconds:
+
+- the event-loop thread, only while the request's task, or a task it
+  created, is running on it, so concurrent requests sharing the loop are not
+  attributed to it (tasks are tracked by a loop task factory installed only
+  while a profile is active);
+- run_blocking() worker threads while they run a call made by the request
+  (concurrency.run_blocking binds calls through bind()), including time spent
+  blocked on provider I/O inside the SDKs.
+
+Stacks are written in collapsed format (one "frame;frame;... count" line per
+distinct stack, as read by flamegraph.pl and speedscope) and summarized per
+module group, e.g. app.services.rag, app.services.legal_parser,
+langchain_core, google.generativeai, pinecone, httpx. When no request is
+being profiled the only cost is one context variable lookup per run_blocking
+call.
+"""
+import asyncio
+import contextvars
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+PROFILE_DIR = Path(settings.profile_dir) if settings.profile_dir else PROJECT_ROOT / "data" / "profiles"
+PROFILE_SUFFIX = ".collapsed"
+# Functions listed in a profile report
+TOP_FUNCTIONS = 15
+
+_active: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar("rag_profile", default=None)
+# Loops with the tracking task factory installed -> active profiles using it
+_factory_users: Dict[asyncio.AbstractEventLoop, int] = {}
+
+
+def _group(module: str) -> str:
+    """Module group for attribution: app modules individually, vendors by package."""
+    if module.startswith("app."):
+        return module
+    parts = module.split(".")
+    return ".".join(parts[:2]) if parts[0] == "google" and len(parts) > 1 else parts[0]
+
+
+def _track_tasks(loop, coro, **kwargs) -> asyncio.Task:
+    """Task factory: tasks created inside a profiled request belong to its profile."""
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    profile = _active.get()
+    if profile is not None:
+        profile._tasks.add(task)
+    return task
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+def _stack(frame) -> Optional[List[str]]:
+    """Frame labels, root first; None while the thread is in the profiler itself (starting or stopping)."""
+    labels = []
+    while frame is not None:
+        if frame.f_globals.get("__name__") == __name__:
+            # The bind() wrapper is left out of the stack; any other profiler frame is its own work
+            if frame.f_code is not _call_bound.__code__:
+                return None
+        else:
+            labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class Profile:
+    """Samples of one request's threads, taken by a background sampler thread."""
+
+    def __init__(self, operation: str, interval: float):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{operation}-{uuid.uuid4().hex[:8]}"
+        self.operation = operation
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.seconds = 0.0
+        self.file: Optional[str] = None
+        self._workers: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: set = set()
+        self._tracking = False
+        self._loop_thread: Optional[int] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def _enter_worker(self) -> None:
+        with self._lock:
+            self._workers[threading.get_ident()] += 1
+
+    def _exit_worker(self) -> None:
+        with self._lock:
+            tid = threading.get_ident()
+            self._workers[tid] -= 1
+            if self._workers[tid] <= 0:
+                del self._workers[tid]
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        with self._lock:
+            workers = list(self._workers)
+        taken = []
+        if self._loop is not None and asyncio.current_task(self._loop) in self._tasks:
+            taken.append(("event-loop", frames.get(self._loop_thread)))
+        taken.extend(("worker", frames.get(tid)) for tid in workers)
+        taken = [(root, _stack(frame)) for root, frame in taken if frame is not None]
+        taken = [(root, stack) for root, stack in taken if stack]
+        for root, stack in taken:
+            self.stacks[";".join([root, *stack])] += 1
+        self.samples += len(taken)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._loop_thread = threading.get_ident()
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        if self._loop is not None:
+            self._tasks.add(asyncio.current_task())
+            if self._loop.get_task_factory() is None:
+                self._loop.set_task_factory(_track_tasks)
+                _factory_users[self._loop] = 0
+            # A custom factory is left alone; only the request's own task is then sampled
+            self._tracking = self._loop.get_task_factory() is _track_tasks
+            if self._tracking:
+                _factory_users[self._loop] += 1
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.seconds = time.perf_counter() - self._started
+        if self._tracking:
+            _factory_users[self._loop] -= 1
+            if not _factory_users[self._loop]:
+                del _factory_users[self._loop]
+                self._loop.set_task_factory(None)
+        self._tasks.clear()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def save(self, directory: Path = None) -> str:
+        """Write the collapsed stacks; returns the file name."""
+        directory = directory or PROFILE_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.id}{PROFILE_SUFFIX}"
+        path.write_text(self.collapsed())
+        self.file = path.name
+        _prune(directory)
+        return self.file
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Share of samples per module group: "inclusive" counts samples with the
+        group anywhere on the stack, "self" only those where it was running.
+        """
+        inclusive: Counter = Counter()
+        own: Counter = Counter()
+        functions: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            for group in {_group(frame.split(":", 1)[0]) for frame in frames}:
+                inclusive[group] += count
+            if frames:
+                own[_group(frames[-1].split(":", 1)[0])] += count
+                functions[frames[-1]] += count
+
+        def share(counter: Counter, limit: Optional[int] = None) -> Dict[str, float]:
+            return {name: round(count / self.samples, 4) for name, count in counter.most_common(limit)}
+
+        return {
+            "id": self.id,
+            "file": self.file,
+            "seconds": round(self.seconds, 4),
+            "interval": self.interval,
+            "samples": self.samples,
+            "inclusive": share(inclusive) if self.samples else {},
+            "self": share(own) if self.samples else {},
+            "top_functions": share(functions, TOP_FUNCTIONS) if self.samples else {},
+        }
+
+
+def _prune(directory: Path) -> None:
+    """Keep the newest profile_max_files profiles."""
+    files = sorted(directory.glob(f"*{PROFILE_SUFFIX}"), key=lambda p: p.stat().st_mtime)
+    for path in files[:max(0, len(files) - settings.profile_max_files)]:
+        path.unlink(missing_ok=True)
+
+
+def active() -> bool:
+    """Whether the current request is being profiled."""
+    return _active.get() is not None
+
+
+def _call_bound(profile: Profile, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    profile._enter_worker()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profile._exit_worker()
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """``fn`` as-is, or, inside a profiled request, wrapped so its worker thread is sampled."""
+    profile = _active.get()
+    if profile is None:
+        return fn
+    return partial(_call_bound, profile, fn)
+
+
+@contextmanager
+def profile(operation: str, interval: Optional[float] = None) -> Iterator[Profile]:
+    """Sample the enclosed request (run from its task on the event loop) and save the profile."""
+    current = Profile(operation, interval or settings.profile_interval)
+    token = _active.set(current)
+    current.start()
+    try:
+        yield current
+    finally:
+        current.stop()
+        _active.reset(token)
+        try:
+            current.save()
+        except OSError as e:
+            logger.error(f"Could not save profile {current.id}: {e}")
+
+
+def read_profile(name: str) -> Optional[str]:
+    """Collapsed stacks of a saved profile, or None if there is no such profile."""
+    if Path(name).name != name or not name.endswith(PROFILE_SUFFIX):
+        return None
+    path = PROFILE_DIR / name
+    return path.read_text() if path.is_file() else None
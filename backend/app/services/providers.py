@@ -0,0 +1,222 @@
+"""
+Shared provider layer: pooled clients and per-provider concurrency limits.
+
+Each external provider (Gemini embeddings, Pinecone, Cohere rerank, Gemini
+generation) gets one long-lived client whose HTTP connection pool is sized to
+the provider's in-flight limit, so request threads and ingest workers reuse
+keep-alive connections instead of paying a TLS handshake per call. Every call
+also passes through the provider's gate, a semaphore shared by queries and
+ingestion that caps in-flight calls and records how long callers queued for a
+slot. provider_stats() reports those numbers for sizing workers against
+provider rate limits.
+
+With PROVIDER_BACKEND=fake the factories return the local stand-ins from
+fakes.py, behind the same gates, so load tests exercise the real pipeline
+and concurrency limits without network access or API keys.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+PROVIDERS = ("embeddings", "pinecone", "cohere", "gemini")
+
+
+def provider_limit(provider: str) -> int:
+    """Configured max in-flight calls for a provider."""
+    limits = {
+        "embeddings": settings.embeddings_max_in_flight,
+        "pinecone": settings.pinecone_max_in_flight,
+        "cohere": settings.cohere_max_in_flight,
+        "gemini": settings.gemini_max_in_flight,
+    }
+    if provider not in limits:
+        raise ValueError(f"Unknown provider: {provider}")
+    return max(1, limits[provider])
+
+
+class ProviderGate:
+    """Thread-safe in-flight limit for one provider, with queue-wait metrics."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.queued_calls = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one of the provider's slots for the duration of a call."""
+        start = time.perf_counter()
+        queued = not self._semaphore.acquire(blocking=False)
+        if queued:
+            with self._lock:
+                self.waiting += 1
+            self._semaphore.acquire()
+        waited = time.perf_counter() - start
+        with self._lock:
+            if queued:
+                self.waiting -= 1
+                self.queued_calls += 1
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "waiting": self.waiting,
+                "calls": self.calls,
+                "errors": self.errors,
+                "queued_calls": self.queued_calls,
+                "wait_seconds_total": round(self.wait_seconds_total, 4),
+                "wait_seconds_max": round(self.wait_seconds_max, 4),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.calls, 4) if self.calls else 0.0,
+            }
+
+
+_gates: Dict[str, ProviderGate] = {}
+_gates_lock = threading.Lock()
+
+
+def gate(provider: str) -> ProviderGate:
+    if provider not in _gates:
+        with _gates_lock:
+            if provider not in _gates:
+                _gates[provider] = ProviderGate(provider, provider_limit(provider))
+    return _gates[provider]
+
+
+def provider_stats() -> Dict[str, Dict[str, Any]]:
+    """Gate metrics per provider (providers never called report zeros)."""
+    return {provider: gate(provider).stats() for provider in PROVIDERS}
+
+
+class GatedClient:
+    """
+    Proxy for an SDK client: every method call runs inside the provider's
+    gate, attributes pass through unchanged.
+    """
+
+    def __init__(self, provider: str, client: Any):
+        self._provider = provider
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            with gate(self._provider).slot():
+                return attr(*args, **kwargs)
+        return call
+
+
+# -- client factories ------------------------------------------------------
+
+
+def _http_limits(provider: str):
+    import httpx
+
+    size = provider_limit(provider)
+    return httpx.Limits(max_connections=size, max_keepalive_connections=size,
+                        keepalive_expiry=settings.provider_keepalive_seconds)
+
+
+def _fake() -> bool:
+    return settings.provider_backend == "fake"
+
+
+def embeddings_client(**kwargs) -> GatedClient:
+    """Gemini embeddings over a keep-alive httpx pool."""
+    if _fake():
+        from app.services.fakes import FakeEmbeddings
+        return GatedClient("embeddings", FakeEmbeddings())
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    client = GoogleGenerativeAIEmbeddings(
+        model=settings.embedding_model,
+        google_api_key=settings.google_api_key,
+        client_args={"limits": _http_limits("embeddings")},
+        **kwargs
+    )
+    return GatedClient("embeddings", client)
+
+
+def pinecone_client():
+    """Pinecone control-plane client (index management; data-plane clients come from pinecone_index)."""
+    if _fake():
+        from app.services.fakes import FakePinecone
+        return FakePinecone()
+
+    from pinecone import Pinecone
+
+    return Pinecone(api_key=settings.pinecone_api_key)
+
+
+def pinecone_index(pc, **target) -> GatedClient:
+    """Pinecone data-plane client (by ``name`` or ``host``) with a pool per in-flight slot."""
+    size = provider_limit("pinecone")
+    return GatedClient("pinecone", pc.Index(pool_threads=size, connection_pool_maxsize=size, **target))
+
+
+def reranker_client() -> GatedClient:
+    """Cohere rerank over a keep-alive httpx pool."""
+    if _fake():
+        from app.services.fakes import FakeReranker
+        return GatedClient("cohere", FakeReranker())
+
+    import cohere
+    import httpx
+    from langchain_cohere import CohereRerank
+
+    http = httpx.Client(limits=_http_limits("cohere"), timeout=settings.provider_timeout)
+    client = cohere.ClientV2(settings.cohere_api_key, httpx_client=http)
+    return GatedClient("cohere", CohereRerank(client=client, model=settings.rerank_model, top_n=settings.top_n))
+
+
+def generative_model():
+    """
+    Gemini model shared by all requests. The SDK keeps one gRPC channel per
+    process, which multiplexes concurrent calls over a single connection.
+    Callers hold gate("gemini").slot() themselves, since a streamed response
+    keeps the slot until it is fully consumed.
+    """
+    if _fake():
+        from app.services.fakes import FakeGenerativeModel
+        return FakeGenerativeModel()
+
+    import google.generativeai as genai
+
+    return genai.GenerativeModel(settings.llm_model)
@@ -2,20 +2,34 @@
 RAG service using LangChain with Pinecone Hybrid Search, Cohere v4.0 Rerank.
 Updated for December 2025 with latest LangChain, Pinecone, and Cohere integrations.
 Enhanced with legal-specific intelligence for Wisconsin statutes.
+Hybrid retrieval runs against a pluggable vector store (Pinecone or local NumPy).
 """
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from contextlib import aclosing
 from pathlib import Path
-from typing import List, Dict, Any, AsyncGenerator
+from typing import List, Dict, Any, AsyncGenerator, Optional, Tuple
 import logging
-import ssl
-import certifi
-
-# Fix SSL certificate issues for NLTK
-ssl._create_default_https_context = ssl._create_unverified_context
 
 import google.generativeai as genai
+from langchain_core.documents import Document
 
 from app.core.config import get_settings
-from app.services.legal_parser import extract_legal_metadata, normalize_statute_number
+from app.services.bm25 import PARAMS_FILE, TOKENIZERS, BM25Model
+from app.services.cache import CorpusVersion, TTLCache, fingerprint, normalize_query
+from app.services.citation_index import CitationIndex, citation_keys, parse_citation_query
+from app.services.context_packer import PackedContext, pack_context, unpacked_context
+from app.services.concurrency import call_with_retry, iterate_in_thread, run_blocking
+from app.services.ingest import ChunkSpool, embed_and_upsert, process_files
+from app.services.legal_parser import normalize_statute_number
+from app.services.manifest import IngestManifest
+from app.services import metrics, profiling, providers
+from app.services.sessions import SessionStore, TurnPlan
+from app.services.singleflight import SingleFlight
+from app.services.xref_graph import CrossReferenceGraph
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -26,15 +40,58 @@ settings = get_settings()
 # Data folder in project root (documents are in data/raw/)
 PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
 DATA_DIR = PROJECT_ROOT / "data" / "raw"
-BM25_PATH = PROJECT_ROOT / "data" / "bm25_encoder.json"
+# State generated by ingestion (relocatable, e.g. for offline load tests)
+STATE_DIR = Path(settings.state_dir) if settings.state_dir else PROJECT_ROOT / "data"
+BM25_DIR = STATE_DIR / "bm25"
+# Model written by pinecone_text's BM25Encoder.dump(); converted to BM25_DIR on first load
+BM25_JSON_PATH = STATE_DIR / "bm25_encoder.json"
+CORPUS_VERSION_PATH = STATE_DIR / "corpus_version"
+MANIFEST_PATH = STATE_DIR / "ingest_manifest.json"
+CITATION_INDEX_PATH = STATE_DIR / "citation_index.json"
+CROSS_REF_GRAPH_PATH = STATE_DIR / "cross_ref_graph.npz"
+SUPPORTED_SUFFIXES = (".pdf", ".txt", ".md")
+LOCAL_INDEX_DIR = Path(settings.local_index_dir) if settings.local_index_dir else STATE_DIR / "local_index"
+
+# Gemini text-embedding-004 dimension
+EMBEDDING_DIM = 768
+# Seconds to wait for a newly created Pinecone index
+INDEX_READY_TIMEOUT = 120
 
 # Lazy-loaded components
 _pc = None
 _index = None
 _embeddings = None
 _bm25 = None
-_retriever = None
+_store = None
 _reranker = None
+_llm = None
+_citation_index = None
+_cross_ref_graph = None
+
+# Query text -> (dense vector, sparse vector); cleared when BM25 is refit
+_query_vectors = TTLCache(settings.query_cache_size, settings.query_cache_ttl)
+
+# Retrieval tier: (corpus version, stage, query, top_k, alpha[, top_n]) -> retrieved chunks
+# Answer tier: (corpus version, query, context fingerprint) -> generated answer
+_corpus_version = CorpusVersion(CORPUS_VERSION_PATH)
+_retrieval_cache = TTLCache(settings.retrieval_cache_size, settings.retrieval_cache_ttl)
+_answer_cache = TTLCache(settings.answer_cache_size, settings.answer_cache_ttl)
+# Rerank tier: (corpus version, rerank model, query hash, chunk ID) -> Cohere relevance score
+_rerank_scores = TTLCache(settings.rerank_cache_size, settings.rerank_cache_ttl)
+
+# Concurrent identical chat requests share one retrieval + generation
+_inflight = SingleFlight()
+
+# Conversation state: recent turns, rolling summary and last context per session
+_sessions = SessionStore(settings.session_max, settings.session_ttl,
+                         settings.session_max_turns, settings.session_summary_max_chars)
+
+# Only one ingestion may run at a time per worker
+_ingest_lock = threading.Lock()
+
+# One lock per lazily built component, so concurrent first callers build it
+# once while independent components (e.g. during warm-up) build in parallel
+_init_locks = {name: threading.Lock() for name in ("pinecone", "index", "embeddings", "bm25", "store", "reranker", "llm")}
 
 # Configure Gemini at import
 genai.configure(api_key=settings.google_api_key)
@@ -65,89 +122,447 @@ DISCLAIMER:
 Context:
 {context}
 
-Query: {query}"""
+{conversation}Query: {query}"""
 
 
 def _get_pinecone():
     global _pc
     if _pc is None:
-        from pinecone import Pinecone
-        _pc = Pinecone(api_key=settings.pinecone_api_key)
+        with _init_locks["pinecone"]:
+            if _pc is None:
+                _pc = providers.pinecone_client()
     return _pc
 
 
 def _get_index():
     global _index
     if _index is None:
-        pc = _get_pinecone()
-        try:
-            if settings.pinecone_host:
-                _index = pc.Index(host=settings.pinecone_host)
-            else:
-                _index = pc.Index(settings.pinecone_index_name)
-        except Exception:
-            pass
+        with _init_locks["index"]:
+            if _index is None:
+                pc = _get_pinecone()
+                try:
+                    if settings.pinecone_host:
+                        _index = providers.pinecone_index(pc, host=settings.pinecone_host)
+                    else:
+                        _index = providers.pinecone_index(pc, name=settings.pinecone_index_name)
+                except Exception:
+                    pass
     return _index
 
 
 def _get_embeddings():
     global _embeddings
     if _embeddings is None:
-        from langchain_google_genai import GoogleGenerativeAIEmbeddings
-        _embeddings = GoogleGenerativeAIEmbeddings(
-            model=settings.embedding_model,
-            google_api_key=settings.google_api_key,
-            task_type="retrieval_document"
-        )
+        with _init_locks["embeddings"]:
+            if _embeddings is None:
+                _embeddings = providers.embeddings_client(task_type="retrieval_document")
     return _embeddings
 
 
+def _bm25_is_stale() -> bool:
+    return _bm25 is None or _bm25.mtime_ns != _mtime_ns(BM25_DIR / PARAMS_FILE)
+
+
 def _get_bm25():
+    """BM25 encoder, reloaded when an ingest (possibly in another worker) refit it."""
     global _bm25
-    if _bm25 is None:
-        from pinecone_text.sparse import BM25Encoder
-        if BM25_PATH.exists():
-            _bm25 = BM25Encoder().load(str(BM25_PATH))
+    if _bm25_is_stale():
+        with _init_locks["bm25"]:
+            if _bm25_is_stale():
+                if BM25Model.exists(BM25_DIR):
+                    _bm25 = BM25Model.load(BM25_DIR)
+                elif BM25_JSON_PATH.exists():
+                    logger.info(f"Converting {BM25_JSON_PATH} to binary BM25 model in {BM25_DIR}")
+                    BM25Model.from_json(BM25_JSON_PATH).save(BM25_DIR)
+                    _bm25 = BM25Model.load(BM25_DIR)
     return _bm25
 
 
-def _get_retriever():
-    global _retriever
-    if _retriever is None:
-        idx = _get_index()
-        bm25 = _get_bm25()
-        if idx is not None and bm25 is not None:
-            from langchain_community.retrievers import PineconeHybridSearchRetriever
-            _retriever = PineconeHybridSearchRetriever(
-                embeddings=_get_embeddings(),
-                sparse_encoder=bm25,
-                index=idx,
-                top_k=settings.top_k,
-                alpha=0.5
-            )
-    return _retriever
+def _store_is_stale(store) -> bool:
+    """Whether a local index was rewritten (possibly by an ingest in another worker) since it was opened."""
+    return store.name == "local" and store.mtime_ns != _mtime_ns(LOCAL_INDEX_DIR / "docs.jsonl")
+
+
+def _get_store():
+    """
+    Vector store for hybrid retrieval, or None until documents have been
+    ingested. A local index is reopened when an ingest rewrote it.
+    """
+    global _store
+    if (_store is None or _store_is_stale(_store)) and _get_bm25() is not None:
+        with _init_locks["store"]:
+            if _store is None or _store_is_stale(_store):
+                from app.services.vectorstore import LocalHybridStore, PineconeStore
+                if settings.vector_backend == "local":
+                    store = LocalHybridStore(LOCAL_INDEX_DIR, dtype=settings.local_index_dtype)
+                    _store = store if store.count() else None
+                else:
+                    idx = _get_index()
+                    if idx is not None:
+                        _store = PineconeStore(idx)
+    return _store
 
 
 def _get_reranker():
     global _reranker
     if _reranker is None:
-        from langchain_cohere import CohereRerank
-        _reranker = CohereRerank(
-            model=settings.rerank_model,
-            cohere_api_key=settings.cohere_api_key,
-            top_n=settings.top_n
-        )
+        with _init_locks["reranker"]:
+            if _reranker is None:
+                _reranker = providers.reranker_client()
     return _reranker
 
 
+def _get_llm():
+    """Gemini model shared across requests (built once, not per request)."""
+    global _llm
+    if _llm is None:
+        with _init_locks["llm"]:
+            if _llm is None:
+                _llm = providers.generative_model()
+    return _llm
+
+
+def _generate(prompt: str) -> str:
+    """Blocking Gemini generation under the provider's in-flight limit."""
+    with providers.gate("gemini").slot():
+        return _get_llm().generate_content(prompt).text
+
+
+def _generate_stream(prompt: str):
+    """Streamed Gemini generation; the provider slot is held until the stream ends."""
+    with providers.gate("gemini").slot():
+        for chunk in _get_llm().generate_content(prompt, stream=True):
+            yield chunk
+
+
+def _mtime_ns(path: Path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _get_citation_index() -> CitationIndex:
+    """Exact citation index, reloaded when an ingest (possibly in another worker) rewrote it."""
+    global _citation_index
+    if _citation_index is None or _citation_index.mtime_ns != _mtime_ns(CITATION_INDEX_PATH):
+        _citation_index = CitationIndex.load(CITATION_INDEX_PATH)
+    return _citation_index
+
+
+def _get_cross_ref_graph() -> CrossReferenceGraph:
+    """Cross-reference graph, reloaded when an ingest rewrote it."""
+    global _cross_ref_graph
+    if _cross_ref_graph is None or _cross_ref_graph.mtime_ns != _mtime_ns(CROSS_REF_GRAPH_PATH):
+        _cross_ref_graph = CrossReferenceGraph.load(CROSS_REF_GRAPH_PATH)
+    return _cross_ref_graph
+
+
+def _encode_query(query: str) -> Tuple[List[float], Dict[str, list]]:
+    """Dense and sparse query vectors, served from the query vector cache when possible."""
+    key = normalize_query(query)
+    # Sparse vectors depend on the BM25 fit, which an ingest replaces
+    cache_key = (_corpus_version.current(), key)
+    vectors = _query_vectors.get(cache_key)
+    if vectors is None:
+        with metrics.span("embedding"):
+            dense = _get_embeddings().embed_query(key)
+        with metrics.span("sparse_encoding"):
+            sparse = _get_bm25().encode_queries(key)
+        vectors = (dense, sparse)
+        _query_vectors.set(cache_key, vectors)
+    return vectors
+
+
+def _encode_queries(keys: List[str]) -> List[Tuple[List[float], Dict[str, list]]]:
+    """
+    Query vectors for many normalized queries: cached ones from the query
+    vector cache, the rest in one batched embedding call and one sparse pass.
+    """
+    version = _corpus_version.current()
+    vectors = [_query_vectors.get((version, key)) for key in keys]
+    missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+    if missing:
+        # The embeddings client uses one task type, so embed_documents matches embed_query
+        with metrics.span("embedding"):
+            dense = _get_embeddings().embed_documents(missing)
+        with metrics.span("sparse_encoding"):
+            sparse = _get_bm25().encode_queries(missing)
+        fresh = dict(zip(missing, zip(dense, sparse)))
+        for key, vector in fresh.items():
+            _query_vectors.set((version, key), vector)
+        vectors = [vector or fresh[key] for key, vector in zip(keys, vectors)]
+    return vectors
+
+
+def _hybrid_query(store, vectors: Tuple[List[float], Dict[str, list]]) -> list:
+    """Alpha-weighted dense + sparse search for precomputed query vectors."""
+    from pinecone_text.hybrid import hybrid_convex_scale
+
+    dense, sparse = hybrid_convex_scale(*vectors, settings.alpha)
+    sparse["values"] = [float(v) for v in sparse["values"]]
+    with metrics.span("vector_query"):
+        return store.query(dense, sparse, settings.top_k)
+
+
+def _hybrid_search(store, query: str) -> list:
+    """Alpha-weighted dense + sparse search using cached query vectors."""
+    return _hybrid_query(store, _encode_query(query))
+
+
+def _retrieval_key(query: str) -> tuple:
+    return _corpus_version.current(), "hybrid", normalize_query(query), settings.top_k, settings.alpha
+
+
+async def _retrieve(store, query: str) -> Tuple[list, bool]:
+    """Hybrid search off the event loop, via the retrieval cache. Returns (docs, cache_hit)."""
+    key = _retrieval_key(query)
+    docs = _retrieval_cache.get(key)
+    if docs is not None:
+        return list(docs), True
+    docs = await run_blocking("retrieval", _hybrid_search, store, query)
+    _retrieval_cache.set(key, tuple(docs))
+    return docs, False
+
+
+# Rerank outcomes whose docs carry Cohere relevance scores
+RERANKED = ("reranked", "cached")
+
+
+def _rerank_key(query_hash: str, doc) -> tuple:
+    return _corpus_version.current(), settings.rerank_model, query_hash, doc.id or fingerprint([doc.page_content])
+
+
+def _by_relevance(docs: list, scores: List[float]) -> list:
+    """Top-n docs by relevance score, as copies carrying ``relevance_score``."""
+    order = sorted(range(len(docs)), key=lambda i: -scores[i])[:settings.top_n]
+    return [Document(id=docs[i].id, page_content=docs[i].page_content,
+                     metadata={**docs[i].metadata, "relevance_score": scores[i]}) for i in order]
+
+
+def _clear_winner(docs: list) -> bool:
+    """Whether the top hybrid score leads the runner-up by at least rerank_skip_margin."""
+    if settings.rerank_skip_margin <= 0 or len(docs) < 2:
+        return False
+    first, second = docs[0].metadata.get("score"), docs[1].metadata.get("score")
+    if first is None or second is None or first <= 0:
+        return False
+    return (first - second) / first >= settings.rerank_skip_margin
+
+
+def _rerank_sync(reranker, query: str, docs: list, keys: List[tuple]) -> List[float]:
+    """Cohere relevance scores for every doc (in input order), stored in the score cache."""
+    scores = [0.0] * len(docs)
+    for result in reranker.rerank(docs, query, top_n=None):
+        scores[result["index"]] = result["relevance_score"]
+    for key, score in zip(keys, scores):
+        _rerank_scores.set(key, score)
+    return scores
+
+
+async def _rerank(query: str, docs: list, deadline: Optional[float] = None) -> Tuple[list, str]:
+    """
+    Cohere rerank within the request's latency budget. Returns (docs, status):
+    "cached" (every score from the score cache), "reranked" (Cohere scored the
+    uncached chunks), "skipped" (hybrid order has a clear winner), "timeout" or
+    "error" (hybrid order), or "disabled" (no reranker). A call that overruns
+    its budget keeps running in the background and still fills the score cache.
+    """
+    reranker = _get_reranker()
+    if not docs or not reranker:
+        return docs, "disabled"
+
+    query_hash = fingerprint([normalize_query(query)])
+    keys = [_rerank_key(query_hash, doc) for doc in docs]
+    scores = [_rerank_scores.get(key) for key in keys]
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if not missing:
+        return _by_relevance(docs, scores), "cached"
+    if _clear_winner(docs):
+        return docs[:settings.top_n], "skipped"
+
+    timeout = settings.rerank_timeout
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+    if timeout <= 0:
+        return docs[:settings.top_n], "timeout"
+
+    call = asyncio.ensure_future(run_blocking(
+        "rerank", _rerank_sync, reranker, query, [docs[i] for i in missing], [keys[i] for i in missing]))
+    call.add_done_callback(lambda done: done.cancelled() or done.exception())
+    try:
+        with metrics.span("rerank"):
+            fresh = await asyncio.wait_for(asyncio.shield(call), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Rerank exceeded its {timeout:.2f}s budget; using hybrid order")
+        return docs[:settings.top_n], "timeout"
+    except Exception as e:
+        logger.error(f"Rerank failed ({type(e).__name__}: {e}); using hybrid order")
+        return docs[:settings.top_n], "error"
+    for i, score in zip(missing, fresh):
+        scores[i] = score
+    return _by_relevance(docs, scores), "reranked"
+
+
+async def _retrieve_reranked(store, query: str) -> Tuple[list, str, bool]:
+    """
+    Retrieve and rerank, caching the final ranking unless reranking fell back
+    to hybrid order. Returns (docs, rerank status, cache_hit).
+    """
+    deadline = time.monotonic() + settings.rerank_latency_budget
+    key = (_corpus_version.current(), "reranked", normalize_query(query),
+           settings.top_k, settings.alpha, settings.top_n)
+    cached = _retrieval_cache.get(key)
+    if cached is not None:
+        docs, rerank = cached
+        return list(docs), rerank, True
+    docs, _ = await _retrieve(store, query)
+    docs, rerank = await _rerank(query, docs, deadline)
+    if rerank not in ("timeout", "error"):
+        _retrieval_cache.set(key, (tuple(docs), rerank))
+    return docs, rerank, False
+
+
+async def _citation_lookup(store, query: str) -> Tuple[list, bool]:
+    """
+    Chunks matching the statute or case citations in a query, from the exact
+    citation index. Returns (docs, citation_only); citation_only means the
+    query had no words besides its citations.
+    """
+    if settings.citation_max_hits <= 0:
+        return [], False
+    keys, citation_only = parse_citation_query(query)
+    if not keys:
+        return [], False
+    with metrics.span("citation_lookup"):
+        ids = _get_citation_index().lookup(keys, settings.citation_max_hits)
+        if not ids:
+            return [], False
+        docs = await _fetch(store, ids, "citation", relevance_score=1.0)
+    return docs, citation_only
+
+
+async def _fetch(store, ids: List[str], match: str, **metadata) -> list:
+    """Chunks by ID via the retrieval cache, tagged with how they were matched."""
+    key = (_corpus_version.current(), match, tuple(ids))
+    docs = _retrieval_cache.get(key)
+    if docs is None:
+        docs = tuple(await run_blocking("retrieval", store.fetch, ids))
+        for doc in docs:
+            doc.metadata.update(metadata, match=match)
+        _retrieval_cache.set(key, docs)
+    return list(docs)
+
+
+async def _expand_cross_references(store, docs: list) -> list:
+    """
+    Chunks referenced by the retrieved ones, from the precomputed graph:
+    bounded by hops, fan-out per chunk, chunk count and a character budget.
+    """
+    if settings.cross_ref_hops <= 0 or settings.cross_ref_max_chunks <= 0 or not docs:
+        return []
+    with metrics.span("cross_references"):
+        ids = _get_cross_ref_graph().expand(
+            [doc.id for doc in docs if doc.id],
+            hops=settings.cross_ref_hops,
+            fan_out=settings.cross_ref_fan_out,
+            limit=settings.cross_ref_max_chunks
+        )
+        fetched = await _fetch(store, ids, "cross_reference", is_cross_reference=True) if ids else []
+    linked = []
+    budget = settings.cross_ref_max_chars
+    for doc in fetched:
+        if len(doc.page_content) > budget:
+            break
+        budget -= len(doc.page_content)
+        linked.append(doc)
+    return linked
+
+
+def _merge_exact(exact: list, docs: list, limit: int) -> list:
+    """Exact citation matches first, then semantic results not already included."""
+    seen = {doc.id for doc in exact}
+    return (exact + [doc for doc in docs if doc.id not in seen])[:max(limit, len(exact))]
+
+
+async def _retrieve_for_answer(store, query: str) -> Tuple[list, str, bool, int]:
+    """
+    Context for chat: citation-only queries are answered from the citation
+    index alone; otherwise exact matches are merged ahead of the reranked
+    hybrid results. Chunks they cross-reference are appended from the graph.
+    Returns (docs, rerank status, cache_hit, exact_matches).
+    """
+    exact, citation_only = await _citation_lookup(store, query)
+    if exact and citation_only:
+        docs, rerank, retrieval_hit = exact, "skipped", False
+    else:
+        docs, rerank, retrieval_hit = await _retrieve_reranked(store, query)
+        docs = _merge_exact(exact, docs, settings.top_n)
+    docs = docs + await _expand_cross_references(store, docs)
+    return docs, rerank, retrieval_hit, len(exact)
+
+
+async def _retrieve_follow_up(store, plan: TurnPlan) -> Tuple[list, str, bool, int]:
+    """
+    Context for a follow-up: the previous turn's chunks, extended by up to
+    session_followup_chunks new hybrid results for the condensed query. The
+    reused chunks were already reranked, so there is no rerank call. A plan
+    to confirm falls back to full retrieval when the new results share no
+    chunk with the previous context.
+    """
+    docs = [doc for doc in plan.previous if not doc.metadata.get("is_cross_reference")]
+    retrieval_hit = False
+    if plan.confirm or settings.session_followup_chunks > 0:
+        fresh, retrieval_hit = await _retrieve(store, plan.standalone)
+        seen = {doc.id for doc in docs}
+        if plan.confirm and not any(doc.id in seen for doc in fresh):
+            # Unrelated to the previous turn: answer it as a standalone question
+            return await _retrieve_for_answer(store, plan.standalone)
+        docs += [doc for doc in fresh if doc.id not in seen][:settings.session_followup_chunks]
+    docs = docs + await _expand_cross_references(store, docs)
+    return docs, "reused", retrieval_hit, 0
+
+
+def _score(doc, idx: int, reranked: bool) -> float:
+    """Reranker or exact-match relevance score, otherwise an estimate based on position."""
+    if reranked or doc.metadata.get("match") == "citation":
+        return doc.metadata.get("relevance_score", 0.5)
+    return max(0.9 - (idx * 0.1), 0.1)  # Decreasing score by position
+
+
+def _answer_key(query: str, docs: list, conversation: str = "") -> tuple:
+    """Answer cache key: same question over the same retrieved context and conversation."""
+    context_ids = (doc.id or fingerprint([doc.page_content]) for doc in docs)
+    return _corpus_version.current(), normalize_query(query), fingerprint(context_ids), fingerprint([conversation])
+
+
+def bump_corpus_version() -> int:
+    """Invalidate retrieval and answer caches after the corpus changes."""
+    version = _corpus_version.bump()
+    _retrieval_cache.clear()
+    _answer_cache.clear()
+    logger.info(f"Corpus version bumped to {version}")
+    return version
+
+
 def format_docs(docs) -> str:
-    if not docs:
-        return "No relevant documents found."
-    formatted = []
-    for doc in docs:
-        source = doc.metadata.get('source', 'Unknown Source')
-        formatted.append(f"[Source: {source}]\n{doc.page_content}")
-    return "\n\n---\n\n".join(formatted)
+    return unpacked_context(docs)
+
+
+def _pack_context(docs: list) -> PackedContext:
+    """Prompt context: overlapping chunks merged, near-duplicates dropped, packed into the token budget."""
+    with metrics.span("context_packing"):
+        return pack_context(docs, settings.context_max_tokens, settings.context_dedup_threshold)
+
+
+def _sources(docs: list, packed: PackedContext, reranked: bool) -> List[Dict[str, Any]]:
+    """Sources for the chunks the model was shown (not those packing dropped or left out)."""
+    return [{
+        "id": str(i),
+        "text": docs[i].page_content[:500],
+        "metadata": format_source_metadata(docs[i].metadata),
+        "score": _score(docs[i], i, reranked)
+    } for i in packed.included]
 
 
 def format_source_metadata(metadata: dict) -> dict:
@@ -196,293 +611,632 @@ def format_source_metadata(metadata: dict) -> dict:
         "cases_cited": metadata.get('cases_cited', []),
         "is_sensitive": metadata.get('is_sensitive', False),
         "sensitive_topic": metadata.get('sensitive_topic'),
+        "is_cross_reference": metadata.get('is_cross_reference'),
     }
 
     # Remove None values to keep response clean
     return {k: v for k, v in formatted.items() if v is not None}
 
 
-async def chat(query: str, history: list = None) -> Dict[str, Any]:
-    """RAG chat pipeline with hybrid search and Cohere v4.0 reranking."""
-    retriever = _get_retriever()
-
-    if retriever is None:
+def _flight_key(kind: str, query: str, plan: TurnPlan) -> tuple:
+    """Identity of a chat request: normalized query and conversation plus the settings that shape the answer."""
+    return (kind, _corpus_version.current(), normalize_query(query), plan.fingerprint,
+            settings.top_k, settings.top_n, settings.alpha, settings.rerank_model, settings.llm_model)
+
+
+async def chat(query: str, history: list = None, session_id: str = None) -> Dict[str, Any]:
+    """
+    RAG chat pipeline within a session (a new one, seeded from ``history``,
+    if ``session_id`` is unknown). The response carries the session's ID
+    unless it is a throwaway one (see SessionStore.open). Concurrent
+    identical requests are coalesced.
+    """
+    with metrics.trace("chat") as request:
+        session = _sessions.open(session_id, history)
+        version = _corpus_version.current()
+        plan = session.plan(query, version)
+        # A profiled request runs its own pipeline rather than waiting on another's
+        if settings.coalesce_requests and not profiling.active():
+            (result, docs, answer), shared = await _inflight.do(_flight_key("chat", query, plan),
+                                                                lambda: _chat(query, plan))
+        else:
+            (result, docs, answer), shared = await _chat(query, plan), False
+        if shared and "cache" in result:
+            result = {**result, "cache": {**result["cache"], "coalesced": True}}
+        if answer is not None:
+            session.record(query, plan, answer, docs, version)
+            _sessions.save(session)
+        if session.keep:
+            # Throwaway sessions get no ID: sending it back would find nothing
+            result = {**result, "session_id": session.id}
+        if settings.response_timings:
+            # Coalesced followers only see their own wait; stages are on the leader's trace
+            result["timings"] = request.timings()
+        return result
+
+
+def end_session(session_id: str) -> bool:
+    """Forget a session's conversation state. Returns False if it was unknown or expired."""
+    return _sessions.end(session_id)
+
+
+async def _chat(query: str, plan: TurnPlan) -> Tuple[Dict[str, Any], list, Optional[str]]:
+    """
+    RAG chat pipeline with hybrid search and Cohere v4.0 reranking.
+    Returns (response, context docs, answer) so the caller can record the turn.
+    """
+    store = _get_store()
+
+    if store is None:
         return {
             "answer": "Vector database not initialized. Please run /api/ingest first to process documents.",
             "sources": [],
             "confidence": "low",
             "is_sensitive": False,
             "disclaimer": "This is legal information, not legal advice."
-        }
-
-    docs = retriever.invoke(query)
-
-    reranker = _get_reranker()
-    reranked = False
-    if docs and reranker:
-        docs = reranker.compress_documents(documents=docs, query=query)
-        reranked = True
-
-    context = format_docs(docs)
-    model = genai.GenerativeModel(settings.llm_model)
-    response = model.generate_content(SYSTEM_PROMPT.format(context=context, query=query))
-
-    # Get scores - reranker adds relevance_score, otherwise estimate based on position
-    def get_score(doc, idx):
-        if reranked:
-            return doc.metadata.get("relevance_score", 0.5)
-        return max(0.9 - (idx * 0.1), 0.1)  # Decreasing score by position
+        }, [], None
+
+    if plan.follow_up:
+        docs, rerank, retrieval_hit, exact = await _retrieve_follow_up(store, plan)
+    else:
+        docs, rerank, retrieval_hit, exact = await _retrieve_for_answer(store, plan.standalone)
+    reranked = rerank in RERANKED
+
+    packed = _pack_context(docs)
+    answer_key = _answer_key(query, docs, plan.conversation)
+    answer = _answer_cache.get(answer_key)
+    answer_hit = answer is not None
+    if answer is None:
+        prompt = SYSTEM_PROMPT.format(context=packed.text, conversation=plan.conversation, query=query)
+        with metrics.span("generation"):
+            answer = await run_blocking("generation", _generate, prompt)
+        _answer_cache.set(answer_key, answer)
 
     confidence = "low"
     if docs:
-        top_score = get_score(docs[0], 0)
+        top_score = _score(docs[0], 0, reranked)
         confidence = "high" if top_score > 0.8 else "medium" if top_score > 0.5 else "low"
 
-    sources = [{
-        "id": str(i),
-        "text": doc.page_content[:500],
-        "metadata": format_source_metadata(doc.metadata),
-        "score": get_score(doc, i)
-    } for i, doc in enumerate(docs)]
+    sources = _sources(docs, packed, reranked)
 
     return {
-        "answer": response.text + "\n\n---\nThis is legal information, not legal advice.",
+        "answer": answer + "\n\n---\nThis is legal information, not legal advice.",
         "sources": sources,
         "confidence": confidence,
         "is_sensitive": False,
-        "disclaimer": "This is legal information, not legal advice."
-    }
-
-
-async def chat_stream(query: str, history: list = None) -> AsyncGenerator[Dict[str, Any], None]:
-    """Streaming RAG chat with SSE."""
-    retriever = _get_retriever()
-
-    if retriever is None:
+        "disclaimer": "This is legal information, not legal advice.",
+        "cache": {"retrieval": retrieval_hit, "answer": answer_hit, "coalesced": False},
+        "citations": exact,
+        "rerank": rerank,
+        "context": packed.report()
+    }, docs, answer
+
+
+async def chat_stream(query: str, history: list = None, session_id: str = None) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Streaming RAG chat within a session. Concurrent identical requests
+    subscribe to one upstream stream, so they share a retrieval and a generation.
+    """
+    with metrics.trace("chat_stream") as request:
+        session = _sessions.open(session_id, history)
+        version = _corpus_version.current()
+        plan = session.plan(query, version)
+        if settings.coalesce_requests:
+            events, shared = _inflight.stream(_flight_key("stream", query, plan), lambda: _chat_stream(query, plan))
+        else:
+            events, shared = _chat_stream(query, plan), False
+        async with aclosing(events):
+            async for event in events:
+                if event["type"] == "turn":
+                    session.record(query, plan, event["answer"], event["docs"], version)
+                    _sessions.save(session)
+                    continue
+                if event["type"] == "metadata":
+                    data = dict(event["data"])
+                    if session.keep:
+                        data["session_id"] = session.id
+                    if shared:
+                        data["cache"] = {**data["cache"], "coalesced": True}
+                    event = {**event, "data": data}
+                if event["type"] == "done" and settings.response_timings:
+                    yield {"type": "timings", "data": request.timings()}
+                yield event
+
+
+async def _chat_stream(query: str, plan: TurnPlan) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Streaming RAG chat with SSE. Ends with an internal "turn" event (the
+    context docs and full answer) that chat_stream() consumes.
+    """
+    store = _get_store()
+
+    if store is None:
         yield {"type": "content", "data": "Vector database not initialized. Please run /api/ingest first."}
         yield {"type": "done"}
         return
 
-    docs = retriever.invoke(query)
+    if plan.follow_up:
+        docs, rerank, retrieval_hit, exact = await _retrieve_follow_up(store, plan)
+    else:
+        docs, rerank, retrieval_hit, exact = await _retrieve_for_answer(store, plan.standalone)
+    reranked = rerank in RERANKED
+    packed = _pack_context(docs)
+    answer_key = _answer_key(query, docs, plan.conversation)
+    answer = _answer_cache.get(answer_key)
 
-    reranker = _get_reranker()
-    reranked = False
-    if docs and reranker:
-        docs = reranker.compress_documents(documents=docs, query=query)
-        reranked = True
-
-    # Get scores - reranker adds relevance_score, otherwise estimate based on position
-    def get_score(doc, idx):
-        if reranked:
-            return doc.metadata.get("relevance_score", 0.5)
-        return max(0.9 - (idx * 0.1), 0.1)
-
-    sources = [{
-        "id": str(i),
-        "text": doc.page_content[:500],
-        "metadata": format_source_metadata(doc.metadata),
-        "score": get_score(doc, i)
-    } for i, doc in enumerate(docs)]
-    yield {"type": "sources", "data": sources}
+    yield {"type": "sources", "data": _sources(docs, packed, reranked)}
 
     confidence = "low"
     if docs:
-        top_score = get_score(docs[0], 0)
+        top_score = _score(docs[0], 0, reranked)
         confidence = "high" if top_score > 0.8 else "medium" if top_score > 0.5 else "low"
-    yield {"type": "metadata", "data": {"confidence": confidence, "is_sensitive": False}}
+    yield {"type": "metadata", "data": {
+        "confidence": confidence,
+        "is_sensitive": False,
+        "cache": {"retrieval": retrieval_hit, "answer": answer is not None, "coalesced": False},
+        "citations": exact,
+        "rerank": rerank,
+        "context": packed.report()
+    }}
+
+    if answer is not None:
+        yield {"type": "content", "data": answer}
+        yield {"type": "turn", "docs": docs, "answer": answer}
+        yield {"type": "done"}
+        return
 
-    context = format_docs(docs)
-    model = genai.GenerativeModel(settings.llm_model)
-    for chunk in model.generate_content(SYSTEM_PROMPT.format(context=context, query=query), stream=True):
+    prompt = SYSTEM_PROMPT.format(context=packed.text, conversation=plan.conversation, query=query)
+    parts = []
+    start = time.perf_counter()
+    # Token waits happen on a producer thread; the bounded queue applies backpressure
+    async for chunk in iterate_in_thread("generation", lambda: _generate_stream(prompt)):
         if chunk.text:
+            if not parts:
+                metrics.record("first_token", time.perf_counter() - start)
+            parts.append(chunk.text)
             yield {"type": "content", "data": chunk.text}
+    metrics.record("generation", time.perf_counter() - start)
+    # Only complete streams are cached (and recorded in the session)
+    answer = "".join(parts)
+    _answer_cache.set(answer_key, answer)
 
+    yield {"type": "turn", "docs": docs, "answer": answer}
     yield {"type": "done"}
 
 
 async def search(query: str, top_k: int = 10, filters: dict = None) -> Dict[str, Any]:
     """Direct hybrid search without LLM generation."""
-    retriever = _get_retriever()
-    if retriever is None:
-        return {"results": [], "query": query}
+    with metrics.trace("search") as request:
+        store = _get_store()
+        if store is None:
+            return {"results": [], "query": query}
+
+        exact, citation_only = await _citation_lookup(store, query)
+        if exact and citation_only:
+            docs, retrieval_hit = exact[:top_k], False
+        else:
+            docs, retrieval_hit = await _retrieve(store, query)
+            docs = _merge_exact(exact[:top_k], docs, top_k)
+        result = _search_response(query, docs, exact[:top_k], retrieval_hit)
+        if settings.response_timings:
+            result["timings"] = request.timings()
+        return result
 
-    docs = retriever.invoke(query)[:top_k]
 
-    # Estimate scores based on position (no reranker for search)
+def _search_response(query: str, docs: list, exact: list, retrieval_hit: bool) -> Dict[str, Any]:
+    # Exact citation matches score 1.0; otherwise estimate based on position (no reranker for search)
     results = [{
         "id": str(i),
         "text": doc.page_content,
         "metadata": format_source_metadata(doc.metadata),
-        "score": max(0.9 - (i * 0.05), 0.1)
+        "score": doc.metadata["relevance_score"] if doc.metadata.get("match") == "citation"
+        else max(0.9 - (i * 0.05), 0.1)
     } for i, doc in enumerate(docs)]
 
-    return {"results": results, "query": query}
+    return {"results": results, "query": query, "cache": {"retrieval": retrieval_hit},
+            "citations": len(exact)}
+
+
+async def search_many(queries: List[str], top_k: int = 10) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Search for many queries at once, yielding each result (tagged with its
+    position in ``queries``) as soon as it is ready. Citation-only queries and
+    retrieval cache hits come first; the rest share one batched embedding
+    call and run their index queries concurrently, at most
+    search_batch_concurrency at a time. A failed query yields an error entry
+    instead of failing the batch.
+    """
+    with metrics.trace("search_batch"):
+        store = _get_store()
+        if store is None:
+            for i, query in enumerate(queries):
+                yield {"index": i, "results": [], "query": query}
+            return
+
+        lookups = await asyncio.gather(*(_citation_lookup(store, query) for query in queries),
+                                       return_exceptions=True)
+        pending = []
+        for i, (query, lookup) in enumerate(zip(queries, lookups)):
+            if isinstance(lookup, Exception):
+                logger.error(f"Citation lookup failed for batch query {i}: {lookup}")
+                yield {"index": i, "query": query, "results": [], "error": str(lookup)}
+                continue
+            exact, citation_only = lookup
+            exact = exact[:top_k]
+            if exact and citation_only:
+                yield {"index": i, **_search_response(query, exact, exact, False)}
+                continue
+            docs = _retrieval_cache.get(_retrieval_key(query))
+            if docs is not None:
+                yield {"index": i, **_search_response(query, _merge_exact(exact, list(docs), top_k), exact, True)}
+                continue
+            pending.append((i, query, exact))
+        if not pending:
+            return
+
+        # Duplicate queries in a batch share one index query
+        groups: Dict[str, list] = {}
+        for entry in pending:
+            groups.setdefault(normalize_query(entry[1]), []).append(entry)
+
+        try:
+            vectors = await run_blocking("retrieval", _encode_queries, list(groups))
+        except Exception as e:
+            logger.error(f"Batch query encoding failed: {e}")
+            for i, query, _ in pending:
+                yield {"index": i, "query": query, "results": [], "error": str(e)}
+            return
+
+        fan_out = asyncio.Semaphore(max(1, settings.search_batch_concurrency))
+
+        async def run(entries: list, query_vectors) -> List[Dict[str, Any]]:
+            try:
+                async with fan_out:
+                    docs = await run_blocking("retrieval", _hybrid_query, store, query_vectors)
+            except Exception as e:
+                return [{"index": i, "query": query, "results": [], "error": str(e)} for i, query, _ in entries]
+            _retrieval_cache.set(_retrieval_key(entries[0][1]), tuple(docs))
+            return [{"index": i, **_search_response(query, _merge_exact(exact, docs, top_k), exact, False)}
+                    for i, query, exact in entries]
+
+        tasks = [asyncio.ensure_future(run(entries, query_vectors))
+                 for entries, query_vectors in zip(groups.values(), vectors)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for result in await next_done:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the in-process caches."""
+    return {
+        "corpus_version": _corpus_version.current(),
+        "query_vectors": _query_vectors.stats(),
+        "retrieval": _retrieval_cache.stats(),
+        "answers": _answer_cache.stats(),
+        "rerank_scores": _rerank_scores.stats(),
+        "coalescing": _inflight.stats(),
+        "sessions": _sessions.stats(),
+    }
+
+
+def get_metrics() -> str:
+    """Prometheus exposition: stage latency histograms, cache counters, in-flight gauges."""
+    stats = get_cache_stats()
+    caches = {name: entry for name, entry in stats.items() if isinstance(entry, dict) and "hits" in entry}
+
+    def per_cache(field: str):
+        return [({"cache": name}, entry[field]) for name, entry in caches.items()]
+
+    gates = providers.provider_stats()
+
+    def per_provider(field: str):
+        return [({"provider": name}, entry[field]) for name, entry in gates.items()]
+
+    coalescing = stats["coalescing"]
+    return metrics.render([
+        metrics.family("rag_cache_hits_total", "counter", "Cache hits.", per_cache("hits")),
+        metrics.family("rag_cache_misses_total", "counter", "Cache misses.", per_cache("misses")),
+        metrics.family("rag_cache_evictions_total", "counter", "LRU evictions.", per_cache("evictions")),
+        metrics.family("rag_cache_entries", "gauge", "Entries in each cache.", per_cache("size")),
+        metrics.family("rag_cache_hit_ratio", "gauge", "Hits over lookups since start.", per_cache("hit_rate")),
+        metrics.family("rag_corpus_version", "gauge", "Current corpus version.", [({}, stats["corpus_version"])]),
+        metrics.family("rag_coalescing_in_flight", "gauge", "Chat pipelines in flight.",
+                       [({}, coalescing["in_flight"])]),
+        metrics.family("rag_coalescing_leaders_total", "counter", "Chat requests that ran the pipeline.",
+                       [({}, coalescing["leaders"])]),
+        metrics.family("rag_coalesced_requests_total", "counter", "Chat requests served by an identical one.",
+                       [({}, coalescing["coalesced"])]),
+        metrics.family("rag_provider_in_flight", "gauge", "Provider calls in flight.", per_provider("in_flight")),
+        metrics.family("rag_provider_waiting", "gauge", "Callers queued for a provider slot.",
+                       per_provider("waiting")),
+        metrics.family("rag_provider_limit", "gauge", "Max in-flight calls per provider.", per_provider("limit")),
+        metrics.family("rag_provider_calls_total", "counter", "Provider calls.", per_provider("calls")),
+        metrics.family("rag_provider_errors_total", "counter", "Failed provider calls.", per_provider("errors")),
+        metrics.family("rag_provider_queue_wait_seconds_total", "counter", "Time spent queued for a provider slot.",
+                       per_provider("wait_seconds_total")),
+    ])
 
 
 async def get_sources() -> Dict[str, Any]:
     """Get index statistics."""
-    idx = _get_index()
-    if idx is None:
+    store = _get_store()
+    if store is None:
         return {"sources": [], "total_chunks": 0, "last_ingestion": None}
 
-    stats = idx.describe_index_stats()
     return {
         "sources": [],
-        "total_chunks": stats.get("total_vector_count", 0),
-        "last_ingestion": None
+        "total_chunks": await run_blocking("retrieval", store.count),
+        "last_ingestion": None,
+        "backend": store.name
+    }
+
+
+def _chunk_id(source_key: str, text: str) -> str:
+    """Chunk ID derived from the source file and chunk content (stable across re-ingests)."""
+    return hashlib.sha256(f"{source_key}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _scan_data_dir() -> Dict[str, Path]:
+    """Supported source files under DATA_DIR, keyed by path relative to DATA_DIR."""
+    return {
+        file_path.relative_to(DATA_DIR).as_posix(): file_path
+        for file_path in sorted(DATA_DIR.rglob("*"))
+        if file_path.is_file() and file_path.suffix.lower() in SUPPORTED_SUFFIXES
     }
 
 
-async def ingest_documents() -> Dict[str, Any]:
-    """Ingest documents into Pinecone with hybrid search support."""
-    global _bm25, _retriever, _index
+def _open_store_for_ingest() -> Tuple[Any, bool]:
+    """
+    Vector store to ingest into, as (store, is_empty).
+    The existing index keeps serving; a Pinecone index is only created when it
+    is missing, or recreated when its metric/dimension cannot serve hybrid search.
+    """
+    global _index
+    from app.services.vectorstore import LocalHybridStore, PineconeStore
+
+    if settings.vector_backend == "local":
+        store = LocalHybridStore(LOCAL_INDEX_DIR, dtype=settings.local_index_dtype)
+        return store, store.count() == 0
+
+    from pinecone import ServerlessSpec
+
+    logger.info("Connecting to Pinecone...")
+    pc = _get_pinecone()
+    index_name = settings.pinecone_index_name
+    existing_indexes = {idx['name']: idx for idx in pc.list_indexes()}
+    logger.info(f"Existing indexes: {list(existing_indexes)}")
+
+    description = existing_indexes.get(index_name)
+    if description is not None and (description['metric'] != "dotproduct" or description['dimension'] != EMBEDDING_DIM):
+        logger.warning(f"Index {index_name} cannot serve hybrid search "
+                       f"({description['metric']}, {description['dimension']}d); recreating it")
+        pc.delete_index(index_name)
+        description = None
+
+    created = description is None
+    if created:
+        # dotproduct metric is required for sparse vectors in hybrid search
+        logger.info(f"Creating new index: {index_name} with dotproduct metric")
+        pc.create_index(
+            name=index_name,
+            dimension=EMBEDDING_DIM,
+            metric="dotproduct",
+            spec=ServerlessSpec(cloud=settings.pinecone_cloud, region=settings.pinecone_region)
+        )
+        deadline = time.monotonic() + INDEX_READY_TIMEOUT
+        while not pc.describe_index(index_name).status['ready']:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Index {index_name} not ready after {INDEX_READY_TIMEOUT}s")
+            time.sleep(1)
+
+    _index = providers.pinecone_index(pc, name=index_name)
+    logger.info(f"Connected to index: {index_name}")
+    return PineconeStore(_index), created
+
+
+def _encode_documents(texts: List[str]) -> Tuple[list, list]:
+    """Dense embeddings and BM25 sparse vectors for a batch of chunk texts."""
+    # Runs on ingest worker threads, outside the ingest trace, so the operation is explicit
+    with metrics.span("embedding", operation="ingest"):
+        dense = _get_embeddings().embed_documents(texts)
+    with metrics.span("sparse_encoding", operation="ingest"):
+        sparse = _bm25.encode_documents(texts)
+    return dense, sparse
+
+
+def _with_retry(fn, *args, **kwargs):
+    """Provider call with backoff on rate limits and transient errors."""
+    return call_with_retry(fn, *args, attempts=settings.ingest_max_retries,
+                           base_delay=settings.ingest_retry_base_delay, **kwargs)
+
+
+def _ingest_sync(full: bool) -> Dict[str, Any]:
+    global _bm25, _store, _citation_index, _cross_ref_graph
 
     logger.info("Starting document ingestion...")
 
     try:
-        from pinecone import Pinecone, ServerlessSpec
-        from pinecone_text.sparse import BM25Encoder
-        from langchain_community.retrievers import PineconeHybridSearchRetriever
-        from langchain_community.document_loaders import PyPDFDirectoryLoader, TextLoader
-        from langchain_text_splitters import RecursiveCharacterTextSplitter
-
         if not DATA_DIR.exists():
             DATA_DIR.mkdir(parents=True)
             logger.error("Data folder created but is empty")
             return {"status": "error", "message": "Data folder created but is empty."}
 
-        logger.info(f"Loading documents from {DATA_DIR}")
-
-        # Load documents recursively
-        docs = []
-        try:
-            pdf_loader = PyPDFDirectoryLoader(str(DATA_DIR), recursive=True)
-            pdf_docs = pdf_loader.load()
-            docs.extend(pdf_docs)
-            logger.info(f"Loaded {len(pdf_docs)} PDF documents")
-        except Exception as e:
-            logger.error(f"PDF loading error: {e}")
-
-        for txt_file in DATA_DIR.rglob("*.txt"):
-            try:
-                txt_docs = TextLoader(str(txt_file)).load()
-                docs.extend(txt_docs)
-                logger.info(f"Loaded {txt_file.name}")
-            except Exception as e:
-                logger.error(f"Error loading {txt_file}: {e}")
-
-        for md_file in DATA_DIR.rglob("*.md"):
-            try:
-                md_docs = TextLoader(str(md_file)).load()
-                docs.extend(md_docs)
-                logger.info(f"Loaded {md_file.name}")
-            except Exception as e:
-                logger.error(f"Error loading {md_file}: {e}")
-
-        if not docs:
+        files = _scan_data_dir()
+        if not files:
             logger.error("No documents found")
             return {"status": "error", "message": "No documents found in data directory"}
 
-        logger.info(f"Total documents loaded: {len(docs)}")
-
-        # Extract legal metadata from documents before chunking
-        logger.info("Extracting legal metadata from documents...")
-        for doc in docs:
-            legal_meta = extract_legal_metadata(doc.page_content, doc.metadata.get('source', ''))
-            # Merge legal metadata with existing metadata
-            doc.metadata.update(legal_meta)
-        logger.info(f"Legal metadata extracted for {len(docs)} documents")
-
-        # Split documents with legal-aware separators
-        logger.info("Splitting documents into chunks...")
-        # Enhanced separators that respect legal structure
-        legal_separators = [
-            "\n\n\n",  # Major section breaks
-            "\n\n",    # Paragraph breaks
-            "\n",      # Line breaks
-            ". ",      # Sentences
-            " ",       # Words
-            ""         # Characters
-        ]
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.chunk_size,
-            chunk_overlap=settings.chunk_overlap,
-            length_function=len,
-            separators=legal_separators
-        )
-        chunks = text_splitter.split_documents(docs)
-
-        # Extract legal metadata for each chunk (for more granular analysis)
-        logger.info("Enriching chunk metadata...")
-        for chunk in chunks:
-            if chunk.page_content:
-                # Re-extract metadata at chunk level for better granularity
-                chunk_legal_meta = extract_legal_metadata(chunk.page_content, chunk.metadata.get('source', ''))
-                # Preserve parent metadata, only update with chunk-specific info
-                for key, value in chunk_legal_meta.items():
-                    if value and (key not in chunk.metadata or not chunk.metadata[key]):
-                        chunk.metadata[key] = value
-
-        texts = [chunk.page_content for chunk in chunks]
-        logger.info(f"Created {len(chunks)} chunks with enriched legal metadata")
-
-        # Fit BM25 encoder
-        logger.info("Fitting BM25 encoder...")
-        _bm25 = BM25Encoder()
-        _bm25.fit(texts)
-        BM25_PATH.parent.mkdir(parents=True, exist_ok=True)
-        _bm25.dump(str(BM25_PATH))
-        logger.info(f"BM25 encoder saved to {BM25_PATH}")
-
-        # Create or get Pinecone index
-        logger.info("Connecting to Pinecone...")
-        pc = _get_pinecone()
-        index_name = settings.pinecone_index_name
-        existing_indexes = [idx['name'] for idx in pc.list_indexes()]
-        logger.info(f"Existing indexes: {existing_indexes}")
-
-        import time
-
-        # Delete existing index if it exists (to ensure correct config for hybrid search)
-        if index_name in existing_indexes:
-            logger.info(f"Deleting existing index: {index_name} to recreate with correct hybrid search config")
-            pc.delete_index(index_name)
-            time.sleep(5)
-
-        # Create new index with dotproduct metric (required for hybrid search)
-        logger.info(f"Creating new index: {index_name} with dotproduct metric")
-        pc.create_index(
-            name=index_name,
-            dimension=768,  # Gemini text-embedding-004 dimension
-            metric="dotproduct",  # Required for sparse vectors in hybrid search
-            spec=ServerlessSpec(cloud="aws", region="us-east-1")
+        manifest = IngestManifest.load(MANIFEST_PATH)
+        citations = CitationIndex.load(CITATION_INDEX_PATH)
+        store, store_empty = _open_store_for_ingest()
+        # Without a manifest (or with an empty store) nothing is known to be indexed
+        bootstrap = not manifest.files or store_empty
+        if bootstrap:
+            manifest.files.clear()
+            citations.clear()
+        if manifest.files and not (CITATION_INDEX_PATH.exists() and CROSS_REF_GRAPH_PATH.exists()):
+            # Indexed before the citation index / graph existed: rebuild them from every file
+            logger.info("Citation index or cross-reference graph missing; re-ingesting all files")
+            full = True
+        chunking = f"{settings.chunking_strategy}:{settings.chunk_size}:{settings.chunk_overlap}"
+        if manifest.chunking != chunking and manifest.files:
+            # Chunk boundaries changed, so every file has to be re-chunked
+            logger.info(f"Chunking changed ({manifest.chunking or 'unknown'} -> {chunking}); re-ingesting all files")
+            full = True
+        manifest.chunking = chunking
+        bm25 = _get_bm25()
+        if bm25 is not None and bm25.tokenizer_name != settings.sparse_tokenizer and manifest.files:
+            # Sparse vectors must be re-encoded with the new tokenizer
+            logger.info(f"Sparse tokenizer changed ({bm25.tokenizer_name} -> {settings.sparse_tokenizer}); "
+                        f"re-ingesting all files")
+            full = True
+        full = full or bootstrap or bm25 is None
+
+        with metrics.span("scan"):
+            current = {rel: manifest.fingerprint(rel, path) for rel, path in files.items()}
+        changed = [rel for rel in files if full or manifest.is_changed(rel, current[rel])]
+        removed = [rel for rel in manifest.files if rel not in files]
+        logger.info(f"{len(changed)} new or changed, {len(removed)} removed, "
+                    f"{len(files) - len(changed)} unchanged files (full={full})")
+
+        if not changed and not removed:
+            return {
+                "status": "success",
+                "message": "Index already up to date",
+                "documents_loaded": 0,
+                "chunks_created": 0,
+                "files_updated": 0,
+                "files_removed": 0,
+                "files_unchanged": len(files),
+                "backend": store.name
+            }
+
+        # Stage 1: parse, chunk and enrich new or changed files in worker processes
+        workers = settings.ingest_workers or os.cpu_count() or 1
+        results = process_files(
+            {rel: files[rel] for rel in changed},
+            settings.chunk_size,
+            settings.chunk_overlap,
+            workers=workers,
+            strategy=settings.chunking_strategy
         )
 
-        # Wait for index to be ready
-        logger.info("Waiting for index to be ready...")
-        time.sleep(15)
-
-        _index = pc.Index(index_name)
-        logger.info(f"Connected to index: {index_name}")
-
-        # Create retriever and add documents
-        logger.info("Creating hybrid retriever and adding documents...")
-        _retriever = PineconeHybridSearchRetriever(
-            embeddings=_get_embeddings(),
-            sparse_encoder=_bm25,
-            index=_index,
-            top_k=settings.top_k,
-            alpha=0.5
+        spool = None
+        if full:
+            # BM25 must see every chunk before sparse vectors can be encoded:
+            # spool parsed files to disk, fit, then replay them into the pipeline
+            spool = ChunkSpool()
+            total_chunks = 0
+            for result in results:
+                spool.append(result)
+                total_chunks += len(result.chunks)
+            if not total_chunks:
+                spool.close()
+                return {"status": "error", "message": "No documents could be loaded"}
+            logger.info(f"Fitting BM25 encoder on {total_chunks} chunks...")
+            with metrics.span("bm25_fit"):
+                _bm25 = BM25Model(tokenizer_params=TOKENIZERS[settings.sparse_tokenizer]).fit(spool.texts())
+                _bm25.save(BM25_DIR)
+            # Cached sparse vectors were encoded with the previous BM25 fit
+            _query_vectors.clear()
+            logger.info(f"BM25 model ({len(_bm25.hashes)} terms) saved to {BM25_DIR}")
+            results = iter(spool)
+
+        # Citation keys are collected as chunks pass through, then committed per file
+        pending_citations: Dict[str, list] = {}
+
+        def collect_citations(results):
+            for result in results:
+                pending_citations[result.rel] = [
+                    (_chunk_id(result.rel, chunk.page_content), *citation_keys(chunk.metadata))
+                    for chunk in result.chunks
+                ]
+                yield result
+
+        # Stage 2: embed and upsert in batches with bounded in-flight requests
+        outcomes = embed_and_upsert(
+            collect_citations(results),
+            store,
+            _encode_documents,
+            _chunk_id,
+            batch_size=settings.ingest_batch_size,
+            max_in_flight=settings.ingest_max_in_flight,
+            retry=_with_retry
         )
-        _retriever.add_texts(texts=texts, metadatas=[chunk.metadata for chunk in chunks])
-        logger.info("Documents added to Pinecone successfully")
+        documents_loaded = 0
+        files_updated = 0
+        chunks_created = 0
+        chunks_deleted = 0
+        # Parsing, embedding and upserting are pipelined, so they are timed together
+        with metrics.span("index"):
+            try:
+                for outcome in outcomes:
+                    entries = pending_citations.pop(outcome.rel, [])
+                    if outcome.error:
+                        # Not recorded in the manifest, so it is retried on the next ingest
+                        logger.error(f"Error ingesting {outcome.rel}: {outcome.error}")
+                        continue
+                    citations.replace_file(outcome.rel, entries)
+                    stale = set(manifest.chunk_ids(outcome.rel)) - set(outcome.chunk_ids)
+                    if stale:
+                        _with_retry(store.delete, sorted(stale))
+                    manifest.record(outcome.rel, current[outcome.rel], outcome.chunk_ids)
+                    documents_loaded += outcome.documents
+                    files_updated += 1
+                    chunks_created += len(outcome.chunk_ids)
+                    chunks_deleted += len(stale)
+                    logger.info(f"Ingested {outcome.rel}: {outcome.documents} documents, "
+                                f"{len(outcome.chunk_ids)} chunks")
+            finally:
+                if spool is not None:
+                    spool.close()
+
+        with metrics.span("delete"):
+            for rel in removed:
+                ids = manifest.chunk_ids(rel)
+                _with_retry(store.delete, ids)
+                manifest.remove(rel)
+                citations.remove_file(rel)
+                chunks_deleted += len(ids)
+                logger.info(f"Removed {rel}: {len(ids)} chunks")
+
+            if bootstrap:
+                # Drop vectors written before the manifest existed (e.g. older chunk ID schemes)
+                indexed = {chunk_id for entry in manifest.files.values() for chunk_id in entry.chunk_ids}
+                orphans = [chunk_id for chunk_id in store.list_ids() if chunk_id not in indexed]
+                if orphans:
+                    _with_retry(store.delete, orphans)
+                    chunks_deleted += len(orphans)
+                    logger.info(f"Deleted {len(orphans)} orphaned vectors")
+
+        with metrics.span("finalize"):
+            store.flush()
+            manifest.save()
+            citations.save()
+            graph = CrossReferenceGraph.build(citations)
+            graph.save(CROSS_REF_GRAPH_PATH)
+        logger.info(f"Cross-reference graph: {len(graph.ids)} chunks, {len(graph)} edges")
+        _store = store
+        _citation_index = citations
+        _cross_ref_graph = graph
+        logger.info(f"Ingestion into {store.name} store complete")
+        bump_corpus_version()
 
         return {
             "status": "success",
             "message": "Documents ingested successfully",
-            "documents_loaded": len(docs),
-            "chunks_created": len(chunks),
-            "index_name": index_name
+            "documents_loaded": documents_loaded,
+            "chunks_created": chunks_created,
+            "chunks_deleted": chunks_deleted,
+            "files_updated": files_updated,
+            "files_removed": len(removed),
+            "files_unchanged": len(files) - len(changed),
+            "backend": store.name,
+            "index_name": settings.pinecone_index_name if store.name == "pinecone" else str(LOCAL_INDEX_DIR)
         }
 
     except Exception as e:
@@ -490,6 +1244,25 @@ async def ingest_documents() -> Dict[str, Any]:
         return {"status": "error", "message": str(e)}
 
 
+async def ingest_documents(full: bool = False) -> Dict[str, Any]:
+    """
+    Incrementally ingest new or changed documents into the vector store.
+    Unchanged files are skipped and removed files are deleted from the index;
+    full=True re-embeds every file and refits BM25.
+    """
+    if not _ingest_lock.acquire(blocking=False):
+        return {"status": "error", "message": "Ingestion already in progress"}
+    try:
+        with metrics.trace("ingest") as request:
+            # Runs off the event loop so the existing index keeps serving queries
+            result = await asyncio.to_thread(_ingest_sync, full)
+            if settings.response_timings:
+                result["timings"] = request.timings()
+            return result
+    finally:
+        _ingest_lock.release()
+
+
 async def list_documents() -> Dict[str, Any]:
     """List all documents in the data directory (recursively)."""
     if not DATA_DIR.exists():
@@ -522,6 +1295,7 @@ async def upload_document(file) -> Dict[str, Any]:
     content = await file.read()
     file_path = DATA_DIR / file.filename
     file_path.write_bytes(content)
+    bump_corpus_version()
 
     return {
         "status": "success",
@@ -538,4 +1312,5 @@ async def delete_document(filename: str) -> Dict[str, Any]:
         return {"status": "error", "message": f"File '{filename}' not found"}
 
     file_path.unlink()
+    bump_corpus_version()
     return {"status": "success", "filename": filename, "message": "File deleted."}
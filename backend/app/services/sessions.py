@@ -0,0 +1,210 @@
+"""
+Server-side chat sessions.
+
+A session keeps the previous turns of a conversation: each question, the
+standalone query it was retrieved with, the answer, and the chunks the answer
+was grounded on. That lets a follow-up ("what about for a juvenile?") be
+condensed into a standalone query without an LLM call, and reuse the previous
+turn's context, extended by a few fresh chunks, instead of retrieving and
+reranking from scratch. The prompt carries the last few turns verbatim and a
+rolling summary of older ones, so it stops growing with the conversation.
+
+Sessions live in this worker's memory (LRU with TTL); a request naming an
+unknown or expired session starts a new one.
+"""
+import re
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+from app.services.cache import TTLCache, fingerprint, normalize_query
+from app.services.citation_index import parse_citation_query
+
+_PRONOUNS = r"it|its|that|this|those|these|they|them|their|such"
+# Follow-ups are short and lean on the previous turn: a leading connective
+# ("and", "what about") or a leading pronoun standing in for its subject
+_FOLLOW_UP_RE = re.compile(
+    rf"^\s*(?:and|but|also|so|then|what about|how about|what if|same|{_PRONOUNS})\b",
+    re.IGNORECASE
+)
+# A pronoun elsewhere ("is that a felony") may refer back, or may not ("is it
+# legal to ...", "theft that exceeds ..."); retrieval decides
+_PRONOUN_RE = re.compile(rf"\b(?:{_PRONOUNS})\b", re.IGNORECASE)
+FOLLOW_UP_MAX_WORDS = 12
+# Longest condensed query; beyond it the middle is dropped (topic and latest ask are kept)
+CONDENSED_MAX_WORDS = 40
+# Characters of each recent answer repeated in the prompt
+ANSWER_PROMPT_CHARS = 600
+# Characters of an answer kept in the rolling summary
+ANSWER_SUMMARY_CHARS = 200
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _short_without_citations(query: str) -> bool:
+    keys, _ = parse_citation_query(query)
+    return not keys and len(query.split()) <= FOLLOW_UP_MAX_WORDS
+
+
+def is_follow_up(query: str) -> bool:
+    """Whether a query reads as a follow-up rather than a standalone question."""
+    return _short_without_citations(query) and bool(_FOLLOW_UP_RE.search(query))
+
+
+def may_follow_up(query: str) -> bool:
+    """Whether a query not read as a follow-up still has a pronoun that may refer to the previous turn."""
+    return _short_without_citations(query) and bool(_PRONOUN_RE.search(query))
+
+
+def condense(previous: str, query: str) -> str:
+    """Standalone query for a follow-up: the previous standalone query plus the follow-up."""
+    words = f"{previous} {query}".split()
+    if len(words) > CONDENSED_MAX_WORDS:
+        half = CONDENSED_MAX_WORDS // 2
+        words = words[:half] + words[-half:]
+    return " ".join(words)
+
+
+def _first_sentence(text: str, limit: int) -> str:
+    sentence = _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit].rstrip() + "..."
+
+
+@dataclass
+class Turn:
+    query: str
+    standalone: str
+    answer: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class TurnPlan:
+    """
+    How to answer the next question in a session: the query to retrieve
+    with, the conversation block for the prompt, and previous context to
+    reuse (empty unless the question is a follow-up). With ``confirm``, the
+    previous context is only reused if a fresh retrieval for the query
+    overlaps it.
+    """
+    standalone: str
+    conversation: str = ""
+    previous: Tuple[Any, ...] = ()
+    confirm: bool = False
+
+    @property
+    def follow_up(self) -> bool:
+        return bool(self.previous)
+
+    @property
+    def fingerprint(self) -> str:
+        """Identity of everything besides the query that shapes the answer."""
+        return fingerprint([normalize_query(self.standalone), self.conversation, str(self.confirm),
+                            *(doc.id or "" for doc in self.previous)])
+
+
+class Session:
+    """One conversation: recent turns, a rolling summary, and the last turn's context."""
+
+    def __init__(self, session_id: str, max_turns: int = 3, summary_max_chars: int = 1500):
+        self.id = session_id
+        self.max_turns = max_turns
+        self.summary_max_chars = summary_max_chars
+        self.turns: List[Turn] = []
+        self.summary = ""
+        self.context: Tuple[Any, ...] = ()
+        self.corpus_version: Optional[int] = None
+        # False for a throwaway session (see SessionStore.open)
+        self.keep = True
+        self._lock = threading.Lock()
+
+    def seed(self, history: list) -> None:
+        """Start from client-sent history (pydantic messages or dicts) when the session is new."""
+        question = None
+        for message in history or ():
+            message = message if isinstance(message, dict) else message.model_dump()
+            if message.get("role") == "user":
+                question = message.get("content") or ""
+            elif question is not None:
+                self._append(Turn(question, question, message.get("content") or ""))
+                question = None
+        if question is not None:
+            # A question the client never got an answer to still frames the next one
+            self._append(Turn(question, question, ""))
+
+    def conversation(self) -> str:
+        """Prompt block: rolling summary, then the recent turns."""
+        if not self.turns and not self.summary:
+            return ""
+        lines = ["Conversation so far:"]
+        if self.summary:
+            lines.append(f"Earlier: {self.summary}")
+        for turn in self.turns:
+            lines.append(f"Q: {turn.query}")
+            answer = turn.answer.strip()
+            if answer:
+                lines.append(f"A: {answer[:ANSWER_PROMPT_CHARS]}{'...' if len(answer) > ANSWER_PROMPT_CHARS else ''}")
+        return "\n".join(lines) + "\n\n"
+
+    def plan(self, query: str, corpus_version: int) -> TurnPlan:
+        with self._lock:
+            if not self.turns:
+                return TurnPlan(query, self.conversation())
+            # Context retrieved against an older corpus is not reused
+            previous = self.context if self.corpus_version == corpus_version else ()
+            if is_follow_up(query):
+                return TurnPlan(condense(self.turns[-1].standalone, query), self.conversation(), previous)
+            if previous and may_follow_up(query):
+                return TurnPlan(query, self.conversation(), previous, confirm=True)
+            return TurnPlan(query, self.conversation())
+
+    def record(self, query: str, plan: TurnPlan, answer: str, docs: list, corpus_version: int) -> None:
+        with self._lock:
+            self._append(Turn(query, plan.standalone, answer, [doc.id for doc in docs if doc.id]))
+            self.context = tuple(docs)
+            self.corpus_version = corpus_version
+
+    def _append(self, turn: Turn) -> None:
+        self.turns.append(turn)
+        while len(self.turns) > self.max_turns:
+            oldest = self.turns.pop(0)
+            line = f"Q: {oldest.query}"
+            if oldest.answer.strip():
+                line += f" A: {_first_sentence(oldest.answer, ANSWER_SUMMARY_CHARS)}"
+            summary = f"{self.summary} {line}".strip()
+            # Oldest lines go first when the summary outgrows its budget
+            self.summary = summary[-self.summary_max_chars:] if len(summary) > self.summary_max_chars else summary
+
+
+class SessionStore:
+    """In-process sessions by ID, evicted by LRU and idle TTL."""
+
+    def __init__(self, maxsize: int, ttl: float, max_turns: int = 3, summary_max_chars: int = 1500):
+        self._sessions = TTLCache(maxsize, ttl)
+        self.max_turns = max_turns
+        self.summary_max_chars = summary_max_chars
+
+    def open(self, session_id: Optional[str] = None, history: Optional[list] = None) -> Session:
+        """
+        The named session, or a new one (seeded from ``history``) if it is
+        unknown or expired. A client sending history but no session ID keeps
+        its conversation itself, so that session is not stored.
+        """
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            session = Session(uuid.uuid4().hex, self.max_turns, self.summary_max_chars)
+            session.seed(history)
+            session.keep = bool(session_id) or not history
+        return session
+
+    def save(self, session: Session) -> None:
+        """Store the session, refreshing its TTL (throwaway sessions are not stored)."""
+        if session.keep:
+            self._sessions.set(session.id, session)
+
+    def end(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id) is not None
+
+    def stats(self):
+        return self._sessions.stats()
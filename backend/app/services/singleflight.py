@@ -0,0 +1,130 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+When many users ask the same question at once, only the first request (the
+leader) runs the pipeline; concurrent duplicates await the leader's result,
+or subscribe to its stream. A shared stream is pumped by one task that
+records every item, so a subscriber joining late still receives the whole
+stream from the start. Upstream work runs independently of any one client:
+a call completes (and fills the caches) even if its callers disconnect, and
+a stream keeps going while anyone listens and is cancelled once nobody is.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Broadcast:
+    """One upstream async iterator fanned out to any number of subscribers."""
+
+    def __init__(self, source: AsyncIterator[Any], on_close: Callable[["_Broadcast"], None]):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._on_close = on_close
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self, source: AsyncIterator[Any]) -> None:
+        try:
+            async for item in source:
+                self.items.append(item)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._on_close(self)
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        self.subscribers += 1
+        position = 0
+        try:
+            while True:
+                # No await between these checks and wait(): the event loop cannot
+                # interleave the pump, so no item or completion is missed
+                while position < len(self.items):
+                    yield self.items[position]
+                    position += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers and not self.done:
+                # Last listener left: stop new subscribers joining, then stop upstream
+                self._on_close(self)
+                self.task.cancel()
+
+
+class SingleFlight:
+    """Registry of in-flight calls and streams, keyed by request identity."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _release(self, registry: Dict[Hashable, Any], key: Hashable, entry: Any) -> None:
+        if registry.get(key) is entry:
+            del registry[key]
+
+    @staticmethod
+    def _same_loop(future: asyncio.Future) -> bool:
+        # Entries left by another event loop (e.g. across asyncio.run calls) are never joined
+        return future.get_loop() is asyncio.get_running_loop()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await ``fn()``, or the identical call already in flight.
+        Returns (result, shared) where shared is True for coalesced callers.
+        """
+        task = self._calls.get(key)
+        shared = task is not None and self._same_loop(task)
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+
+            def finished(done: asyncio.Future) -> None:
+                self._release(self._calls, key, done)
+                if not done.cancelled() and done.exception() is not None:
+                    logger.debug(f"Single-flight call failed: {done.exception()!r}")
+            task.add_done_callback(finished)
+        # shield: a caller that disconnects does not cancel the call for the others
+        return await asyncio.shield(task), shared
+
+    def stream(self, key: Hashable, make_stream: Callable[[], AsyncIterator[Any]]) -> Tuple[AsyncIterator[Any], bool]:
+        """
+        Subscribe to the stream for ``key``, starting ``make_stream()`` if none
+        is in flight. Returns (iterator, shared).
+        """
+        broadcast = self._streams.get(key)
+        shared = broadcast is not None and self._same_loop(broadcast.task)
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            broadcast = _Broadcast(make_stream(), lambda entry: self._release(self._streams, key, entry))
+            self._streams[key] = broadcast
+        return broadcast.subscribe(), shared
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls) + len(self._streams),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,131 @@
+"""
+Offline, legal-aware tokenizer for BM25 sparse vectors.
+
+One compiled regex over the lowercased text yields case citations, statute
+citations and words. Citations stay whole: "2019 WI App 12" is one token and
+"940.01(2)(a)" becomes "940.01", "940.01(2)" and "940.01(2)(a)", so a query
+for a section also matches its subdivisions. Words go through a built-in
+stopword table and a light Porter-style stemmer (plurals, -ed/-ing, final
+-e); nothing has to be downloaded.
+"""
+import re
+from functools import lru_cache
+from typing import List
+
+_TOKEN_RE = re.compile(
+    r"(?P<case>(?<!\d)(?P<year>\d{4})\s+wi\s+(?P<app>app\s+)?(?P<number>\d{1,4})(?!\d))"
+    r"|(?P<statute>(?<![\w.])\d{1,3}\.\d{1,4}(?:\s?\((?:\d{1,3}[a-z]{0,2}|[a-z]{1,2})\))*)"
+    r"|(?P<word>[a-z0-9]+)"
+)
+_SUBDIVISION_RE = re.compile(r"\([0-9a-z]+\)")
+
+# English stopwords (the NLTK list pinecone-text used)
+STOPWORDS = frozenset("""
+a about above after again against ain all am an and any are aren aren't as at be because been before being
+below between both but by can couldn couldn't d did didn didn't do does doesn doesn't doing don don't down
+during each few for from further had hadn hadn't has hasn hasn't have haven haven't having he her here hers
+herself him himself his how i if in into is isn isn't it it's its itself just ll m ma me mightn mightn't more
+most mustn mustn't my myself needn needn't no nor not now o of off on once only or other our ours ourselves
+out over own re s same shan shan't she she's should should've shouldn shouldn't so some such t than that
+that'll the their theirs them themselves then there these they this those through to too under until up ve
+very was wasn wasn't we were weren weren't what when where which while who whom why will with won won't
+wouldn wouldn't y you you'd you'll you're you've your yours yourself yourselves
+""".split())
+
+
+def _consonant(word: str, i: int) -> bool:
+    char = word[i]
+    if char in "aeiou":
+        return False
+    if char == "y":
+        return i == 0 or not _consonant(word, i - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Porter's m: the number of vowel-consonant sequences in ``stem``."""
+    m = 0
+    previous_vowel = False
+    for i in range(len(stem)):
+        vowel = not _consonant(stem, i)
+        if previous_vowel and not vowel:
+            m += 1
+        previous_vowel = vowel
+    return m
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _consonant(stem, i) for i in range(len(stem)))
+
+
+def _ends_cvc(word: str) -> bool:
+    n = len(word)
+    return (n >= 3 and _consonant(word, n - 3) and not _consonant(word, n - 2)
+            and _consonant(word, n - 1) and word[-1] not in "wxy")
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Porter steps 1a-1c and 5a: "offenses" -> "offens", "operating" -> "operat"."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+
+    # Step 1a: plurals
+    if word.endswith("sses") or word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+
+    # Step 1b: -eed, -ed, -ing
+    if word.endswith("eed"):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                elif len(word) >= 2 and word[-1] == word[-2] and word[-1] not in "lsz" and _consonant(word, len(word) - 1):
+                    word = word[:-1]
+                elif _measure(word) == 1 and _ends_cvc(word):
+                    word += "e"
+                break
+
+    # Step 1c: terminal y -> i when the stem has a vowel
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+
+    # Step 5a: drop a final e
+    if word.endswith("e"):
+        m = _measure(word[:-1])
+        if m > 1 or (m == 1 and not _ends_cvc(word[:-1])):
+            word = word[:-1]
+    return word
+
+
+class LegalTokenizer:
+    """Callable text -> tokens, usable wherever a BM25 tokenizer is expected."""
+
+    def __call__(self, text: str) -> List[str]:
+        tokens = []
+        for match in _TOKEN_RE.finditer(text.lower()):
+            word = match.group("word")
+            if word is not None:
+                if word not in STOPWORDS:
+                    tokens.append(stem(word))
+            elif match.group("statute") is not None:
+                citation = match.group("statute").replace(" ", "")
+                cut = citation.find("(")
+                if cut == -1:
+                    tokens.append(citation)
+                    continue
+                token = citation[:cut]
+                tokens.append(token)
+                for subdivision in _SUBDIVISION_RE.findall(citation, cut):
+                    token += subdivision
+                    tokens.append(token)
+            else:
+                court = "wi app" if match.group("app") else "wi"
+                tokens.append(f"{match.group('year')} {court} {match.group('number')}")
+        return tokens
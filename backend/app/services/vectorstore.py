@@ -0,0 +1,379 @@
+"""
+Vector store backends for hybrid (dense + sparse) retrieval.
+
+PineconeStore wraps a Pinecone dotproduct index. LocalHybridStore keeps the
+corpus in-process: a memory-mapped float16/int8 dense matrix and a CSR matrix
+of BM25 document vectors. Both receive query vectors already scaled by alpha
+(hybrid_convex_scale), so a plain dot product over the dense and sparse parts
+gives the same hybrid score on either backend.
+"""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+SparseVector = Dict[str, list]
+
+# Rows scored per block when computing dense dot products (bounds temp memory)
+DENSE_BLOCK_ROWS = 8192
+
+
+class VectorStore(ABC):
+    """Hybrid vector store interface used by the RAG service."""
+
+    name: str = ""
+
+    @abstractmethod
+    def query(self, dense: List[float], sparse: SparseVector, top_k: int) -> List[Document]:
+        """Top-k chunks by dense + sparse dot product, best first."""
+
+    @abstractmethod
+    def fetch(self, ids: Sequence[str]) -> List[Document]:
+        """Chunks by ID, in the given order (unknown IDs are skipped)."""
+
+    @abstractmethod
+    def upsert(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        dense: Sequence[List[float]],
+        sparse: Sequence[SparseVector],
+        metadatas: Sequence[dict]
+    ) -> None:
+        """Insert or replace chunks by ID."""
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove chunks by ID (unknown IDs are ignored)."""
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Remove every chunk."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored chunks."""
+
+    @abstractmethod
+    def list_ids(self) -> List[str]:
+        """IDs of all stored chunks."""
+
+    def flush(self) -> None:
+        """Persist pending writes (no-op for remote stores)."""
+
+
+class PineconeStore(VectorStore):
+    """Pinecone serverless index with dotproduct metric."""
+
+    name = "pinecone"
+
+    def __init__(self, index, namespace: Optional[str] = None, text_key: str = "context",
+                 batch_size: int = 100):
+        self.index = index
+        self.namespace = namespace
+        self.text_key = text_key
+        self.batch_size = batch_size
+
+    def query(self, dense: List[float], sparse: SparseVector, top_k: int) -> List[Document]:
+        result = self.index.query(
+            vector=dense,
+            sparse_vector=sparse,
+            top_k=top_k,
+            include_metadata=True,
+            namespace=self.namespace,
+        )
+        docs = []
+        for match in result["matches"]:
+            metadata = dict(match["metadata"])
+            text = metadata.pop(self.text_key)
+            if "score" not in metadata and "score" in match:
+                metadata["score"] = match["score"]
+            docs.append(Document(id=match["id"], page_content=text, metadata=metadata))
+        return docs
+
+    def fetch(self, ids: Sequence[str]) -> List[Document]:
+        ids = list(ids)
+        found = {}
+        for start in range(0, len(ids), self.batch_size):
+            result = self.index.fetch(ids=ids[start:start + self.batch_size], namespace=self.namespace)
+            found.update(result.vectors)
+        docs = []
+        for doc_id in ids:
+            vector = found.get(doc_id)
+            if vector is None:
+                continue
+            metadata = dict(vector.metadata or {})
+            text = metadata.pop(self.text_key, "")
+            docs.append(Document(id=doc_id, page_content=text, metadata=metadata))
+        return docs
+
+    def upsert(self, ids, texts, dense, sparse, metadatas) -> None:
+        vectors = [
+            {
+                "id": doc_id,
+                "values": list(values),
+                "sparse_values": {"indices": list(sv["indices"]), "values": [float(v) for v in sv["values"]]},
+                "metadata": {self.text_key: text, **metadata},
+            }
+            for doc_id, text, values, sv, metadata in zip(ids, texts, dense, sparse, metadatas)
+        ]
+        for start in range(0, len(vectors), self.batch_size):
+            self.index.upsert(vectors=vectors[start:start + self.batch_size], namespace=self.namespace)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        ids = list(ids)
+        for start in range(0, len(ids), self.batch_size):
+            self.index.delete(ids=ids[start:start + self.batch_size], namespace=self.namespace)
+
+    def reset(self) -> None:
+        self.index.delete(delete_all=True, namespace=self.namespace)
+
+    def count(self) -> int:
+        stats = self.index.describe_index_stats()
+        return stats.get("total_vector_count", 0)
+
+    def list_ids(self) -> List[str]:
+        # Paginated ID listing (serverless indexes)
+        kwargs = {"namespace": self.namespace} if self.namespace else {}
+        return [doc_id for page in self.index.list(**kwargs) for doc_id in page]
+
+
+class LocalHybridStore(VectorStore):
+    """
+    In-process hybrid index persisted as NumPy arrays.
+
+    Files in ``path``:
+        dense.npy           (n, dim) float16 or int8, memory-mapped on load
+        dense_scale.npy     (n,) float32 per-row dequantization scale
+        sparse_indptr.npy   (n + 1,) int64 CSR row pointers
+        sparse_indices.npy  (nnz,) uint32 BM25 term hashes
+        sparse_values.npy   (nnz,) float32 BM25 weights
+        docs.jsonl          one {"id", "text", "metadata"} object per row
+
+    Writes happen in memory; call flush() to persist them.
+    """
+
+    name = "local"
+
+    def __init__(self, path: Path, dtype: str = "float16"):
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"Unsupported dense dtype: {dtype}")
+        self.path = Path(path)
+        self.dtype = dtype
+        # docs.jsonl mtime of the files last loaded or flushed
+        self.mtime_ns: Optional[int] = None
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    # -- persistence -------------------------------------------------------
+
+    def _empty_state(self) -> Dict[str, Any]:
+        return {
+            "ids": [],
+            "texts": [],
+            "metadatas": [],
+            "dense": np.zeros((0, 0), dtype=self.dtype),
+            "scale": np.zeros(0, dtype=np.float32),
+            "indptr": np.zeros(1, dtype=np.int64),
+            "indices": np.zeros(0, dtype=np.uint32),
+            "values": np.zeros(0, dtype=np.float32),
+            "postings": None,
+            "rows": None,
+        }
+
+    def _load(self) -> Dict[str, Any]:
+        if not (self.path / "docs.jsonl").exists():
+            return self._empty_state()
+        ids, texts, metadatas = [], [], []
+        with open(self.path / "docs.jsonl", encoding="utf-8") as f:
+            self.mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            for line in f:
+                row = json.loads(line)
+                ids.append(row["id"])
+                texts.append(row["text"])
+                metadatas.append(row["metadata"])
+        dense = np.load(self.path / "dense.npy", mmap_mode="r")
+        if dense.dtype != np.dtype(self.dtype):
+            raise ValueError(f"Local index at {self.path} stores {dense.dtype}, expected {self.dtype}")
+        return {
+            "ids": ids,
+            "texts": texts,
+            "metadatas": metadatas,
+            "dense": dense,
+            "scale": np.load(self.path / "dense_scale.npy"),
+            "indptr": np.load(self.path / "sparse_indptr.npy", mmap_mode="r"),
+            "indices": np.load(self.path / "sparse_indices.npy", mmap_mode="r"),
+            "values": np.load(self.path / "sparse_values.npy", mmap_mode="r"),
+            "postings": None,
+            "rows": None,
+        }
+
+    def flush(self) -> None:
+        with self._lock:
+            state = self._state
+            self.path.mkdir(parents=True, exist_ok=True)
+            arrays = {
+                "dense.npy": state["dense"],
+                "dense_scale.npy": state["scale"],
+                "sparse_indptr.npy": state["indptr"],
+                "sparse_indices.npy": state["indices"],
+                "sparse_values.npy": state["values"],
+            }
+            for name, array in arrays.items():
+                tmp = self.path / f".{name}.tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, np.ascontiguousarray(array))
+                os.replace(tmp, self.path / name)
+            # docs.jsonl is written last: it marks the index as complete
+            tmp = self.path / ".docs.jsonl.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for doc_id, text, metadata in zip(state["ids"], state["texts"], state["metadatas"]):
+                    f.write(json.dumps({"id": doc_id, "text": text, "metadata": metadata}) + "\n")
+            os.replace(tmp, self.path / "docs.jsonl")
+            self.mtime_ns = os.stat(self.path / "docs.jsonl").st_mtime_ns
+
+    # -- writes ------------------------------------------------------------
+
+    def _quantize(self, dense: np.ndarray):
+        if self.dtype == "int8":
+            scale = np.abs(dense).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            quantized = np.clip(np.rint(dense / scale[:, None]), -127, 127).astype(np.int8)
+            return quantized, scale.astype(np.float32)
+        return dense.astype(np.float16), np.ones(len(dense), dtype=np.float32)
+
+    @staticmethod
+    def _take_rows(indptr, indices, values, rows: np.ndarray):
+        """Select CSR rows, returning a new (indptr, indices, values)."""
+        lengths = indptr[rows + 1] - indptr[rows]
+        new_indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=new_indptr[1:])
+        offsets = np.repeat(indptr[rows] - new_indptr[:-1], lengths)
+        take = np.arange(new_indptr[-1], dtype=np.int64) + offsets
+        return new_indptr, np.asarray(indices)[take], np.asarray(values)[take]
+
+    def _replace_state(self, keep: np.ndarray, ids, texts, metadatas, dense, sparse) -> None:
+        state = self._state
+        indptr, indices, values = self._take_rows(state["indptr"], state["indices"], state["values"], keep)
+        kept_dense = np.asarray(state["dense"])[keep]
+        kept_scale = np.asarray(state["scale"])[keep]
+
+        if ids:
+            new_dense, new_scale = self._quantize(np.asarray(dense, dtype=np.float32))
+            lengths = [len(sv["indices"]) for sv in sparse]
+            new_indptr = indptr[-1] + np.cumsum([0] + lengths)[1:]
+            indptr = np.concatenate([indptr, new_indptr.astype(np.int64)])
+            indices = np.concatenate([indices] + [np.asarray(sv["indices"], dtype=np.uint32) for sv in sparse])
+            values = np.concatenate([values] + [np.asarray(sv["values"], dtype=np.float32) for sv in sparse])
+            if len(keep) and kept_dense.shape[1] != new_dense.shape[1]:
+                raise ValueError(f"Dense dimension {new_dense.shape[1]} does not match index ({kept_dense.shape[1]})")
+            kept_dense = np.concatenate([kept_dense, new_dense]) if len(keep) else new_dense
+            kept_scale = np.concatenate([kept_scale, new_scale])
+
+        self._state = {
+            "ids": [state["ids"][i] for i in keep] + list(ids),
+            "texts": [state["texts"][i] for i in keep] + list(texts),
+            "metadatas": [state["metadatas"][i] for i in keep] + [dict(m) for m in metadatas],
+            "dense": kept_dense,
+            "scale": kept_scale,
+            "indptr": indptr,
+            "indices": indices.astype(np.uint32),
+            "values": values.astype(np.float32),
+            "postings": None,
+            "rows": None,
+        }
+
+    def upsert(self, ids, texts, dense, sparse, metadatas) -> None:
+        if not ids:
+            return
+        with self._lock:
+            replaced = set(ids)
+            keep = np.array([i for i, doc_id in enumerate(self._state["ids"]) if doc_id not in replaced],
+                            dtype=np.int64)
+            self._replace_state(keep, list(ids), list(texts), list(metadatas), dense, sparse)
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            removed = set(ids)
+            keep = np.array([i for i, doc_id in enumerate(self._state["ids"]) if doc_id not in removed],
+                            dtype=np.int64)
+            if len(keep) != len(self._state["ids"]):
+                self._replace_state(keep, [], [], [], None, None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = self._empty_state()
+
+    def count(self) -> int:
+        return len(self._state["ids"])
+
+    def list_ids(self) -> List[str]:
+        return list(self._state["ids"])
+
+    # -- queries -----------------------------------------------------------
+
+    def fetch(self, ids: Sequence[str]) -> List[Document]:
+        state = self._state
+        rows = state["rows"]
+        if rows is None:
+            rows = state["rows"] = {doc_id: row for row, doc_id in enumerate(state["ids"])}
+        docs = []
+        for doc_id in ids:
+            row = rows.get(doc_id)
+            if row is not None:
+                docs.append(Document(id=doc_id, page_content=state["texts"][row],
+                                     metadata=dict(state["metadatas"][row])))
+        return docs
+
+    @staticmethod
+    def _build_postings(state: Dict[str, Any]):
+        """Term-major view of the CSR matrix: sorted terms -> (rows, weights)."""
+        indptr = np.asarray(state["indptr"])
+        indices = np.asarray(state["indices"])
+        rows = np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr))
+        order = np.argsort(indices, kind="stable")
+        terms, starts = np.unique(indices[order], return_index=True)
+        term_ptr = np.append(starts, len(order)).astype(np.int64)
+        return terms, term_ptr, rows[order], np.asarray(state["values"])[order]
+
+    def query(self, dense: List[float], sparse: SparseVector, top_k: int) -> List[Document]:
+        state = self._state
+        n = len(state["ids"])
+        if n == 0 or top_k <= 0:
+            return []
+
+        q = np.asarray(dense, dtype=np.float32)
+        scores = np.empty(n, dtype=np.float32)
+        matrix = state["dense"]
+        for start in range(0, n, DENSE_BLOCK_ROWS):
+            end = min(start + DENSE_BLOCK_ROWS, n)
+            scores[start:end] = matrix[start:end].astype(np.float32) @ q
+        scores *= state["scale"]
+
+        if sparse and len(sparse.get("indices", [])):
+            postings = state["postings"]
+            if postings is None:
+                postings = state["postings"] = self._build_postings(state)
+            terms, term_ptr, rows, weights = postings
+            q_terms = np.asarray(sparse["indices"], dtype=np.uint32)
+            q_weights = np.asarray(sparse["values"], dtype=np.float32)
+            pos = np.searchsorted(terms, q_terms)
+            for p, term, weight in zip(pos, q_terms, q_weights):
+                if p < len(terms) and terms[p] == term:
+                    a, b = term_ptr[p], term_ptr[p + 1]
+                    scores[rows[a:b]] += weight * weights[a:b]
+
+        k = min(top_k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        docs = []
+        for row in top:
+            metadata = dict(state["metadatas"][row])
+            metadata["score"] = float(scores[row])
+            docs.append(Document(id=state["ids"][row], page_content=state["texts"][row], metadata=metadata))
+        return docs
@@ -0,0 +1,164 @@
+"""
+Startup warm-up and readiness reporting.
+
+The RAG service builds its clients and indexes lazily. Warm-up builds them
+all (concurrently, through the same thread-safe getters requests use) before
+traffic arrives, touches each one so connections are opened and memory-mapped
+files paged in, and optionally replays a set of queries to fill the caches.
+Components that fail to build are retried with backoff, so a transient
+error at startup only keeps the worker unready until a retry succeeds.
+readiness() backs the /ready endpoint, so a load balancer only routes to
+workers that have finished warming.
+"""
+import asyncio
+import importlib
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+@dataclass
+class ComponentStatus:
+    """pending -> ready | empty (nothing ingested yet) | error."""
+    state: str = "pending"
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+_status: Dict[str, ComponentStatus] = {}
+_started: Optional[float] = None
+_finished: Optional[float] = None
+
+
+def _touch_bm25(rag) -> Any:
+    bm25 = rag._get_bm25()
+    if bm25 is not None:
+        # Builds the tokenizer and pages in the document-frequency arrays
+        bm25.encode_queries("warm up")
+    return bm25
+
+
+def _touch_store(rag) -> Any:
+    store = rag._get_store()
+    if store is not None:
+        # Opens the Pinecone connection / maps the local index
+        store.count()
+    return store
+
+
+def _components(rag) -> Dict[str, Callable[[], Any]]:
+    return {
+        "embeddings": rag._get_embeddings,
+        "bm25": lambda: _touch_bm25(rag),
+        "vector_store": lambda: _touch_store(rag),
+        "reranker": rag._get_reranker,
+        "citation_index": rag._get_citation_index,
+        "cross_ref_graph": rag._get_cross_ref_graph,
+    }
+
+
+def _build(name: str, build: Callable[[], Any]) -> None:
+    status = _status[name]
+    status.error = None
+    start = time.perf_counter()
+    try:
+        status.state = "empty" if build() is None else "ready"
+    except Exception as e:
+        status.state = "error"
+        status.error = f"{type(e).__name__}: {e}"
+        logger.error(f"Warm-up of {name} failed: {status.error}")
+    status.seconds = round(time.perf_counter() - start, 4)
+
+
+async def _replay(rag, queries: List[str]) -> None:
+    _status["warmup_queries"] = status = ComponentStatus()
+    start = time.perf_counter()
+    if _status["vector_store"].state != "ready":
+        status.state = "empty"
+    else:
+        try:
+            for query in queries:
+                await rag.search(query)
+            status.state = "ready"
+        except Exception as e:
+            status.state = "error"
+            status.error = f"{type(e).__name__}: {e}"
+            logger.error(f"Warm-up query replay failed: {status.error}")
+    status.seconds = round(time.perf_counter() - start, 4)
+
+
+def _failed() -> List[str]:
+    return [name for name, status in _status.items() if status.state == "error"]
+
+
+async def warm_up(queries: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Build every component concurrently, then replay ``queries`` through
+    search(). Returns once every failed component has been rebuilt (with
+    backoff), or after the first pass if retries are disabled.
+    """
+    global _started, _finished
+    _started = time.perf_counter()
+    _finished = None
+
+    _status.clear()
+    start = time.perf_counter()
+    try:
+        # A multi-second import; off the event loop so /health and /ready keep answering
+        rag = await asyncio.to_thread(importlib.import_module, "app.services.rag")
+    except Exception as e:
+        _status["import"] = ComponentStatus("error", round(time.perf_counter() - start, 4), f"{type(e).__name__}: {e}")
+        _finished = time.perf_counter()
+        logger.error(f"Warm-up failed to import the RAG service: {_status['import'].error}")
+        return readiness()
+    _status["import"] = ComponentStatus("ready", round(time.perf_counter() - start, 4))
+
+    components = _components(rag)
+    _status.update((name, ComponentStatus()) for name in components)
+    await asyncio.gather(*(asyncio.to_thread(_build, name, build) for name, build in components.items()))
+    if queries:
+        await _replay(rag, queries)
+
+    _finished = time.perf_counter()
+    logger.info(f"Warm-up finished in {_finished - _started:.2f}s: "
+                + ", ".join(f"{name}={status.state}" for name, status in _status.items()))
+
+    delay = settings.warmup_retry_delay
+    failed = _failed()
+    while failed and delay > 0:
+        logger.info(f"Retrying warm-up of {', '.join(failed)} in {delay:g}s")
+        await asyncio.sleep(delay)
+        await asyncio.gather(*(asyncio.to_thread(_build, name, components[name])
+                               for name in failed if name in components))
+        # Replayed again if it failed, or was skipped because the vector store was not built
+        if "warmup_queries" in failed or (queries and "vector_store" in failed
+                                          and _status["vector_store"].state == "ready"):
+            await _replay(rag, queries)
+        failed = _failed()
+        delay = min(delay * 2, settings.warmup_retry_max_delay)
+    return readiness()
+
+
+def readiness() -> Dict[str, Any]:
+    """
+    Whether this worker should receive traffic, with each component's state
+    and init time. Without warm-up on startup, components stay lazy and the
+    worker is always ready.
+    """
+    if _started is None:
+        enabled = settings.warmup_on_startup
+        return {"ready": not enabled, "warmup": "pending" if enabled else "disabled", "components": {}}
+    done = _finished is not None
+    return {
+        "ready": done and all(status.state != "error" for status in _status.values()),
+        "warmup": "done" if done else "running",
+        "warmup_seconds": round(_finished - _started, 4) if done else None,
+        "components": {name: asdict(status) for name, status in _status.items()},
+    }
@@ -0,0 +1,121 @@
+"""
+Precomputed cross-reference graph between chunks.
+
+Built at ingest time from the citation index: every statute a chunk refers to
+("under s. 939.44", "as defined in s. 939.22", "see § 940.01") is resolved to
+the chunk that defines it. Edges are stored as CSR arrays (indptr/indices over
+a chunk ID list), so expanding retrieved chunks by one or two hops is a local
+array walk instead of extra vector searches.
+"""
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.services.citation_index import CitationIndex
+
+
+class CrossReferenceGraph:
+    """Directed chunk -> referenced chunk edges in CSR form."""
+
+    def __init__(self, ids: List[str], indptr: np.ndarray, indices: np.ndarray):
+        self.ids = ids
+        self.indptr = indptr
+        self.indices = indices
+        self.mtime_ns: Optional[int] = None
+        self._rows: Dict[str, int] = {chunk_id: row for row, chunk_id in enumerate(ids)}
+
+    @classmethod
+    def empty(cls) -> "CrossReferenceGraph":
+        return cls([], np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32))
+
+    @classmethod
+    def build(cls, citations: CitationIndex) -> "CrossReferenceGraph":
+        """
+        Resolve every chunk's cited statutes to defining chunks, keeping
+        citation order. Only chunks with an edge in or out become nodes.
+        """
+        resolved: Dict[str, Optional[str]] = {}
+        edges: Dict[str, List[str]] = {}
+        for rel in sorted(citations.files):
+            for chunk_id, _, cites in citations.files[rel]:
+                targets: Dict[str, None] = {}
+                for key in cites:
+                    if key not in resolved:
+                        resolved[key] = citations.resolve(key)
+                    target = resolved[key]
+                    if target is not None and target != chunk_id:
+                        targets.setdefault(target)
+                if targets:
+                    edges[chunk_id] = list(targets)
+
+        ids = list(dict.fromkeys([*edges, *(target for targets in edges.values() for target in targets)]))
+        rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        indptr = np.zeros(len(ids) + 1, dtype=np.int32)
+        indices: List[int] = []
+        for row, chunk_id in enumerate(ids):
+            indices.extend(rows[target] for target in edges.get(chunk_id, ()))
+            indptr[row + 1] = len(indices)
+        return cls(ids, indptr, np.asarray(indices, dtype=np.int32))
+
+    @classmethod
+    def load(cls, path: Path) -> "CrossReferenceGraph":
+        path = Path(path)
+        if not path.exists():
+            return cls.empty()
+        with np.load(path, allow_pickle=False) as data:
+            graph = cls([chunk_id.decode("ascii") for chunk_id in data["ids"].tolist()],
+                        data["indptr"], data["indices"])
+        graph.mtime_ns = os.stat(path).st_mtime_ns
+        return graph
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            # Chunk IDs are hex digests; stored as bytes rather than UTF-32
+            ids = np.asarray([chunk_id.encode("ascii") for chunk_id in self.ids], dtype=bytes)
+            np.savez(f, ids=ids, indptr=self.indptr, indices=self.indices)
+        os.replace(tmp, path)
+        self.mtime_ns = os.stat(path).st_mtime_ns
+
+    def neighbours(self, chunk_id: str) -> List[str]:
+        row = self._rows.get(chunk_id)
+        if row is None:
+            return []
+        return [self.ids[target] for target in self.indices[self.indptr[row]:self.indptr[row + 1]]]
+
+    def expand(self, seeds: Iterable[str], hops: int, fan_out: int, limit: int) -> List[str]:
+        """
+        Chunks reachable from ``seeds`` within ``hops``, breadth first and in
+        seed order. At most ``fan_out`` new chunks are taken from each chunk's
+        references and at most ``limit`` in total; seeds are never returned.
+        """
+        seeds = list(seeds)
+        seen = set(seeds)
+        frontier = [self._rows[chunk_id] for chunk_id in seeds if chunk_id in self._rows]
+        found: List[str] = []
+        for _ in range(hops):
+            next_frontier = []
+            for row in frontier:
+                taken = 0
+                for target in self.indices[self.indptr[row]:self.indptr[row + 1]]:
+                    chunk_id = self.ids[target]
+                    if chunk_id in seen:
+                        continue
+                    seen.add(chunk_id)
+                    found.append(chunk_id)
+                    if len(found) >= limit:
+                        return found
+                    next_frontier.append(int(target))
+                    taken += 1
+                    if taken >= fan_out:
+                        break
+            frontier = next_frontier
+        return found
+
+    def __len__(self) -> int:
+        """Number of edges."""
+        return len(self.indices)
@@ -0,0 +1,352 @@
+"""
+Micro-benchmarks for the ingest CPU paths, with stored baselines.
+
+Loads the bundled statute PDFs from data/raw once (timed as load_pdf), then
+times statute chunking, citation, cross-reference and metadata extraction,
+the combined split_and_enrich step, and BM25 fitting and encoding over the
+real corpus. Each benchmark reports throughput in items/s (pages for
+load_pdf, chunks otherwise) and MB/s of input text, best of --rounds runs,
+and the peak Python heap (tracemalloc) while processing the largest file,
+since ingest workers handle one file at a time.
+
+Results are compared with benchmark_baseline.json. A benchmark regresses
+when its throughput drops, or its peak memory grows, by more than
+--threshold; the script then exits with status 1. Shared and virtualized
+machines drift by 20-30% between runs, so a throughput regression is
+re-measured (--retries) and only reported if it persists. Timings are only
+comparable on the same kind of machine and corpus: record a new baseline
+with --update after an intended change or on new hardware.
+
+Usage (from backend/):
+    python benchmark.py                  # compare with the baseline
+    python benchmark.py --update         # record a new baseline
+    python benchmark.py --only statute_citations,legal_metadata --rounds 10
+"""
+import argparse
+import gc
+import glob
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.config import get_settings
+from app.services.bm25 import TOKENIZERS, BM25Model
+from app.services.chunker import iter_statute_chunks
+from app.services.ingest import load_file, split_and_enrich
+from app.services.legal_parser import extract_cross_references, extract_legal_metadata, extract_statute_citations
+
+settings = get_settings()
+
+BACKEND_DIR = Path(__file__).parent
+DEFAULT_FILES = str(BACKEND_DIR.parent / "data" / "raw" / "wisconsin_statute_*.pdf")
+BASELINE_PATH = BACKEND_DIR / "benchmark_baseline.json"
+MB = 1024 * 1024
+# Peak memory growth below this many MB is never a regression (tiny baselines are all noise)
+MEMORY_SLACK_MB = 0.25
+
+
+@dataclass
+class Corpus:
+    paths: Dict[str, Path]
+    files: Dict[str, list]  # file name -> page documents
+    file_bytes: int
+    load_seconds: float
+    fingerprint: str
+
+    @property
+    def pages(self) -> int:
+        return sum(len(docs) for docs in self.files.values())
+
+    def largest(self) -> Dict[str, list]:
+        """The file with the most text, for memory measurements."""
+        name = max(self.files, key=lambda n: sum(len(doc.page_content) for doc in self.files[n]))
+        return {name: self.files[name]}
+
+
+def load_corpus(pattern: str = DEFAULT_FILES) -> Corpus:
+    """Load every file matching ``pattern``; the load itself is the load_pdf measurement."""
+    paths = sorted(Path(p) for p in glob.glob(pattern))
+    if not paths:
+        raise FileNotFoundError(f"No files match {pattern}")
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(f"{path.name}:{path.stat().st_size}\n".encode())
+    start = time.perf_counter()
+    files = {path.name: load_file(path) for path in paths}
+    seconds = time.perf_counter() - start
+    return Corpus({path.name: path for path in paths}, files, sum(path.stat().st_size for path in paths),
+                  seconds, digest.hexdigest()[:16])
+
+
+def _copy(files: Dict[str, list]) -> List[list]:
+    # split_and_enrich may update page metadata in place
+    return [[Document(page_content=d.page_content, metadata=dict(d.metadata)) for d in docs]
+            for docs in files.values()]
+
+
+def _page_bytes(files: Dict[str, list]) -> int:
+    return sum(len(doc.page_content.encode()) for docs in files.values() for doc in docs)
+
+
+def _chunks(files: Dict[str, list]) -> list:
+    return [chunk for docs in files.values()
+            for chunk in iter_statute_chunks(docs, settings.chunk_size, settings.chunk_overlap)
+            if chunk.page_content]
+
+
+def _chunk_bytes(chunks: list) -> int:
+    return sum(len(chunk.page_content.encode()) for chunk in chunks)
+
+
+# Each benchmark: setup(files) -> (state, input bytes), untimed; run(state) -> items processed
+
+
+def _setup_pages(files):
+    return _copy(files), _page_bytes(files)
+
+
+def _run_chunking(pages):
+    return sum(1 for docs in pages for chunk in iter_statute_chunks(docs, settings.chunk_size, settings.chunk_overlap)
+               if chunk.page_content)
+
+
+def _setup_chunks(files):
+    chunks = _chunks(files)
+    return chunks, _chunk_bytes(chunks)
+
+
+def _run_citations(chunks):
+    for chunk in chunks:
+        extract_statute_citations(chunk.page_content)
+    return len(chunks)
+
+
+def _run_cross_references(chunks):
+    for chunk in chunks:
+        extract_cross_references(chunk.page_content, chunk.metadata.get("statute_num", ""))
+    return len(chunks)
+
+
+def _run_metadata(chunks):
+    for chunk in chunks:
+        extract_legal_metadata(chunk.page_content, chunk.metadata.get("source", ""))
+    return len(chunks)
+
+
+def _run_split_and_enrich(pages):
+    return sum(len(split_and_enrich(docs, settings.chunk_size, settings.chunk_overlap, settings.chunking_strategy))
+               for docs in pages)
+
+
+def _setup_texts(files):
+    chunks = _chunks(files)
+    return [chunk.page_content for chunk in chunks], _chunk_bytes(chunks)
+
+
+def _run_bm25_fit(texts):
+    BM25Model(tokenizer_params=TOKENIZERS[settings.sparse_tokenizer]).fit(texts)
+    return len(texts)
+
+
+def _setup_bm25_encode(files):
+    texts, size = _setup_texts(files)
+    return (BM25Model(tokenizer_params=TOKENIZERS[settings.sparse_tokenizer]).fit(texts), texts), size
+
+
+def _run_bm25_encode(state):
+    model, texts = state
+    batch = settings.ingest_batch_size
+    for start in range(0, len(texts), batch):
+        model.encode_documents(texts[start:start + batch])
+    return len(texts)
+
+
+BENCHMARKS: Dict[str, Tuple[Callable[[Dict[str, list]], Tuple[Any, int]], Callable[[Any], int]]] = {
+    "chunk_statute": (_setup_pages, _run_chunking),
+    "statute_citations": (_setup_chunks, _run_citations),
+    "cross_references": (_setup_chunks, _run_cross_references),
+    "legal_metadata": (_setup_chunks, _run_metadata),
+    "split_and_enrich": (_setup_pages, _run_split_and_enrich),
+    "bm25_fit": (_setup_texts, _run_bm25_fit),
+    "bm25_encode": (_setup_bm25_encode, _run_bm25_encode),
+}
+LOAD_PDF = "load_pdf"
+NAMES = (LOAD_PDF, *BENCHMARKS)
+
+
+def _peak_mb(fn: Callable[[], Any]) -> float:
+    """Peak traced heap allocated while ``fn`` runs, in MB."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / MB
+    finally:
+        tracemalloc.stop()
+
+
+def _result(items: int, size: int, seconds: float, peak_mb: float) -> Dict[str, float]:
+    return {
+        "items": items,
+        "mb": round(size / MB, 3),
+        "seconds": round(seconds, 4),
+        "items_per_s": round(items / seconds, 1),
+        "mb_per_s": round(size / MB / seconds, 3),
+        "peak_mb": round(peak_mb, 2),
+    }
+
+
+def run_benchmarks(corpus: Corpus, rounds: int = 5, only: Optional[List[str]] = None,
+                   reload: bool = False) -> Dict[str, Dict[str, float]]:
+    """
+    Throughput (best of ``rounds``) and peak memory per benchmark. load_pdf
+    reuses the corpus load time unless ``reload`` times a fresh load.
+    """
+    results = {}
+    largest = corpus.largest()
+    for name in only or NAMES:
+        if name == LOAD_PDF:
+            seconds = corpus.load_seconds
+            if reload:
+                start = time.perf_counter()
+                for path in corpus.paths.values():
+                    load_file(path)
+                seconds = time.perf_counter() - start
+            peak = _peak_mb(lambda: [load_file(corpus.paths[file_name]) for file_name in largest])
+            results[name] = _result(corpus.pages, corpus.file_bytes, seconds, peak)
+            continue
+        setup, run = BENCHMARKS[name]
+        best = float("inf")
+        for _ in range(rounds):
+            state, size = setup(corpus.files)
+            gc.collect()
+            start = time.perf_counter()
+            items = run(state)
+            best = min(best, time.perf_counter() - start)
+        state, _ = setup(largest)
+        results[name] = _result(items, size, best, _peak_mb(lambda: run(state)))
+    return results
+
+
+def _machine() -> Dict[str, Any]:
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(), "cpu_count": os.cpu_count()}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[Tuple[str, str, str]]:
+    """
+    (benchmark, metric, description) for each regression beyond ``threshold``
+    (a fraction of the baseline); benchmarks without a baseline are skipped.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if current["items_per_s"] < base["items_per_s"] * (1 - threshold):
+            regressions.append((name, "throughput", f"{current['items_per_s']}/s vs baseline {base['items_per_s']}/s "
+                                f"({_change(current['items_per_s'], base['items_per_s'])})"))
+        if current["peak_mb"] > base["peak_mb"] * (1 + threshold) + MEMORY_SLACK_MB:
+            regressions.append((name, "peak memory", f"{current['peak_mb']} MB vs baseline {base['peak_mb']} MB "
+                                f"({_change(current['peak_mb'], base['peak_mb'])})"))
+    return regressions
+
+
+def _change(current: float, base: float) -> str:
+    return f"{(current / base - 1) * 100:+.1f}%" if base else "n/a"
+
+
+def format_table(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> str:
+    columns = ["benchmark", "items", "items/s", "MB/s", "peak MB", "vs baseline"]
+    rows = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        delta = f"{_change(r['items_per_s'], base['items_per_s'])} / {_change(r['peak_mb'], base['peak_mb'])}" \
+            if base else "-"
+        rows.append([name, str(r["items"]), str(r["items_per_s"]), str(r["mb_per_s"]), str(r["peak_mb"]), delta])
+    widths = [max(len(c), *(len(row[i]) for row in rows)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.ljust(w) if i == 0 else c.rjust(w) for i, (c, w) in enumerate(zip(columns, widths)))]
+    lines += ["  ".join(v.ljust(w) if i == 0 else v.rjust(w) for i, (v, w) in enumerate(zip(row, widths)))
+              for row in rows]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--files", default=DEFAULT_FILES, help="Glob of corpus files (default: bundled statute PDFs)")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed runs per benchmark; the best is kept")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(NAMES)}")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed throughput drop or memory growth, as a fraction of the baseline")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Re-measurements of a throughput regression before it is reported")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline file")
+    parser.add_argument("--update", action="store_true", help="Record the results as the new baseline")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    only = args.only.split(",") if args.only else None
+    unknown = set(only or ()) - set(NAMES)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    corpus = load_corpus(args.files)
+    print(f"Corpus: {len(corpus.files)} files, {corpus.pages} pages, {corpus.file_bytes / MB:.1f} MB "
+          f"(loaded in {corpus.load_seconds:.1f}s)", file=sys.stderr)
+    results = run_benchmarks(corpus, args.rounds, only)
+
+    path = Path(args.baseline)
+    stored = json.loads(path.read_text()) if path.exists() else None
+    baseline = stored["benchmarks"] if stored and stored["corpus"] == corpus.fingerprint else {}
+    status = 0
+    if args.update:
+        path.write_text(json.dumps({
+            "recorded": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "corpus": corpus.fingerprint,
+            "machine": _machine(),
+            "rounds": args.rounds,
+            "benchmarks": {**baseline, **results},
+        }, indent=2) + "\n")
+        print(f"Baseline written to {path}", file=sys.stderr)
+        baseline = {}
+    elif stored is None:
+        print(f"No baseline at {path}; record one with --update", file=sys.stderr)
+    elif not baseline:
+        print("The baseline was recorded on a different corpus; record a new one with --update", file=sys.stderr)
+        status = 2
+    else:
+        if stored.get("machine") != _machine():
+            print(f"Note: baseline recorded on {stored.get('machine')}", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        for _ in range(args.retries):
+            suspects = sorted({name for name, metric, _ in regressions if metric == "throughput"})
+            if not suspects:
+                break
+            print(f"Re-measuring {', '.join(suspects)}", file=sys.stderr)
+            again = run_benchmarks(corpus, args.rounds, suspects, reload=True)
+            for name, result in again.items():
+                results[name] = max(results[name], result, key=lambda r: r["items_per_s"])
+            regressions = compare(results, baseline, args.threshold)
+        for name, metric, description in regressions:
+            print(f"REGRESSION {name} {metric}: {description}", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    print(format_table(results, baseline))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
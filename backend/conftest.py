@@ -0,0 +1,52 @@
+"""
+Shared test fixtures.
+"""
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services.cache import CorpusVersion, TTLCache
+from app.services.sessions import SessionStore
+from app.services.singleflight import SingleFlight
+
+
+@pytest.fixture
+def rag_pipeline(monkeypatch, tmp_path):
+    """
+    Wire rag to fakes with fresh per-test state: corpus version, caches
+    (``cache_size`` entries; 0 disables them), coalescing and sessions.
+    The store, search, reranker and model default to simple fakes that count
+    calls; pass your own to override them (``search=rag._hybrid_search`` keeps
+    the real hybrid query against ``store``). Returns (rag, calls).
+    """
+    from app.services import rag
+
+    def wire(store=None, search=None, reranker=None, model=None, cache_size=10):
+        calls = {"search": 0, "generate": 0}
+
+        def fake_search(store, query):
+            calls["search"] += 1
+            return [Document(id="chunk-1", page_content="940.01 First-degree intentional homicide.",
+                             metadata={"source": "ch_940.pdf", "score": 0.9})]
+
+        class FakeModel:
+            def generate_content(self, prompt, stream=False):
+                calls["generate"] += 1
+                if stream:
+                    return iter([SimpleNamespace(text="Answer")])
+                return SimpleNamespace(text="Answer")
+
+        store = store if store is not None else SimpleNamespace(name="fake")
+        monkeypatch.setattr(rag, "_get_store", lambda: store)
+        monkeypatch.setattr(rag, "_hybrid_search", search or fake_search)
+        monkeypatch.setattr(rag, "_get_reranker", lambda: reranker)
+        monkeypatch.setattr(rag, "_get_llm", model or FakeModel)
+        monkeypatch.setattr(rag, "_corpus_version", CorpusVersion(tmp_path / "corpus_version"))
+        for name in ("_query_vectors", "_retrieval_cache", "_answer_cache", "_rerank_scores"):
+            monkeypatch.setattr(rag, name, TTLCache(maxsize=cache_size, ttl=60))
+        monkeypatch.setattr(rag, "_inflight", SingleFlight())
+        monkeypatch.setattr(rag, "_sessions", SessionStore(maxsize=10, ttl=60))
+        return rag, calls
+
+    return wire
@@ -0,0 +1,309 @@
+"""
+Offline load test for the chat and search endpoints.
+
+By default this starts the API in a subprocess with PROVIDER_BACKEND=fake
+(local provider stand-ins with simulated, seeded latency; no network or API
+keys) and its index state in a scratch directory, ingests data/raw into the
+fake index, then replays prompts from sample_prompts.md and/or
+requests.jsonl-style files against /api/chat, /api/chat/stream and
+/api/search at each concurrency level. Each level is a closed loop: N
+clients each send their next request as soon as the previous one finishes.
+It reports throughput, p50/p95/p99 latency and, for the stream endpoint,
+time to first token (first content event).
+
+The started server has its caches and request coalescing turned off, so
+every request runs the whole pipeline; --warm keeps them, and prompts
+repeated within a run then measure the cached path. With --url the driver
+loads an already running server instead (whatever its configuration).
+
+Usage (from backend/):
+    python loadtest.py --concurrency 1,8,32 --requests 200
+    python loadtest.py --endpoints stream --traffic ../requests.jsonl --warm
+    python loadtest.py --set FAKE_LLM_FIRST_TOKEN=0.8 --set GENERATION_CONCURRENCY=16
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+BACKEND_DIR = Path(__file__).parent
+SAMPLE_PROMPTS = BACKEND_DIR.parent / "sample_prompts.md"
+
+ENDPOINTS = {
+    "chat": "/api/chat",
+    "stream": "/api/chat/stream",
+    "search": "/api/search",
+}
+
+# Started server settings (unless --warm): every request runs the whole pipeline
+COLD_SETTINGS = {
+    "QUERY_CACHE_SIZE": "0",
+    "RETRIEVAL_CACHE_SIZE": "0",
+    "ANSWER_CACHE_SIZE": "0",
+    "RERANK_CACHE_SIZE": "0",
+    "COALESCE_REQUESTS": "false",
+}
+
+_PROMPT = re.compile(r'^\*\*Prompt:\*\*\s*"(.+)"\s*$', re.MULTILINE)
+
+
+@dataclass
+class Prompt:
+    query: str
+    endpoint: Optional[str] = None  # Pins the prompt to one endpoint
+
+
+@dataclass
+class Result:
+    ok: bool
+    latency: float
+    ttft: Optional[float] = None
+
+
+def load_prompts(path: Path) -> List[Prompt]:
+    """
+    Prompts from a markdown file (``**Prompt:** "..."`` lines, as in
+    sample_prompts.md) or a JSONL file with one request object per line,
+    whose text is taken from "query", "prompt" or "title" and which may
+    name an "endpoint" (chat, stream or search).
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix != ".jsonl":
+        return [Prompt(query) for query in _PROMPT.findall(text)]
+    prompts = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        query = item.get("query") or item.get("prompt") or item.get("title")
+        if query:
+            prompts.append(Prompt(query, item.get("endpoint")))
+    return prompts
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0-100); None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(endpoint: str, concurrency: int, results: List[Result], elapsed: float) -> Dict[str, Any]:
+    """One report row: throughput of successful requests and latency percentiles in milliseconds."""
+    latencies = [r.latency for r in results if r.ok]
+    ttfts = [r.ttft for r in results if r.ok and r.ttft is not None]
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    row = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": sum(not r.ok for r in results),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    for q in (50, 95, 99):
+        row[f"p{q}_ms"] = ms(percentile(latencies, q))
+    if endpoint == "stream":
+        for q in (50, 95, 99):
+            row[f"ttft_p{q}_ms"] = ms(percentile(ttfts, q))
+    return row
+
+
+async def _send(client: httpx.AsyncClient, endpoint: str, query: str) -> Result:
+    start = time.perf_counter()
+    body = {"query": query}
+    try:
+        if endpoint != "stream":
+            response = await client.post(ENDPOINTS[endpoint], json=body)
+            return Result(response.status_code == 200, time.perf_counter() - start)
+
+        ttft = None
+        ok = True
+        async with client.stream("POST", ENDPOINTS[endpoint], json=body) as response:
+            ok = response.status_code == 200
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[len("data: "):])
+                if event.get("type") == "content" and ttft is None:
+                    ttft = time.perf_counter() - start
+                elif event.get("type") == "error":
+                    ok = False
+        return Result(ok, time.perf_counter() - start, ttft)
+    except httpx.HTTPError:
+        return Result(False, time.perf_counter() - start)
+
+
+async def run_level(client: httpx.AsyncClient, endpoint: str, prompts: List[Prompt],
+                    concurrency: int, total: int) -> Dict[str, Any]:
+    """Send ``total`` requests from ``concurrency`` closed-loop clients, cycling through the prompts."""
+    queries = [p.query for p in prompts if p.endpoint in (None, endpoint)]
+    if not queries:
+        raise ValueError(f"No prompts for endpoint {endpoint}")
+    results: List[Result] = []
+    sent = 0
+
+    async def worker():
+        nonlocal sent
+        while sent < total:
+            query = queries[sent % len(queries)]
+            sent += 1
+            results.append(await _send(client, endpoint, query))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(endpoint, concurrency, results, time.perf_counter() - start)
+
+
+# -- local server ----------------------------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(state_dir: Path, overrides: Dict[str, str]) -> tuple:
+    """Serve the API with fake providers; returns (process, base URL)."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "PROVIDER_BACKEND": "fake",
+        "VECTOR_BACKEND": "pinecone",
+        "STATE_DIR": str(state_dir),
+        "WARMUP_ON_STARTUP": "false",
+        **overrides,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+async def wait_until_up(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server not up after {timeout}s")
+
+
+# -- report ----------------------------------------------------------------
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    columns = ["endpoint", "concurrency", "requests", "errors", "throughput",
+               "p50_ms", "p95_ms", "p99_ms", "ttft_p50_ms", "ttft_p95_ms", "ttft_p99_ms"]
+    cells = [[("-" if row.get(c) is None else str(row[c])) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths))]
+    lines += ["  ".join(v.rjust(w) for v, w in zip(r, widths)) for r in cells]
+    return "\n".join(lines)
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    prompts = []
+    for path in args.prompts + args.traffic:
+        prompts.extend(load_prompts(Path(path)))
+    if not prompts:
+        raise SystemExit("No prompts loaded")
+    levels = [int(c) for c in args.concurrency.split(",")]
+    endpoints = args.endpoints.split(",")
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    overrides = {} if args.warm else dict(COLD_SETTINGS)
+    overrides.update(item.split("=", 1) for item in args.set)
+
+    process = None
+    scratch = None
+    url = args.url
+    if url is None:
+        scratch = Path(args.state_dir) if args.state_dir else Path(tempfile.mkdtemp(prefix="rag-loadtest-"))
+        process, url = start_server(scratch, overrides)
+
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+            if process is not None:
+                await wait_until_up(client, process)
+                print("Ingesting data/raw with fake providers...", file=sys.stderr)
+                start = time.perf_counter()
+                response = await client.post("/api/ingest", params={"full": "true"}, timeout=None)
+                response.raise_for_status()
+                ingest = response.json()
+                if ingest.get("status") == "error":
+                    raise SystemExit(f"Ingestion failed: {ingest.get('message')}")
+                print(f"Ingested {ingest.get('chunks_created', '?')} chunks "
+                      f"in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            rows = []
+            for endpoint in endpoints:
+                for concurrency in levels:
+                    row = await run_level(client, endpoint, prompts, concurrency, args.requests)
+                    print(f"{endpoint} x{concurrency}: {row['throughput']} req/s, "
+                          f"p95 {row['p95_ms']} ms", file=sys.stderr)
+                    rows.append(row)
+            return rows
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if scratch is not None and not args.state_dir:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--url", help="Load a running server instead of starting one with fake providers")
+    parser.add_argument("--endpoints", default="chat,stream,search", help="Comma-separated: chat, stream, search")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint and level")
+    parser.add_argument("--prompts", action="append", default=[],
+                        help=f"Markdown or JSONL prompt file (default: {SAMPLE_PROMPTS.name}); repeatable")
+    parser.add_argument("--traffic", action="append", default=[], help="Additional JSONL traffic file; repeatable")
+    parser.add_argument("--warm", action="store_true", help="Keep caches and coalescing on in the started server")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra setting for the started server, e.g. FAKE_LLM_FIRST_TOKEN=0.8")
+    parser.add_argument("--state-dir", help="Keep the started server's index state here (default: temporary)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", help="Also write the report rows to this file")
+    args = parser.parse_args(argv)
+    if not args.prompts and not args.traffic:
+        args.prompts = [str(SAMPLE_PROMPTS)]
+
+    rows = asyncio.run(run(args))
+    print(format_table(rows))
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
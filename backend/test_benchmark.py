@@ -0,0 +1,75 @@
+"""
+Tests for the ingest micro-benchmark suite and its baseline checks.
+Run with: python -m pytest backend/test_benchmark.py
+"""
+import json
+import time
+
+import benchmark
+
+
+def _write_corpus(tmp_path):
+    for chapter in ("940", "943"):
+        sections = "".join(
+            f"{chapter}.{i:02d} Offense {i}.\n\n(1) Whoever violates s. {chapter}.{i + 1:02d} (2) "
+            f"or s. 939.50 is guilty of a Class {'ABC'[i % 3]} felony.\n\n"
+            for i in range(1, 30)
+        )
+        (tmp_path / f"wisconsin_statute_ch_{chapter}.txt").write_text(sections)
+    return str(tmp_path / "wisconsin_statute_*.txt")
+
+
+def test_benchmarks_measure_every_path(tmp_path):
+    corpus = benchmark.load_corpus(_write_corpus(tmp_path))
+    results = benchmark.run_benchmarks(corpus, rounds=2)
+
+    assert list(results) == list(benchmark.NAMES)
+    assert results["load_pdf"]["items"] == corpus.pages == 2
+    chunk_counts = {results[name]["items"] for name in benchmark.BENCHMARKS}
+    assert len(chunk_counts) == 1 and chunk_counts.pop() > 2
+    for result in results.values():
+        assert result["items_per_s"] > 0 and result["mb_per_s"] > 0 and result["peak_mb"] >= 0
+    assert results["split_and_enrich"]["peak_mb"] > 0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = {
+        "legal_metadata": {"items_per_s": 1000.0, "peak_mb": 10.0},
+        "bm25_fit": {"items_per_s": 1000.0, "peak_mb": 0.02},
+    }
+    results = {
+        "legal_metadata": {"items_per_s": 700.0, "peak_mb": 13.0},
+        "bm25_fit": {"items_per_s": 850.0, "peak_mb": 0.2},
+        "bm25_encode": {"items_per_s": 1.0, "peak_mb": 99.0},
+    }
+    regressions = benchmark.compare(results, baseline, threshold=0.2)
+
+    assert [(name, metric) for name, metric, _ in regressions] == [
+        ("legal_metadata", "throughput"), ("legal_metadata", "peak memory"),
+    ]
+    assert "-30.0%" in regressions[0][2]
+    assert benchmark.compare(results, baseline, threshold=0.35) == []
+
+
+def test_baseline_round_trip_and_persistent_regressions(monkeypatch, tmp_path):
+    files = _write_corpus(tmp_path)
+    baseline = tmp_path / "baseline.json"
+    args = ["--files", files, "--baseline", str(baseline), "--rounds", "2"]
+
+    assert benchmark.main(args + ["--update"]) == 0
+    stored = json.loads(baseline.read_text())
+    assert set(stored["benchmarks"]) == set(benchmark.NAMES) and stored["corpus"]
+
+    # A hot path made much slower stays slow when re-measured
+    run_metadata = benchmark._run_metadata
+
+    def slow_metadata(chunks):
+        time.sleep(0.2)
+        return run_metadata(chunks)
+
+    monkeypatch.setitem(benchmark.BENCHMARKS, "legal_metadata", (benchmark._setup_chunks, slow_metadata))
+    assert benchmark.main(args + ["--only", "legal_metadata", "--retries", "1"]) == 1
+    monkeypatch.undo()
+
+    (tmp_path / "wisconsin_statute_ch_948.txt").write_text("948.02 Sexual assault of a child.\n")
+    assert benchmark.main(args + ["--only", "statute_citations"]) == 2
@@ -0,0 +1,73 @@
+"""
+Tests for the binary BM25 model.
+Run with: python -m pytest backend/test_bm25.py
+"""
+import re
+
+import numpy as np
+import pytest
+
+from app.services.bm25 import BM25Model
+
+CORPUS = [
+    "940.01 First-degree intentional homicide. Whoever causes the death of another human being",
+    "346.63 Operating under influence of intoxicant or other drug. No person may drive",
+    "Miranda warnings are required before custodial interrogation of a juvenile",
+    "",
+    "The penalty for operating while intoxicated increases with each offense offense offense",
+]
+
+
+class SimpleTokenizer:
+    """Stand-in for pinecone_text's NLTK tokenizer (no NLTK data needed)."""
+
+    def __init__(self, **params):
+        self.__dict__.update(params)
+
+    def __call__(self, text):
+        return re.findall(r"[a-z0-9.]+", text.lower())
+
+
+@pytest.fixture
+def reference(monkeypatch):
+    """pinecone_text's BM25Encoder fit on CORPUS with the same tokenizer."""
+    import pinecone_text.sparse.bm25_encoder as bm25_encoder
+
+    monkeypatch.setattr(bm25_encoder, "BM25Tokenizer", SimpleTokenizer)
+    return bm25_encoder.BM25Encoder().fit(CORPUS)
+
+
+def test_scores_match_pinecone_text(reference):
+    """Query and document vectors are identical to BM25Encoder's."""
+    model = BM25Model(tokenizer=SimpleTokenizer()).fit(CORPUS)
+    assert model.n_docs == reference.n_docs and model.avgdl == reference.avgdl
+
+    queries = ["penalty for operating while intoxicated", "unseen words only", "", "940.01 homicide homicide"]
+    for query in queries:
+        assert model.encode_queries(query) == reference.encode_queries(query)
+    assert model.encode_queries(queries) == reference.encode_queries(queries)
+    assert model.encode_documents(CORPUS) == reference.encode_documents(CORPUS)
+    assert model.encode_documents(CORPUS[0]) == reference.encode_documents(CORPUS[0])
+
+
+def test_json_conversion_and_memory_mapped_load(reference, tmp_path):
+    """A pinecone_text JSON model converts to sorted arrays that load memory-mapped."""
+    reference.dump(str(tmp_path / "bm25_encoder.json"))
+    BM25Model.from_json(tmp_path / "bm25_encoder.json").save(tmp_path / "bm25")
+
+    assert BM25Model.exists(tmp_path / "bm25")
+    model = BM25Model.load(tmp_path / "bm25", tokenizer=SimpleTokenizer())
+    assert isinstance(model.hashes, np.memmap) and model.hashes.dtype == np.uint32
+    assert np.all(np.diff(model.hashes.astype(np.int64)) > 0)
+    assert model.tokenizer_params["stem"] is True
+
+    query = "operating under influence of intoxicant"
+    assert model.encode_queries(query) == reference.encode_queries(query)
+    assert model.encode_documents(CORPUS[:3]) == reference.encode_documents(CORPUS[:3])
+
+
+def test_unfit_model_raises():
+    with pytest.raises(ValueError):
+        BM25Model(tokenizer=SimpleTokenizer()).encode_queries("owi")
+    with pytest.raises(ValueError):
+        BM25Model(tokenizer=SimpleTokenizer()).fit(["", "  "])
@@ -0,0 +1,147 @@
+"""
+Tests for the in-process RAG caches.
+Run with: python -m pytest backend/test_cache.py
+"""
+import asyncio
+import time
+
+from app.services.cache import CorpusVersion, TTLCache, normalize_query
+
+
+def test_normalize_query():
+    """Whitespace, case and Unicode variants share one cache key."""
+    assert normalize_query("  Elements of   OWI ") == "elements of owi"
+    assert normalize_query("§ 940.01") == normalize_query("§ 940.01")
+
+
+def test_lru_eviction():
+    """The least recently used entry is evicted first."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    """Entries expire after their time-to-live."""
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("q", "vector")
+    assert cache.get("q") == "vector"
+    time.sleep(0.06)
+    assert cache.get("q") is None
+    assert len(cache) == 0
+
+
+def test_hit_miss_counters():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.get("missing")
+    cache.set("q", 1)
+    cache.get("q")
+    cache.get("q")
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_zero_size_disables_cache():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set("q", 1)
+    assert cache.get("q") is None
+
+
+def test_repeat_queries_skip_embedding(monkeypatch, tmp_path):
+    """Repeated (normalized) queries reuse the cached dense and sparse vectors."""
+    from app.services import rag
+
+    calls = {"dense": 0, "sparse": 0}
+
+    class FakeEmbeddings:
+        def embed_query(self, text):
+            calls["dense"] += 1
+            return [0.1, 0.2]
+
+    class FakeBM25:
+        def encode_queries(self, text):
+            calls["sparse"] += 1
+            return {"indices": [1], "values": [1.0]}
+
+    monkeypatch.setattr(rag, "_get_embeddings", lambda: FakeEmbeddings())
+    monkeypatch.setattr(rag, "_get_bm25", lambda: FakeBM25())
+    monkeypatch.setattr(rag, "_query_vectors", TTLCache(maxsize=10, ttl=60))
+    monkeypatch.setattr(rag, "_corpus_version", CorpusVersion(tmp_path / "corpus_version"))
+
+    first = rag._encode_query("Elements of OWI")
+    second = rag._encode_query("elements of  owi")
+
+    assert first == second
+    assert calls == {"dense": 1, "sparse": 1}
+
+    # An ingest in another worker refit BM25: its corpus version bump retires the vectors
+    CorpusVersion(tmp_path / "corpus_version").bump()
+    rag._encode_query("elements of owi")
+    assert calls == {"dense": 2, "sparse": 2}
+
+
+def test_bm25_reloads_after_another_worker_refits(monkeypatch, tmp_path):
+    import os
+
+    from app.services import rag
+    from app.services.bm25 import BM25Model
+
+    monkeypatch.setattr(rag, "BM25_DIR", tmp_path / "bm25")
+    monkeypatch.setattr(rag, "_bm25", None)
+    BM25Model().fit(["operating while intoxicated"]).save(tmp_path / "bm25")
+    loaded = rag._get_bm25()
+    assert rag._get_bm25() is loaded and loaded.n_docs == 1
+
+    BM25Model().fit(["operating while intoxicated", "arson of a building"]).save(tmp_path / "bm25")
+    # Fits in quick succession can share an mtime tick
+    params = tmp_path / "bm25" / "params.json"
+    os.utime(params, ns=(os.stat(params).st_atime_ns, os.stat(params).st_mtime_ns + 1_000_000_000))
+    assert rag._get_bm25().n_docs == 2
+
+
+def test_corpus_version_bump_is_shared(tmp_path):
+    """A bump written by one worker is seen by another reading the same file."""
+    path = tmp_path / "corpus_version"
+    writer = CorpusVersion(path)
+    reader = CorpusVersion(path)
+    assert reader.current() == 0
+
+    assert writer.bump() == 1
+    assert reader.current() == 1
+    assert writer.bump() == 2
+    assert reader.current() == 2
+
+
+def test_chat_answers_are_cached(rag_pipeline):
+    """A repeated question is answered from cache without retrieval or generation."""
+    rag, calls = rag_pipeline()
+
+    first = asyncio.run(rag.chat("What is first-degree homicide?"))
+    second = asyncio.run(rag.chat("what is  first-degree homicide?"))
+
+    assert first["cache"] == {"retrieval": False, "answer": False, "coalesced": False}
+    assert second["cache"] == {"retrieval": True, "answer": True, "coalesced": False}
+    assert second["answer"] == first["answer"]
+    assert calls == {"search": 1, "generate": 1}
+    assert second["context"] == first["context"] and first["context"]["passages"] == 1
+
+
+def test_corpus_change_invalidates_caches(rag_pipeline):
+    """After a corpus version bump, nothing cached earlier is served."""
+    rag, calls = rag_pipeline()
+
+    asyncio.run(rag.search("miranda rights"))
+    assert asyncio.run(rag.search("miranda rights"))["cache"] == {"retrieval": True}
+
+    rag.bump_corpus_version()
+    assert asyncio.run(rag.search("miranda rights"))["cache"] == {"retrieval": False}
+    assert calls["search"] == 2
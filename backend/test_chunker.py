@@ -0,0 +1,93 @@
+"""
+Tests for the statute-structure-aware chunker.
+Run with: python -m pytest backend/test_chunker.py
+"""
+from langchain_core.documents import Document
+
+from app.services.chunker import has_statute_structure, iter_statute_chunks
+from app.services.ingest import split_and_enrich
+
+RUNNING_HEADER = "CRIMES AGAINST LIFE 940.{page}  Updated 23-24 Wis. Stats."
+
+
+def _statute_pages():
+    body_1 = (
+        "940.01 First-degree intentional homicide.   (1) OFFENSES.  Whoever causes\n"
+        "the death of another human being with intent to kill is guilty of a Class A felony.\n"
+        "(2) MITIGATING CIRCUMSTANCES.  The following are affirmative defenses:\n"
+        "(a)  Adequate provocation.  Death was caused under the influence of adequate\n"
+        "provocation as defined in s. 939.44.\n"
+        + "(b)  Unnecessary defensive force.  The actor believed force was necessary.\n" * 8
+        + "(3) BURDEN OF PROOF.  The state must prove beyond a reasonable doubt that the\n"
+        "facts constituting the defense did not exist.  See § 939.70.\n"
+        "When the defense is placed in issue by the trial evidence, the jury is instructed\n"
+        "on both the offense and the mitigated offense.\n"
+    )
+    body_2 = (
+        "940.02 First-degree reckless homicide.   (1) Whoever recklessly causes the\n"
+        "death of another human being under circumstances which show utter disregard\n"
+        "for human life is guilty of a Class B felony.\n"
+        "940.01 (2) did not exist when the offense was charged.\n"
+        "940.03 Felony murder.  Whoever causes death while committing a felony may be\n"
+        "imprisoned for not more than 15 years in excess of the maximum term.\n"
+    )
+    pages = [
+        "CHAPTER 940\nCRIMES AGAINST LIFE\n940.01 First-degree intentional homicide.\n"
+        "940.02 First-degree reckless homicide.\n940.03 Felony murder.\n",
+        body_1,
+        body_2,
+    ]
+    return [
+        Document(page_content=f"{RUNNING_HEADER.format(page=i)}\n{text}", metadata={"source": "ch940.pdf", "page": i})
+        for i, text in enumerate(pages)
+    ] + [
+        Document(page_content=f"{RUNNING_HEADER.format(page=3)}\nHistory:  1987 a. 399.\n",
+                 metadata={"source": "ch940.pdf", "page": 3})
+    ]
+
+
+def test_chunks_follow_statute_structure():
+    """Chunks start on section/subsection boundaries and inherit their location."""
+    docs = _statute_pages()
+    chunks = list(iter_statute_chunks(docs, chunk_size=400, chunk_overlap=100))
+
+    assert all(len(chunk.page_content) <= 400 for chunk in chunks)
+    assert not any("Updated 23-24" in chunk.page_content for chunk in chunks)
+
+    by_start = {chunk.page_content.split("\n")[0][:12]: chunk.metadata for chunk in chunks}
+    assert by_start["(3) BURDEN O"]["statute_num"] == "940.01(3)"
+    assert by_start["(3) BURDEN O"]["subsection"] == "3"
+    assert by_start["(3) BURDEN O"]["section_title"] == "First-degree intentional homicide"
+    assert by_start["(3) BURDEN O"]["page"] == 1
+
+    # The table of contents packs into one chunk covering every listed section
+    toc = next(c for c in chunks if c.metadata.get("sections", [None])[0] == "940.01" and c.metadata["page"] == 0)
+    assert toc.metadata["sections"] == ["940.01", "940.02", "940.03"]
+
+    # A wrapped citation line is not a section header; the page-3 history note stays with 940.03
+    reckless = next(c for c in chunks if c.page_content.startswith("940.02 First-degree reckless"))
+    assert "did not exist" in reckless.page_content
+    assert chunks[-1].metadata["sections"][-1] == "940.03"
+    assert "History:" in chunks[-1].page_content
+
+
+def test_statute_chunks_send_less_text_to_the_embedder():
+    """Structure-aware chunking covers the statute with less duplicated text."""
+    docs = _statute_pages()
+    assert has_statute_structure(docs)
+
+    recursive = split_and_enrich([d.model_copy(deep=True) for d in docs], 400, 100, strategy="recursive")
+    statute = split_and_enrich([d.model_copy(deep=True) for d in docs], 400, 100, strategy="statute")
+
+    assert sum(len(c.page_content) for c in statute) < sum(len(c.page_content) for c in recursive)
+    assert all(c.metadata["doc_type"] == "statute" for c in statute)
+    burden = next(c for c in statute if c.page_content.startswith("(3) BURDEN"))
+    assert burden.metadata["statutes_cited"] == ["§ 939.70"]
+
+
+def test_non_statute_documents_fall_back_to_recursive():
+    """Files without section headers keep the character splitter."""
+    docs = [Document(page_content="In State v. Smith, 2020 WI 45, the court held...", metadata={"source": "case.pdf"})]
+    assert not has_statute_structure(docs)
+    chunks = split_and_enrich(docs, 400, 100, strategy="statute")
+    assert chunks[0].metadata["case_citation"] == "2020 WI 45"
@@ -0,0 +1,87 @@
+"""
+Tests for the exact statute/case citation index.
+Run with: python -m pytest backend/test_citation_index.py
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.services.citation_index import CitationIndex, citation_keys, parse_citation_query
+
+
+def test_citation_keys_from_chunk_metadata():
+    """A chunk defines its own location (and its parents) and cites what it references."""
+    defines, cites = citation_keys({
+        "section_number": "940.01",
+        "statute_num": "940.01(2)",
+        "sections": ["940.01"],
+        "statutes_cited": ["§ 939.44", "Wis. Stat. § 940.01(2)", "ch. 940"],
+        "cases_cited": ["2020  WI 45"],
+    })
+    assert defines == ["940.01(2)", "940.01"]
+    assert cites == ["939.44", "2020 WI 45"]
+
+
+def test_parse_citation_query():
+    """Pure citation lookups are recognized; questions around a citation are not."""
+    assert parse_citation_query("§ 346.63") == (["346.63"], True)
+    assert parse_citation_query("Wis. Stat. 940.01(2)(a)") == (["940.01(2)(a)"], True)
+    assert parse_citation_query("State v. Smith, 2020 WI 45") == (["2020 WI 45"], True)
+    keys, citation_only = parse_citation_query("What is the penalty under 346.63 for a second offense?")
+    assert keys == ["346.63"] and not citation_only
+    assert parse_citation_query("elements of OWI") == ([], False)
+
+
+def test_lookup_order_and_persistence(tmp_path):
+    """Defining chunks rank before citing ones, most specific location first; the index round-trips."""
+    index = CitationIndex(tmp_path / "citation_index.json")
+    index.replace_file("ch940.pdf", [
+        ("sec", ["940.01"], []),
+        ("sub2", ["940.01(2)", "940.01"], ["939.44"]),
+        ("plain", [], []),
+    ])
+    index.replace_file("ch939.pdf", [("cites", ["939.44"], ["940.01(2)"])])
+
+    assert index.lookup(["940.01(2)(a)"], limit=5) == ["sub2", "sec", "cites"]
+    assert index.lookup(["940.01(2)"], limit=1) == ["sub2"]
+    assert len(index) == 3  # chunks without citations are not stored
+
+    index.save()
+    reloaded = CitationIndex.load(tmp_path / "citation_index.json")
+    assert reloaded.lookup(["939.44"], limit=5) == ["cites", "sub2"]
+    reloaded.remove_file("ch939.pdf")
+    assert reloaded.lookup(["939.44"], limit=5) == ["sub2"]
+
+
+def test_citation_query_skips_vector_search(monkeypatch, tmp_path, rag_pipeline):
+    """A citation-only search is served by the index and a fetch, without hybrid search."""
+    from langchain_core.documents import Document
+    from app.services import rag
+
+    index = CitationIndex(tmp_path / "citation_index.json")
+    index.replace_file("ch346.pdf", [("owi", ["346.63"], [])])
+    index.save()
+
+    fetched = []
+
+    def fetch(ids):
+        fetched.append(list(ids))
+        return [Document(id=i, page_content="346.63 Operating under influence of intoxicant.",
+                         metadata={"source": "ch346.pdf", "statute_num": "346.63"}) for i in ids]
+
+    def fake_search(store, query):
+        assert "346.63" not in query or "penalty" in query
+        return [Document(id="other", page_content="Penalties.", metadata={"source": "ch346.pdf"})]
+
+    rag_pipeline(store=SimpleNamespace(name="fake", fetch=fetch), search=fake_search)
+    monkeypatch.setattr(rag, "CITATION_INDEX_PATH", tmp_path / "citation_index.json")
+    monkeypatch.setattr(rag, "_citation_index", None)
+
+    exact = asyncio.run(rag.search("Wis. Stat. § 346.63"))
+    assert [r["score"] for r in exact["results"]] == [1.0]
+    assert exact["citations"] == 1
+    assert fetched == [["owi"]]
+
+    # A question mentioning the citation gets the exact match ahead of the semantic results
+    mixed = asyncio.run(rag.search("penalty under 346.63"))
+    assert [r["text"][:6] for r in mixed["results"]] == ["346.63", "Penalt"]
+    assert fetched == [["owi"]]  # fetched chunks are served from the retrieval cache
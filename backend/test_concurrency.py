@@ -0,0 +1,204 @@
+"""
+Tests for the non-blocking RAG pipeline helpers.
+Run with: python -m pytest backend/test_concurrency.py
+"""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from app.services import concurrency
+
+
+def test_blocking_calls_overlap():
+    """Blocking calls offloaded to the pool should run concurrently."""
+    def slow():
+        time.sleep(0.2)
+        return threading.current_thread().name
+
+    async def run():
+        return await asyncio.gather(*[concurrency.run_blocking("retrieval", slow) for _ in range(4)])
+
+    start = time.perf_counter()
+    names = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.6
+    assert all(name.startswith("rag-io") for name in names)
+
+
+def test_stage_limit_is_enforced(monkeypatch):
+    """No more than the configured number of calls may be in flight per stage."""
+    monkeypatch.setattr(concurrency.settings, "rerank_concurrency", 2)
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def tracked():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+
+    async def run():
+        await asyncio.gather(*[concurrency.run_blocking("rerank", tracked) for _ in range(6)])
+
+    asyncio.run(run())
+    assert peak == 2
+
+
+def test_event_loop_stays_responsive():
+    """A slow retrieval must not stall other coroutines on the loop."""
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        await asyncio.gather(concurrency.run_blocking("retrieval", time.sleep, 0.2), ticker())
+        return ticks
+
+    assert asyncio.run(run()) == 5
+
+
+def test_search_requests_overlap(monkeypatch):
+    """Concurrent search() calls should overlap their retrieval I/O."""
+    from langchain_core.documents import Document
+    from app.services import rag
+
+    def slow_search(store, query):
+        time.sleep(0.2)
+        return [Document(page_content=query, metadata={"source": "ch_940.pdf"})]
+
+    monkeypatch.setattr(rag, "_get_store", lambda: SimpleNamespace(name="fake"))
+    monkeypatch.setattr(rag, "_hybrid_search", slow_search)
+
+    async def run():
+        return await asyncio.gather(*[rag.search(f"query {i}", top_k=5) for i in range(4)])
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.6
+    assert [r["results"][0]["text"] for r in results] == [f"query {i}" for i in range(4)]
+
+
+def test_stream_bridge_yields_in_order():
+    """Items from a blocking iterator arrive in order, off the event loop."""
+    def tokens():
+        for i in range(5):
+            time.sleep(0.01)
+            yield i
+
+    async def run():
+        return [item async for item in concurrency.iterate_in_thread("generation", tokens)]
+
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+
+
+def test_stream_bridge_applies_backpressure():
+    """The producer should stall once the bounded queue is full."""
+    produced = []
+
+    def tokens():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    async def run():
+        stream = concurrency.iterate_in_thread("generation", tokens, maxsize=4)
+        first = await stream.__anext__()
+        await asyncio.sleep(0.2)
+        ahead = len(produced)
+        await stream.aclose()
+        return first, ahead
+
+    first, ahead = asyncio.run(run())
+    assert first == 0
+    # queue capacity + the item handed to the consumer + one blocked put
+    assert ahead <= 6
+
+
+def test_stream_bridge_propagates_errors():
+    """Errors raised by the upstream stream surface in the consumer."""
+    def tokens():
+        yield "partial"
+        raise RuntimeError("upstream failed")
+
+    async def run():
+        received = []
+        try:
+            async for item in concurrency.iterate_in_thread("generation", tokens):
+                received.append(item)
+        except RuntimeError as e:
+            return received, str(e)
+
+    assert asyncio.run(run()) == (["partial"], "upstream failed")
+
+
+def test_stream_bridge_keeps_loop_responsive():
+    """Slow token waits must not block other coroutines."""
+    def tokens():
+        for i in range(3):
+            time.sleep(0.1)
+            yield i
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(10):
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        async def consume():
+            return [item async for item in concurrency.iterate_in_thread("generation", tokens)]
+
+        items, _ = await asyncio.gather(consume(), ticker())
+        return items, ticks
+
+    assert asyncio.run(run()) == ([0, 1, 2], 10)
+
+
+def test_call_with_retry_backs_off_on_transient_errors(monkeypatch):
+    """Rate limits are retried; other errors surface immediately."""
+    monkeypatch.setattr(concurrency.time, "sleep", lambda seconds: None)
+
+    class RateLimitError(Exception):
+        status_code = 429
+
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RateLimitError("slow down")
+        return "ok"
+
+    assert concurrency.call_with_retry(flaky, attempts=5) == "ok"
+    assert len(calls) == 3
+
+    calls.clear()
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad input")
+
+    try:
+        concurrency.call_with_retry(broken, attempts=5)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+    assert len(calls) == 1
+
+    # Non-positive attempts still make the call once
+    assert concurrency.call_with_retry(lambda: "ok", attempts=0) == "ok"
@@ -0,0 +1,67 @@
+"""
+Tests for the token-budgeted context packer.
+Run with: python -m pytest backend/test_context_packer.py
+"""
+from langchain_core.documents import Document
+
+from app.services.context_packer import SEPARATOR, estimate_tokens, pack_context
+
+TEXT = " ".join(f"Sentence {i} of section 346.63 about operating while intoxicated." for i in range(40))
+
+
+def _doc(text, source="ch_346.pdf"):
+    return Document(page_content=text, metadata={"source": source})
+
+
+def test_overlapping_chunks_from_one_source_are_merged():
+    # Three character windows with 200 characters of overlap, retrieved out of order
+    windows = [TEXT[0:1000], TEXT[800:1800], TEXT[1600:2600]]
+    packed = pack_context([_doc(windows[2]), _doc(windows[0]), _doc(windows[1])])
+    assert packed.passages == 1 and packed.merged == 2
+    assert packed.text == f"[Source: ch_346.pdf]\n{TEXT[0:2600]}"
+    assert packed.tokens_saved == packed.tokens_unpacked - packed.tokens > 100
+
+    # The same overlap in different sources is left alone
+    packed = pack_context([_doc(windows[0], "a.pdf"), _doc(windows[1], "b.pdf")])
+    assert packed.passages == 2 and packed.merged == 0
+
+
+def test_near_duplicates_keep_the_more_relevant_chunk():
+    # Same text as laid out by another PDF export, plus a page footer
+    copy = TEXT[:1000].replace(". ", ".\n") + "\nPage 12"
+    packed = pack_context([_doc(TEXT[:1000], "statutes_2023.pdf"), _doc("Miranda warnings for juveniles."),
+                           _doc(copy, "statutes_2023 (1).pdf")])
+    assert packed.duplicates == 1 and packed.passages == 2
+    assert "statutes_2023.pdf" in packed.text and "(1)" not in packed.text
+    assert packed.included == (0, 1)
+
+    # Empty chunks are not duplicates
+    packed = pack_context([_doc(" "), _doc(TEXT[:1000])])
+    assert (packed.empty, packed.duplicates, packed.included) == (1, 0, (1,))
+
+
+def test_passages_are_packed_by_relevance_into_the_budget():
+    docs = [_doc("A" * 400, "first.pdf"), _doc("B" * 2000, "second.pdf"), _doc("C" * 400, "third.pdf")]
+    packed = pack_context(docs, max_tokens=300)
+    # The second passage does not fit; the third still does
+    assert packed.text.split(SEPARATOR)[1].startswith("[Source: third.pdf]")
+    assert packed.omitted == 1 and packed.tokens <= 300
+    assert packed.included == (0, 2)
+
+    # Omitted counts chunks, not merged passages
+    windows = [TEXT[0:1000], TEXT[800:1800]]
+    packed = pack_context([_doc("A" * 1000, "first.pdf"), _doc(windows[0]), _doc(windows[1])], max_tokens=300)
+    assert packed.passages == 1 and packed.omitted == 2 and packed.included == (0,)
+
+    # A top passage larger than the whole budget is truncated, not dropped
+    packed = pack_context([_doc("D" * 4000)], max_tokens=100)
+    assert packed.passages == 1 and packed.tokens == 100 == estimate_tokens(packed.text)
+
+
+def test_sources_are_the_packed_chunks():
+    from app.services import rag
+
+    docs = [_doc(TEXT[:1000], "statutes_2023.pdf"), _doc(TEXT[:1000], "statutes_2023 (1).pdf"),
+            _doc("Miranda warnings for juveniles.", "juvenile.pdf")]
+    sources = rag._sources(docs, pack_context(docs), reranked=False)
+    assert [(s["id"], s["metadata"]["source"]) for s in sources] == [("0", "statutes_2023.pdf"), ("2", "juvenile.pdf")]
@@ -0,0 +1,106 @@
+"""
+Tests for the parallel ingestion stages.
+Run with: python -m pytest backend/test_ingest.py
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+from app.services.ingest import FileResult, embed_and_upsert, process_files
+
+
+def _write_corpus(tmp_path):
+    files = {}
+    for i, section in enumerate(["940.01", "940.02", "943.20"]):
+        path = tmp_path / f"statute_{i}.txt"
+        path.write_text(f"{section} Offense {i}.\n\n(1) Whoever violates § {section}(1)(a) is guilty.\n" * 20)
+        files[path.name] = path
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    files[broken.name] = broken
+    return files
+
+
+def test_parallel_matches_serial(tmp_path):
+    """Worker processes produce the same chunks, in the same order, as in-process parsing."""
+    files = _write_corpus(tmp_path)
+    serial = list(process_files(files, chunk_size=300, chunk_overlap=50, workers=1))
+    parallel = list(process_files(files, chunk_size=300, chunk_overlap=50, workers=2))
+
+    assert [r.rel for r in parallel] == list(files)
+    assert [[c.page_content for c in r.chunks] for r in parallel] == \
+           [[c.page_content for c in r.chunks] for r in serial]
+    assert [[c.metadata for c in r.chunks] for r in parallel] == \
+           [[c.metadata for c in r.chunks] for r in serial]
+
+
+def test_errors_are_isolated_per_file(tmp_path):
+    """A file that fails to parse reports an error without affecting the others."""
+    files = _write_corpus(tmp_path)
+    results = {r.rel: r for r in process_files(files, chunk_size=300, chunk_overlap=50, workers=2)}
+
+    assert results["broken.pdf"].error
+    assert results["broken.pdf"].chunks == []
+    for rel in ["statute_0.txt", "statute_1.txt", "statute_2.txt"]:
+        assert results[rel].error is None
+        assert results[rel].chunks
+        assert results[rel].chunks[0].metadata["statute_num"]
+
+
+class _RecordingStore:
+    def __init__(self, fail_on=None):
+        self.upserted = []
+        self.in_flight = 0
+        self.peak = 0
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def upsert(self, ids, texts, dense, sparse, metadatas):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        if self.fail_on in texts:
+            raise RuntimeError("upsert rejected")
+        self.upserted.extend(ids)
+
+
+def _result(rel, texts):
+    chunks = [SimpleNamespace(page_content=t, metadata={"source": rel}) for t in texts]
+    return FileResult(rel, documents=1, chunks=chunks)
+
+
+def _encode(texts):
+    return [[0.0]] * len(texts), [{"indices": [], "values": []}] * len(texts)
+
+
+def test_embed_and_upsert_is_bounded_and_ordered():
+    """Batches respect the in-flight cap and outcomes come back in file order."""
+    results = [_result(f"f{i}.txt", [f"chunk {i}-{j}" for j in range(10)]) for i in range(5)]
+    store = _RecordingStore()
+    outcomes = list(embed_and_upsert(iter(results), store, _encode, lambda rel, text: f"{rel}:{text}",
+                                     batch_size=3, max_in_flight=2))
+
+    assert [o.rel for o in outcomes] == [f"f{i}.txt" for i in range(5)]
+    assert all(o.error is None and len(o.chunk_ids) == 10 for o in outcomes)
+    assert store.peak <= 2
+    assert len(store.upserted) == 50
+    assert all(r.chunks == [] for r in results)
+
+
+def test_embed_and_upsert_isolates_failures():
+    """A failed batch marks only its own file as errored; parse errors pass through."""
+    results = [
+        _result("ok.txt", ["a", "b", "a"]),
+        _result("bad.txt", ["poison", "c"]),
+        FileResult("broken.pdf", error="PdfReadError: EOF"),
+    ]
+    store = _RecordingStore(fail_on="poison")
+    outcomes = {o.rel: o for o in embed_and_upsert(results, store, _encode, lambda rel, text: f"{rel}:{text}",
+                                                    batch_size=1, max_in_flight=4)}
+
+    assert outcomes["ok.txt"].chunk_ids == ["ok.txt:a", "ok.txt:b"]
+    assert "upsert rejected" in outcomes["bad.txt"].error
+    assert outcomes["broken.pdf"].error == "PdfReadError: EOF"
@@ -7,6 +7,7 @@ from app.services.legal_parser import (
     extract_case_citations,
     extract_cross_references,
     extract_legal_metadata,
+    extract_legal_metadata_batch,
     detect_hierarchical_level,
     normalize_statute_number
 )
@@ -145,6 +146,32 @@ def test_sensitive_topic_detection():
         print(f"  Expected: {expected_topic}, Got: {detected_topic}, Sensitive: {is_sensitive}")
 
 
+def test_batch_metadata_extraction():
+    """Test batch extraction and case-insensitive matching."""
+    print("\n\n=== Testing Batch Metadata Extraction ===")
+
+    texts = [
+        "SECTION 940.01(1)(A) applies. SEE § 939.50.",
+        "Under WIS. STAT. § 346.63(1)(a) (2023-24), see also State v. Jones, 2021 WI App 123.",
+        # Kelvin sign matches 'k' case-insensitively but does not lowercase to it
+        "Chapter 48 \u212anown as the Children's Code; see § 48.02",
+        "",
+    ]
+    sources = [f"doc_{i}.pdf" for i in range(len(texts))]
+
+    batch = extract_legal_metadata_batch(texts, sources)
+    assert batch == [extract_legal_metadata(text, source) for text, source in zip(texts, sources)]
+
+    # Citations are grouped by pattern (full, short, narrative, chapter)
+    assert batch[0]["statutes_cited"] == ["§ 939.50", "SECTION 940.01(1)(A)"]
+    assert batch[0]["cross_references"][0]["target"] == "939.50."
+    assert batch[1]["statutes_cited"][0] == "WIS. STAT. § 346.63(1)(a) (2023-24)"
+    assert batch[1]["case_citation"] == "2021 WI App 123"
+    assert batch[2]["chapter"] == "48"
+    for text, metadata in zip(texts, batch):
+        print(f"Text: {text[:50]!r} -> {metadata.get('statute_num')}, {metadata['statutes_cited']}")
+
+
 if __name__ == "__main__":
     print("=" * 70)
     print("Wisconsin Legal Parser - Test Suite")
@@ -157,6 +184,7 @@ if __name__ == "__main__":
     test_legal_metadata_extraction()
     test_normalize_statute()
     test_sensitive_topic_detection()
+    test_batch_metadata_extraction()
 
     print("\n" + "=" * 70)
     print("All tests completed!")
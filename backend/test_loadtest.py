@@ -0,0 +1,109 @@
+"""
+Tests for the offline load-test harness: provider stand-ins and driver.
+Run with: python -m pytest backend/test_loadtest.py
+"""
+import asyncio
+import json
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+import loadtest
+from app.services import fakes, providers
+from app.services.cache import CorpusVersion, TTLCache
+from app.services.singleflight import SingleFlight
+
+
+def test_fakes_are_deterministic(monkeypatch):
+    monkeypatch.setattr(fakes.settings, "fake_latency_jitter", 0.5)
+    latencies = [fakes.simulated_latency(0.1, "query", i) for i in range(2000)]
+    assert fakes.simulated_latency(0.1, "query", 7) == latencies[7]
+    assert 0.09 < np.mean(latencies) < 0.11 and max(latencies) > 0.2
+
+    monkeypatch.setattr(fakes.settings, "fake_embedding_latency", 0)
+    embeddings = fakes.FakeEmbeddings()
+    owi, drunk, arson = embeddings.embed_documents([
+        "operating a vehicle while intoxicated", "intoxicated operating of a motor vehicle", "arson of a building",
+    ])
+    assert embeddings.embed_query("operating a vehicle while intoxicated") == owi
+    assert np.dot(owi, drunk) > np.dot(owi, arson)
+
+    monkeypatch.setattr(fakes.settings, "fake_rerank_latency", 0)
+    ranked = fakes.FakeReranker().rerank(["arson of a building", "operating while intoxicated"], "intoxicated", top_n=1)
+    assert ranked == [{"index": 1, "relevance_score": 1.0}]
+
+
+def test_rag_pipeline_runs_on_fake_providers(monkeypatch, tmp_path):
+    from app.services import rag
+
+    for name in ("fake_embedding_latency", "fake_index_latency", "fake_rerank_latency",
+                 "fake_llm_first_token", "fake_llm_token_interval"):
+        monkeypatch.setattr(fakes.settings, name, 0)
+    monkeypatch.setattr(fakes, "_indexes", {})
+    monkeypatch.setattr(rag.settings, "provider_backend", "fake")
+    monkeypatch.setattr(rag.settings, "vector_backend", "pinecone")
+    monkeypatch.setattr(rag.settings, "ingest_workers", 1)
+    monkeypatch.setattr(rag.settings, "fake_llm_tokens", 20)
+
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    for section, title in [("346.63", "Operating under influence of intoxicant"), ("943.02", "Arson of buildings")]:
+        (raw / f"statute_{section}.txt").write_text(f"{section} {title}.\n\n(1) Whoever commits {title.lower()} is guilty.\n")
+    monkeypatch.setattr(rag, "DATA_DIR", raw)
+    for name in ("BM25_DIR", "BM25_JSON_PATH", "MANIFEST_PATH", "CITATION_INDEX_PATH", "CROSS_REF_GRAPH_PATH"):
+        monkeypatch.setattr(rag, name, tmp_path / name.lower())
+    for name in ("_pc", "_index", "_embeddings", "_bm25", "_store", "_reranker", "_llm",
+                 "_citation_index", "_cross_ref_graph"):
+        monkeypatch.setattr(rag, name, None)
+    monkeypatch.setattr(rag, "_corpus_version", CorpusVersion(tmp_path / "corpus_version"))
+    for name in ("_query_vectors", "_retrieval_cache", "_answer_cache", "_rerank_scores"):
+        monkeypatch.setattr(rag, name, TTLCache(maxsize=10, ttl=60))
+    monkeypatch.setattr(rag, "_inflight", SingleFlight())
+
+    calls_before = providers.gate("gemini").stats()["calls"]
+    ingest = asyncio.run(rag.ingest_documents(full=True))
+    assert ingest["chunks_created"] >= 2 and isinstance(rag._get_pinecone(), fakes.FakePinecone)
+
+    result = asyncio.run(rag.chat("What is the penalty for operating under the influence of an intoxicant?"))
+    assert result["sources"][0]["metadata"]["statute_num"] == "346.63"
+    assert result["answer"].startswith("Under Wisconsin law, § 346.63")
+    assert providers.gate("gemini").stats()["calls"] == calls_before + 1
+
+
+def test_driver_reports_throughput_and_percentiles(tmp_path):
+    app = FastAPI()
+
+    @app.post("/api/search")
+    async def search():
+        await asyncio.sleep(0.01)
+        return {"results": []}
+
+    @app.post("/api/chat/stream")
+    async def stream():
+        async def events():
+            yield f"data: {json.dumps({'type': 'sources', 'data': []})}\n\n"
+            await asyncio.sleep(0.02)
+            yield f"data: {json.dumps({'type': 'content', 'data': 'Answer'})}\n\n"
+            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    markdown = tmp_path / "prompts.md"
+    markdown.write_text('### 1. OWI\n**Prompt:** "What is OWI?"\n\n### 2.\n**Prompt:** "Define arson."\n')
+    traffic = tmp_path / "traffic.jsonl"
+    traffic.write_text('{"query": "miranda", "endpoint": "search"}\n\n{"title": "Juvenile custody"}\n')
+    prompts = loadtest.load_prompts(markdown) + loadtest.load_prompts(traffic)
+    assert [p.query for p in prompts] == ["What is OWI?", "Define arson.", "miranda", "Juvenile custody"]
+    assert loadtest.percentile([5, 1, 4, 2, 3], 50) == 3 and loadtest.percentile(range(1, 101), 99) == 99
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            return [await loadtest.run_level(client, endpoint, prompts, 4, 12) for endpoint in ("search", "stream")]
+
+    search, stream = asyncio.run(main())
+    assert search["requests"] == 12 and search["errors"] == 0 and search["throughput"] > 0
+    assert search["p50_ms"] >= 10 and "ttft_p50_ms" not in search
+    assert stream["requests"] == 12 and stream["ttft_p50_ms"] >= 20
+    assert stream["p99_ms"] >= stream["p95_ms"] >= stream["p50_ms"]
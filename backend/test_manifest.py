@@ -0,0 +1,36 @@
+"""
+Tests for the incremental ingestion manifest.
+Run with: python -m pytest backend/test_manifest.py
+"""
+from app.services.manifest import IngestManifest, file_sha256
+
+
+def test_changed_files_are_detected(tmp_path):
+    """Only files whose content hash differs count as changed."""
+    source = tmp_path / "ch_940.txt"
+    source.write_text("940.01 First-degree intentional homicide.")
+    manifest = IngestManifest(tmp_path / "manifest.json")
+
+    current = manifest.fingerprint("ch_940.txt", source)
+    assert manifest.is_changed("ch_940.txt", current)
+    manifest.record("ch_940.txt", current, ["a", "b"])
+    assert not manifest.is_changed("ch_940.txt", manifest.fingerprint("ch_940.txt", source))
+
+    source.write_text("940.01 First-degree intentional homicide. (amended)")
+    assert manifest.is_changed("ch_940.txt", manifest.fingerprint("ch_940.txt", source))
+
+
+def test_round_trip(tmp_path):
+    """Saved manifests reload with the same hashes and chunk IDs."""
+    source = tmp_path / "ch_968.txt"
+    source.write_text("968.10 Searches and seizures; when authorized.")
+    manifest = IngestManifest(tmp_path / "manifest.json")
+    manifest.record("ch_968.txt", manifest.fingerprint("ch_968.txt", source), ["x", "y"])
+    manifest.save()
+
+    reloaded = IngestManifest.load(tmp_path / "manifest.json")
+    assert reloaded.chunk_ids("ch_968.txt") == ["x", "y"]
+    assert reloaded.files["ch_968.txt"].sha256 == file_sha256(source)
+
+    reloaded.remove("ch_968.txt")
+    assert reloaded.chunk_ids("ch_968.txt") == []
@@ -0,0 +1,98 @@
+"""
+Tests for per-stage latency metrics and the Prometheus exposition.
+Run with: python -m pytest backend/test_metrics.py
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from app.services import metrics
+from app.services.concurrency import run_blocking
+
+
+def test_histogram_exposition():
+    histogram = metrics.Histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, 'say "hi"')
+
+    assert histogram.render().splitlines() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{stage="say \\"hi\\"",le="0.1"} 2',
+        'demo_seconds_bucket{stage="say \\"hi\\"",le="1.0"} 3',
+        'demo_seconds_bucket{stage="say \\"hi\\"",le="+Inf"} 4',
+        'demo_seconds_sum{stage="say \\"hi\\""} 3.65',
+        'demo_seconds_count{stage="say \\"hi\\""} 4',
+    ]
+
+
+def test_spans_in_worker_threads_report_to_the_request_trace():
+    def blocking_stage():
+        with metrics.span("embedding"):
+            time.sleep(0.02)
+        return metrics._current.get().timings()
+
+    async def request():
+        with metrics.trace("unit") as trace:
+            seen_in_thread = await run_blocking("retrieval", blocking_stage)
+            with metrics.span("embedding"):
+                pass
+            return trace.timings(), seen_in_thread
+
+    before = metrics.STAGE_SECONDS.snapshot().get(("unit", "embedding"), {"count": 0})["count"]
+    timings, seen_in_thread = asyncio.run(request())
+
+    assert "embedding" in seen_in_thread
+    assert timings["embedding"] >= 0.02 and timings["total"] >= timings["embedding"]
+    snapshot = metrics.STAGE_SECONDS.snapshot()
+    assert snapshot[("unit", "embedding")]["count"] == before + 2
+    assert snapshot[("unit", "total")]["count"] >= 1
+    # Spans outside a trace still reach the histogram
+    with metrics.span("loose"):
+        pass
+    assert (metrics.NO_OPERATION, "loose") in metrics.STAGE_SECONDS.snapshot()
+
+
+def test_chat_reports_stage_timings_and_metrics(monkeypatch, rag_pipeline):
+    from app.services import rag
+
+    class FakeStore:
+        def query(self, dense, sparse, top_k):
+            return [Document(id="chunk-1", page_content="346.63 Operating under influence of intoxicant.",
+                             metadata={"source": "ch_346.pdf", "score": 0.9})]
+
+    class FakeEmbeddings:
+        def embed_query(self, text):
+            return [0.1, 0.2]
+
+    class FakeBM25:
+        def encode_queries(self, text):
+            return {"indices": [1], "values": [1.0]}
+
+    class FakeModel:
+        def generate_content(self, prompt):
+            return SimpleNamespace(text="Answer")
+
+    rag_pipeline(store=FakeStore(), search=rag._hybrid_search, model=FakeModel)
+    monkeypatch.setattr(rag, "_get_embeddings", FakeEmbeddings)
+    monkeypatch.setattr(rag, "_get_bm25", FakeBM25)
+    monkeypatch.setattr(rag.settings, "response_timings", True)
+
+    result = asyncio.run(rag.chat("What is OWI?"))
+    assert {"embedding", "sparse_encoding", "vector_query", "context_packing", "generation",
+            "total"} <= set(result["timings"])
+
+    events = asyncio.run(_collect(rag.chat_stream("What is OWI?")))
+    assert [e["type"] for e in events][-2:] == ["timings", "done"]
+
+    exposition = rag.get_metrics()
+    assert 'rag_stage_seconds_count{operation="chat",stage="generation"}' in exposition
+    assert 'rag_stage_seconds_bucket{operation="chat",stage="vector_query",le="+Inf"}' in exposition
+    assert 'rag_cache_hits_total{cache="answers"} 1' in exposition
+    assert "# TYPE rag_provider_in_flight gauge" in exposition
+
+
+async def _collect(stream):
+    return [event async for event in stream]
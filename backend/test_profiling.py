@@ -0,0 +1,90 @@
+"""
+Tests for on-demand request profiling.
+Run with: python -m pytest backend/test_profiling.py
+"""
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.services import profiling
+from app.services.concurrency import run_blocking
+
+
+def _spin(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _other_request(seconds: float) -> None:
+    _spin(seconds)
+
+
+async def _request():
+    await run_blocking("retrieval", _spin, 0.1)
+    _spin(0.05)
+    return {"results": []}
+
+
+def test_profile_samples_only_the_request_threads(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+
+    async def main():
+        async def unrelated():
+            # Another request's work on the shared event loop
+            for _ in range(5):
+                _other_request(0.02)
+                await asyncio.sleep(0)
+
+        # Started outside the profiled request, like a concurrent request
+        other = asyncio.ensure_future(unrelated())
+        with profiling.profile("unit", interval=0.002) as profile:
+            await asyncio.gather(_request())
+        await other
+        return profile
+
+    profile = asyncio.run(main())
+    report = profile.report()
+    stacks = profile.collapsed()
+
+    assert report["samples"] >= 5 and report["file"].endswith(profiling.PROFILE_SUFFIX)
+    assert "worker;" in stacks and "event-loop;" in stacks and "test_profiling:_spin" in stacks
+    assert "_other_request" not in stacks
+    assert report["inclusive"]["test_profiling"] > 0.5
+    assert report["self"]["test_profiling"] > 0.5
+    assert profiling.read_profile(report["file"]) == stacks
+    # The task factory is only installed while a profile is active
+    assert not profiling._factory_users
+
+
+def test_unprofiled_calls_are_not_wrapped():
+    assert profiling.bind(_spin) is _spin
+    assert not profiling.active()
+
+
+def test_profile_flag_is_admin_only(monkeypatch, tmp_path):
+    from app import main
+    from app.services import rag
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(rag, "search", lambda query, top_k: _request())
+    client = TestClient(main.app)
+
+    monkeypatch.setattr(main.settings, "admin_token", "")
+    assert client.post("/api/search?profile=1", json={"query": "OWI"}).status_code == 403
+    assert "profile" not in client.post("/api/search", json={"query": "OWI"}).json()
+
+    monkeypatch.setattr(main.settings, "admin_token", "s3cret")
+    denied = client.post("/api/search", json={"query": "OWI"}, headers={"X-Profile": "1", "X-Admin-Token": "nope"})
+    assert denied.status_code == 403
+
+    admin = {"X-Admin-Token": "s3cret"}
+    response = client.post("/api/search", json={"query": "OWI"}, headers={"X-Profile": "1", **admin})
+    report = response.json()["profile"]
+    assert response.status_code == 200 and report["samples"] > 0
+
+    collapsed = client.get(f"/api/admin/profiles/{report['file']}", headers=admin)
+    assert collapsed.status_code == 200 and "test_profiling:_spin" in collapsed.text
+    assert client.get(f"/api/admin/profiles/{report['file']}").status_code == 403
+    assert client.get("/api/admin/profiles/..%2Fcorpus_version", headers=admin).status_code == 404
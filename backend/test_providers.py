@@ -0,0 +1,88 @@
+"""
+Tests for the shared provider layer (pooled clients and in-flight limits).
+Run with: python -m pytest backend/test_providers.py
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import providers
+from app.services.providers import GatedClient, ProviderGate
+
+
+def test_gate_caps_in_flight_and_records_queue_waits():
+    gate = ProviderGate("pinecone", limit=2)
+
+    def call():
+        with gate.slot():
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = gate.stats()
+    assert stats["calls"] == 6 and stats["in_flight"] == 0 and stats["waiting"] == 0
+    assert stats["peak_in_flight"] == 2
+    assert stats["queued_calls"] == 4
+    assert stats["wait_seconds_max"] >= 0.04
+
+    with pytest.raises(RuntimeError):
+        with gate.slot():
+            raise RuntimeError("503 from provider")
+    assert gate.stats()["errors"] == 1 and gate.stats()["in_flight"] == 0
+
+
+def test_gated_client_and_pooled_pinecone_index(monkeypatch):
+    """Method calls go through the provider's gate; the index gets a pool per in-flight slot."""
+    gate = ProviderGate("pinecone", limit=3)
+    monkeypatch.setattr(providers, "gate", lambda provider: gate)
+    monkeypatch.setattr(providers.settings, "pinecone_max_in_flight", 3)
+
+    opened = {}
+
+    class FakeIndex:
+        namespace = "default"
+
+        def query(self, **kwargs):
+            return {"matches": [], "in_flight": gate.in_flight}
+
+    def open_index(**kwargs):
+        opened.update(kwargs)
+        return FakeIndex()
+
+    index = providers.pinecone_index(SimpleNamespace(Index=open_index), host="https://example.pinecone.io")
+    assert opened == {"pool_threads": 3, "connection_pool_maxsize": 3, "host": "https://example.pinecone.io"}
+    assert isinstance(index, GatedClient) and index.namespace == "default"
+    assert index.query(top_k=5)["in_flight"] == 1
+    assert gate.stats()["calls"] == 1
+
+
+def test_generative_model_is_shared_across_requests(monkeypatch):
+    from app.services import rag
+
+    built = []
+
+    class FakeModel:
+        def generate_content(self, prompt, stream=False):
+            if stream:
+                return iter([SimpleNamespace(text="A"), SimpleNamespace(text="nswer")])
+            return SimpleNamespace(text="Answer")
+
+    def generative_model():
+        built.append(FakeModel())
+        return built[-1]
+
+    gate = ProviderGate("gemini", limit=1)
+    monkeypatch.setattr(providers, "generative_model", generative_model)
+    monkeypatch.setattr(providers, "gate", lambda provider: gate)
+    monkeypatch.setattr(rag, "_llm", None)
+
+    assert rag._generate("first") == rag._generate("second") == "Answer"
+    assert "".join(chunk.text for chunk in rag._generate_stream("third")) == "Answer"
+    assert len(built) == 1
+    assert gate.stats()["calls"] == 3 and gate.stats()["in_flight"] == 0
@@ -0,0 +1,89 @@
+"""
+Tests for latency-budgeted reranking with the rerank score cache.
+Run with: python -m pytest backend/test_rerank.py
+"""
+import asyncio
+import time
+
+from langchain_core.documents import Document
+
+from app.services import rag
+from app.services.cache import CorpusVersion, TTLCache
+
+# Hybrid order is a, b, c, d; Cohere prefers e, c, then a
+RELEVANCE = {"a": 0.6, "b": 0.1, "c": 0.9, "d": 0.3, "e": 0.95}
+
+
+class FakeReranker:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    def rerank(self, documents, query, top_n=-1):
+        self.calls.append([doc.id for doc in documents])
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        results = [{"index": i, "relevance_score": RELEVANCE[doc.id]} for i, doc in enumerate(documents)]
+        return sorted(results, key=lambda r: -r["relevance_score"])
+
+
+def _docs(ids="abcd", scores=(0.50, 0.48, 0.45, 0.40)):
+    return [Document(id=doc_id, page_content=f"chunk {doc_id}", metadata={"score": score})
+            for doc_id, score in zip(ids, scores)]
+
+
+def _setup(monkeypatch, tmp_path, reranker):
+    monkeypatch.setattr(rag, "_get_reranker", lambda: reranker)
+    monkeypatch.setattr(rag, "_rerank_scores", TTLCache(maxsize=100, ttl=60))
+    monkeypatch.setattr(rag, "_corpus_version", CorpusVersion(tmp_path / "corpus_version"))
+    monkeypatch.setattr(rag.settings, "top_n", 2)
+
+
+def test_scores_are_cached_per_query_and_chunk(monkeypatch, tmp_path):
+    reranker = FakeReranker()
+    _setup(monkeypatch, tmp_path, reranker)
+
+    docs, status = asyncio.run(rag._rerank("What is OWI?", _docs()))
+    assert status == "reranked"
+    assert [(d.id, d.metadata["relevance_score"]) for d in docs] == [("c", 0.9), ("a", 0.6)]
+
+    docs, status = asyncio.run(rag._rerank("what is  owi?", _docs()))
+    assert status == "cached" and [d.id for d in docs] == ["c", "a"]
+    assert reranker.calls == [list("abcd")]
+
+    # Only chunks without a cached score are sent to Cohere
+    docs, status = asyncio.run(rag._rerank("What is OWI?", _docs("abce")))
+    assert status == "reranked" and [d.id for d in docs] == ["e", "c"]
+    assert reranker.calls[-1] == ["e"]
+
+
+def test_over_budget_rerank_falls_back_and_still_fills_the_cache(monkeypatch, tmp_path):
+    reranker = FakeReranker(delay=0.2)
+    _setup(monkeypatch, tmp_path, reranker)
+    monkeypatch.setattr(rag.settings, "rerank_timeout", 0.02)
+
+    docs, status = asyncio.run(rag._rerank("miranda juvenile", _docs()))
+    assert status == "timeout" and [d.id for d in docs] == ["a", "b"]
+    assert "relevance_score" not in docs[0].metadata
+
+    # An exhausted request budget skips the call altogether
+    docs, status = asyncio.run(rag._rerank("penalties", _docs(), deadline=time.monotonic() - 1))
+    assert status == "timeout" and len(reranker.calls) == 1
+
+    # The overrunning call completed in the background
+    time.sleep(0.3)
+    docs, status = asyncio.run(rag._rerank("miranda juvenile", _docs()))
+    assert status == "cached" and [d.id for d in docs] == ["c", "a"]
+
+
+def test_clear_winner_skips_and_errors_fall_back(monkeypatch, tmp_path):
+    reranker = FakeReranker(error=RuntimeError("429 Too Many Requests"))
+    _setup(monkeypatch, tmp_path, reranker)
+
+    docs, status = asyncio.run(rag._rerank("homicide", _docs(scores=(0.9, 0.4, 0.3, 0.2))))
+    assert status == "skipped" and [d.id for d in docs] == ["a", "b"] and not reranker.calls
+
+    docs, status = asyncio.run(rag._rerank("homicide", _docs()))
+    assert status == "error" and [d.id for d in docs] == ["a", "b"]
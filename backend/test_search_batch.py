@@ -0,0 +1,105 @@
+"""
+Tests for batch search (search_many and /api/search/batch).
+Run with: python -m pytest backend/test_search_batch.py
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+
+from app.services.bm25 import BM25Model
+from app.services.cache import TTLCache
+
+QUERIES = ["OWI penalties", "miranda juvenile", "owi  PENALTIES", "homicide"]
+
+
+def _batch_pipeline(monkeypatch, tmp_path, rag_pipeline, fail_on=None):
+    """rag wired to a fake store and fake embeddings that count provider calls."""
+    from app.services import rag
+
+    calls = {"embed_documents": [], "embed_query": 0, "query": 0}
+
+    class FakeEmbeddings:
+        def embed_documents(self, texts):
+            calls["embed_documents"].append(list(texts))
+            return [[float(len(text)), 1.0] for text in texts]
+
+        def embed_query(self, text):
+            calls["embed_query"] += 1
+            return [float(len(text)), 1.0]
+
+    def query(dense, sparse, top_k):
+        calls["query"] += 1
+        if fail_on is not None and dense[0] == len(fail_on) * rag.settings.alpha:
+            raise RuntimeError("index unavailable")
+        return [Document(id=f"chunk-{dense[0]}", page_content=f"match for {dense[0]}", metadata={"source": "ch.pdf"})]
+
+    bm25 = BM25Model().fit(["OWI penalties for operating while intoxicated", "miranda juvenile homicide"])
+    rag_pipeline(store=SimpleNamespace(name="fake", query=query), search=rag._hybrid_search, cache_size=100)
+    monkeypatch.setattr(rag, "_get_embeddings", FakeEmbeddings)
+    monkeypatch.setattr(rag, "_get_bm25", lambda: bm25)
+    monkeypatch.setattr(rag, "CITATION_INDEX_PATH", tmp_path / "citation_index.json")
+    monkeypatch.setattr(rag, "_citation_index", None)
+    return rag, calls
+
+
+async def _collect(rag, queries):
+    return [result async for result in rag.search_many(queries, top_k=3)]
+
+
+def test_search_many_embeds_once_and_matches_search(monkeypatch, tmp_path, rag_pipeline):
+    rag, calls = _batch_pipeline(monkeypatch, tmp_path, rag_pipeline)
+
+    results = asyncio.run(_collect(rag, QUERIES))
+    assert sorted(r["index"] for r in results) == [0, 1, 2, 3]
+    # One embedding request and one index query per distinct normalized query
+    assert calls["embed_documents"] == [["owi penalties", "miranda juvenile", "homicide"]]
+    assert calls["embed_query"] == 0 and calls["query"] == 3
+
+    # A repeated batch is served from the retrieval cache
+    again = asyncio.run(_collect(rag, QUERIES))
+    assert all(r["cache"] == {"retrieval": True} for r in again) and calls["query"] == 3
+
+    by_index = {r.pop("index"): r for r in results}
+    for i, query in enumerate(QUERIES):
+        monkeypatch.setattr(rag, "_retrieval_cache", TTLCache(maxsize=100, ttl=60))
+        assert asyncio.run(rag.search(query, top_k=3)) == by_index[i]
+    # search() reused the query vectors cached by the batch
+    assert calls["embed_query"] == 0
+
+
+def test_failed_query_does_not_fail_the_batch(monkeypatch, tmp_path, rag_pipeline):
+    rag, _ = _batch_pipeline(monkeypatch, tmp_path, rag_pipeline, fail_on="homicide")
+    results = {r["index"]: r for r in asyncio.run(_collect(rag, QUERIES))}
+    assert results[3]["error"] == "index unavailable" and results[3]["results"] == []
+    assert all("error" not in results[i] and results[i]["results"] for i in range(3))
+
+    # Likewise a failed citation fetch
+    citation_lookup = rag._citation_lookup
+
+    async def failing_lookup(store, query):
+        if query == "§ 940.01":
+            raise RuntimeError("fetch failed")
+        return await citation_lookup(store, query)
+
+    monkeypatch.setattr(rag, "_citation_lookup", failing_lookup)
+    results = {r["index"]: r for r in asyncio.run(_collect(rag, ["§ 940.01", "miranda juvenile"]))}
+    assert results[0]["error"] == "fetch failed" and results[0]["results"] == []
+    assert results[1]["results"]
+
+
+def test_batch_endpoint_streams_ndjson(monkeypatch, tmp_path, rag_pipeline):
+    from app.main import app
+
+    rag, _ = _batch_pipeline(monkeypatch, tmp_path, rag_pipeline)
+    client = TestClient(app)
+
+    response = client.post("/api/search/batch", json={"queries": QUERIES[:2], "top_k": 2})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1]
+
+    monkeypatch.setattr(rag.settings, "search_batch_max_queries", 1)
+    assert client.post("/api/search/batch", json={"queries": QUERIES}).status_code == 413
@@ -0,0 +1,129 @@
+"""
+Tests for server-side chat sessions and follow-up context reuse.
+Run with: python -m pytest backend/test_sessions.py
+"""
+import asyncio
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from app.services import rag
+from app.services.sessions import Session, SessionStore, TurnPlan, condense, is_follow_up, may_follow_up
+
+
+def _session_pipeline(monkeypatch, rag_pipeline):
+    """rag with fake search, reranker and model; records queries, rerank calls and prompts."""
+    calls = {"search": [], "rerank": 0, "prompts": []}
+
+    def fake_search(store, query):
+        calls["search"].append(query)
+        ids = ["owi-1", "owi-2", "owi-3"] if len(calls["search"]) == 1 else ["owi-2", "pac-1", "pac-2", "pac-3"]
+        return [Document(id=doc_id, page_content=f"346.63 text of {doc_id}.",
+                         metadata={"source": "ch_346.pdf", "score": 0.5 - 0.01 * i})
+                for i, doc_id in enumerate(ids)]
+
+    class FakeReranker:
+        def rerank(self, documents, query, top_n=-1):
+            calls["rerank"] += 1
+            return [{"index": i, "relevance_score": 0.9 - 0.1 * i} for i in range(len(documents))]
+
+    class FakeModel:
+        def generate_content(self, prompt):
+            calls["prompts"].append(prompt)
+            return SimpleNamespace(text=f"Answer {len(calls['prompts'])}. More detail.")
+
+    rag_pipeline(search=fake_search, reranker=FakeReranker(), model=FakeModel, cache_size=100)
+    monkeypatch.setattr(rag.settings, "top_n", 2)
+    monkeypatch.setattr(rag.settings, "cross_ref_hops", 0)
+    monkeypatch.setattr(rag.settings, "session_followup_chunks", 2)
+    return calls
+
+
+def test_follow_up_reuses_context_without_rerank(monkeypatch, rag_pipeline):
+    calls = _session_pipeline(monkeypatch, rag_pipeline)
+
+    first = asyncio.run(rag.chat("What is the penalty for OWI?"))
+    assert first["rerank"] == "reranked" and calls["rerank"] == 1
+    assert [s["metadata"]["source"] for s in first["sources"]] == ["ch_346.pdf"] * 2
+
+    follow_up = asyncio.run(rag.chat("what about for a commercial driver?", session_id=first["session_id"]))
+    assert follow_up["session_id"] == first["session_id"]
+    assert follow_up["rerank"] == "reused" and calls["rerank"] == 1
+    # Retrieved with the condensed query; reused chunks first, then two new ones
+    assert calls["search"][-1] == "What is the penalty for OWI? what about for a commercial driver?"
+    assert [s["text"] for s in follow_up["sources"]] == [
+        "346.63 text of owi-1.", "346.63 text of owi-2.", "346.63 text of pac-1.", "346.63 text of pac-2."]
+    assert "Conversation so far:\nQ: What is the penalty for OWI?\nA: Answer 1." in calls["prompts"][-1]
+
+    # A standalone question in the same session is retrieved and reranked afresh
+    asyncio.run(rag.chat("Explain implied consent under § 343.305", session_id=first["session_id"]))
+    assert calls["rerank"] == 2
+
+    # A pronoun mid-question is confirmed by retrieval: overlapping results reuse the context...
+    reused = asyncio.run(rag.chat("is that a felony", session_id=first["session_id"]))
+    assert reused["rerank"] == "reused" and calls["rerank"] == 2
+    assert calls["search"][-1] == "is that a felony"
+
+    # ...unrelated results get full retrieval and rerank
+    monkeypatch.setattr(rag, "_hybrid_search", lambda store, query: [
+        Document(id=f"rec-{i}", page_content=f"968.31 text {i}.", metadata={"source": "ch_968.pdf", "score": 0.5})
+        for i in range(3)])
+    recording = asyncio.run(rag.chat("Is it legal to record police in Wisconsin?", session_id=first["session_id"]))
+    assert recording["rerank"] == "reranked" and calls["rerank"] == 3
+    assert {s["metadata"]["source"] for s in recording["sources"]} == {"ch_968.pdf"}
+
+    assert rag.end_session(first["session_id"])
+    assert not rag.end_session(first["session_id"])
+    assert asyncio.run(rag.chat("and that?", session_id=first["session_id"]))["session_id"] != first["session_id"]
+
+    # A client keeping its own history gets a throwaway session and no ID to send back
+    history = [{"role": "user", "content": "What is the penalty for OWI?"}, {"role": "assistant", "content": "Answer 1."}]
+    assert "session_id" not in asyncio.run(rag.chat("and for a second offense?", history=history))
+
+
+def test_follow_up_detection_and_condensing():
+    assert is_follow_up("What about juveniles?")
+    assert is_follow_up("that is a felony?")
+    assert not is_follow_up("is that a felony") and may_follow_up("is that a felony")
+    assert not is_follow_up("Is it legal to record police in Wisconsin?")
+    assert not is_follow_up("What statute covers theft that exceeds 2500 dollars?")
+    assert not is_follow_up("What are the elements of first-degree intentional homicide?")
+    assert not is_follow_up("what about § 940.01")
+    assert condense("elements of OWI", "and the penalty?") == "elements of OWI and the penalty?"
+    long = condense(" ".join(f"w{i}" for i in range(50)), "and this?")
+    assert len(long.split()) == 40 and long.startswith("w0 ") and long.endswith("w49 and this?")
+
+    # Corpus changes between turns: condensed, but nothing stale is reused
+    session = Session("s")
+    session.record("elements of OWI", TurnPlan("elements of OWI"), "Answer.", [Document(id="a", page_content="x")], 1)
+    assert session.plan("and the penalty?", 1).previous
+    assert not session.plan("and the penalty?", 2).previous
+
+
+def test_history_seeds_session_and_summary_is_bounded():
+    history = [{"role": "user", "content": f"question {i}"} if i % 2 == 0
+               else {"role": "assistant", "content": f"Answer {i}. " + "detail " * 200}
+               for i in range(20)]
+    session = SessionStore(maxsize=10, ttl=60, max_turns=3, summary_max_chars=300).open("unknown", history)
+
+    assert [turn.query for turn in session.turns] == ["question 14", "question 16", "question 18"]
+    assert len(session.summary) <= 300 and session.summary.endswith("Q: question 12 A: Answer 13.")
+    conversation = session.conversation()
+    assert "detail" not in session.summary
+    # Recent answers are truncated; the whole block stays bounded however long the history
+    assert len(conversation) < 300 + 3 * 700
+
+
+def test_only_sessions_the_client_names_are_stored():
+    store = SessionStore(maxsize=10, ttl=60)
+    history = [{"role": "user", "content": "question"}, {"role": "assistant", "content": "Answer."}]
+
+    # The client keeps its own history: a throwaway session per request
+    throwaway = store.open(None, history)
+    store.save(throwaway)
+    assert throwaway.turns and store.open(throwaway.id) is not throwaway
+
+    for session_id, history in [(None, None), ("expired", history)]:
+        session = store.open(session_id, history)
+        store.save(session)
+        assert store.open(session.id) is session
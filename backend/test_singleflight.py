@@ -0,0 +1,107 @@
+"""
+Tests for single-flight coalescing of identical in-flight chat requests.
+Run with: python -m pytest backend/test_singleflight.py
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.services.singleflight import SingleFlight
+
+
+def _slow_pipeline(rag_pipeline):
+    """rag with a slow fake search and Gemini model and no caches; counts provider calls."""
+    from langchain_core.documents import Document
+
+    calls = {"search": 0, "generate": 0}
+
+    def fake_search(store, query):
+        calls["search"] += 1
+        time.sleep(0.05)
+        return [Document(id="chunk-1", page_content="346.63 Operating under influence of intoxicant.",
+                         metadata={"source": "ch_346.pdf", "score": 0.9})]
+
+    class SlowModel:
+        def generate_content(self, prompt, stream=False):
+            calls["generate"] += 1
+            time.sleep(0.05)
+            if not stream:
+                return SimpleNamespace(text="Answer")
+
+            def chunks():
+                for text in ("An", "sw", "er"):
+                    time.sleep(0.02)
+                    yield SimpleNamespace(text=text)
+            return chunks()
+
+    rag, _ = rag_pipeline(search=fake_search, model=SlowModel, cache_size=0)
+    return rag, calls
+
+
+def test_concurrent_identical_chats_share_one_pipeline(rag_pipeline):
+    rag, calls = _slow_pipeline(rag_pipeline)
+
+    async def burst():
+        return await asyncio.gather(
+            rag.chat("What is OWI?"),
+            *(rag.chat("  what is  OWI? ") for _ in range(4)),
+            rag.chat("What is OWI?", history=[{"role": "user", "content": "earlier question"}]),
+        )
+
+    results = asyncio.run(burst())
+    # One pipeline for the five identical requests, one for the request with history
+    assert calls == {"search": 2, "generate": 2}
+    assert [r["cache"]["coalesced"] for r in results] == [False, True, True, True, True, False]
+    assert all(r["answer"] == results[0]["answer"] for r in results)
+    assert rag.get_cache_stats()["coalescing"] == {"in_flight": 0, "leaders": 2, "coalesced": 4}
+
+
+def test_concurrent_streams_fan_out_one_upstream(rag_pipeline):
+    rag, calls = _slow_pipeline(rag_pipeline)
+
+    async def collect(delay):
+        await asyncio.sleep(delay)
+        return [event async for event in rag.chat_stream("What is OWI?")]
+
+    async def burst():
+        # The late subscriber joins mid-stream and still gets every event
+        return await asyncio.gather(collect(0), collect(0), collect(0.12))
+
+    streams = asyncio.run(burst())
+    assert calls == {"search": 1, "generate": 1}
+    contents = ["".join(e["data"] for e in stream if e["type"] == "content") for stream in streams]
+    assert contents == ["Answer"] * 3
+    coalesced = [next(e for e in stream if e["type"] == "metadata")["data"]["cache"]["coalesced"] for stream in streams]
+    assert coalesced == [False, True, True]
+    assert all(stream[-1] == {"type": "done"} for stream in streams)
+
+
+def test_stream_is_cancelled_when_every_subscriber_leaves():
+    state = {"produced": 0, "closed": False}
+
+    async def upstream():
+        try:
+            for i in range(100):
+                state["produced"] += 1
+                yield i
+                await asyncio.sleep(0.01)
+        finally:
+            state["closed"] = True
+
+    async def main():
+        flight = SingleFlight()
+        first, _ = flight.stream("key", upstream)
+        second, shared = flight.stream("key", upstream)
+        assert shared
+        assert [await first.__anext__(), await second.__anext__()] == [0, 0]
+        await first.aclose()
+        assert await second.__anext__() == 1
+        await second.aclose()
+        await asyncio.sleep(0.05)
+        # Nobody is listening: upstream stopped and a new request starts fresh
+        third, shared = flight.stream("key", upstream)
+        await third.aclose()
+        return shared
+
+    assert asyncio.run(main()) is False
+    assert state["closed"] and state["produced"] < 10
@@ -0,0 +1,44 @@
+"""
+Tests for the legal-aware BM25 tokenizer.
+Run with: python -m pytest backend/test_tokenizer.py
+"""
+import json
+
+from app.services.bm25 import BM25Model
+from app.services.tokenizer import LegalTokenizer, stem
+
+
+def test_citations_stay_whole():
+    """Statute and case citations are single tokens; subdivisions also emit their parents."""
+    tokens = LegalTokenizer()("Under s. 940.01(2)(a), see State v. Smith, 2019 WI App 12, and 2020 WI 45.")
+    assert tokens[:3] == ["940.01", "940.01(2)", "940.01(2)(a)"]
+    assert "2019 wi app 12" in tokens and "2020 wi 45" in tokens
+    assert "12" not in tokens and "app" not in tokens
+
+    # Statute text puts a space before the subsection; a parenthetical word is not a subdivision
+    assert LegalTokenizer()("940.01 (2) did not exist") == ["940.01", "940.01(2)", "exist"]
+    assert LegalTokenizer()("346.63 (the OWI statute)") == ["346.63", "owi", "statut"]
+
+
+def test_words_are_stemmed_and_stopwords_dropped():
+    assert LegalTokenizer()("The penalties for operating while intoxicated") == ["penalti", "operat", "intoxicat"]
+    assert stem("penalty") == stem("penalties")
+    assert stem("offense") == stem("offenses")
+    assert stem("drive") == stem("driving") == "drive"
+    assert stem("filed") == stem("files") == stem("filing")
+
+
+def test_model_keeps_its_tokenizer(tmp_path):
+    """New models use the legal tokenizer; models saved without a name are pinecone-text (NLTK) models."""
+    model = BM25Model().fit(["Operating under s. 346.63(1)(a)", "2019 WI App 12 held"])
+    assert model.tokenizer_name == "legal"
+    assert model.encode_queries("346.63(1)")["indices"] == model.encode_queries("346.63 (1)")["indices"]
+
+    model.save(tmp_path / "bm25")
+    assert BM25Model.load(tmp_path / "bm25").tokenizer_name == "legal"
+
+    params = json.loads((tmp_path / "bm25" / "params.json").read_text())
+    params.pop("tokenizer")
+    params.update(lower_case=True, remove_punctuation=True, remove_stopwords=True, stem=True, language="english")
+    (tmp_path / "bm25" / "params.json").write_text(json.dumps(params))
+    assert BM25Model.load(tmp_path / "bm25").tokenizer_name == "nltk"
@@ -0,0 +1,106 @@
+"""
+Tests for the local hybrid vector store.
+Run with: python -m pytest backend/test_vectorstore.py
+"""
+import numpy as np
+
+from app.services.vectorstore import LocalHybridStore
+
+
+def _corpus(n=50, dim=16, seed=7):
+    rng = np.random.default_rng(seed)
+    dense = rng.normal(size=(n, dim)).astype(np.float32)
+    sparse = []
+    for _ in range(n):
+        terms = rng.choice(200, size=5, replace=False)
+        sparse.append({"indices": [int(t) for t in terms], "values": rng.random(5).tolist()})
+    ids = [f"chunk-{i}" for i in range(n)]
+    texts = [f"text {i}" for i in range(n)]
+    metadatas = [{"source": f"doc_{i % 3}.pdf"} for i in range(n)]
+    return ids, texts, dense, sparse, metadatas
+
+
+def _brute_force(dense, sparse, q_dense, q_sparse):
+    scores = dense @ np.asarray(q_dense, dtype=np.float32)
+    weights = dict(zip(q_sparse["indices"], q_sparse["values"]))
+    for row, sv in enumerate(sparse):
+        scores[row] += sum(weights.get(t, 0.0) * v for t, v in zip(sv["indices"], sv["values"]))
+    return scores
+
+
+def test_hybrid_scores_match_brute_force(tmp_path):
+    """Top-k order and scores equal a plain dense + sparse dot product."""
+    ids, texts, dense, sparse, metadatas = _corpus()
+    store = LocalHybridStore(tmp_path, dtype="float16")
+    store.upsert(ids, texts, dense, sparse, metadatas)
+
+    q_dense = dense[3] * 0.5
+    q_sparse = {"indices": sparse[10]["indices"][:3] + [999], "values": [0.2, 0.2, 0.1, 0.5]}
+    docs = store.query(q_dense.tolist(), q_sparse, top_k=5)
+
+    expected = _brute_force(dense.astype(np.float16).astype(np.float32), sparse, q_dense, q_sparse)
+    expected_order = [ids[i] for i in np.argsort(-expected)[:5]]
+    assert [doc.id for doc in docs] == expected_order
+    assert np.isclose(docs[0].metadata["score"], expected.max(), rtol=1e-3)
+    assert docs[0].metadata["source"] == metadatas[ids.index(docs[0].id)]["source"]
+
+
+def test_int8_store_keeps_ranking(tmp_path):
+    """int8 quantization should keep the nearest neighbour on top."""
+    ids, texts, dense, sparse, metadatas = _corpus()
+    store = LocalHybridStore(tmp_path, dtype="int8")
+    store.upsert(ids, texts, dense, sparse, metadatas)
+
+    docs = store.query(dense[17].tolist(), {"indices": [], "values": []}, top_k=3)
+    assert docs[0].id == "chunk-17"
+
+
+def test_upsert_delete_and_reload(tmp_path):
+    """Writes replace by ID, deletes drop rows, and flush() persists the index."""
+    ids, texts, dense, sparse, metadatas = _corpus(n=10)
+    store = LocalHybridStore(tmp_path)
+    store.upsert(ids, texts, dense, sparse, metadatas)
+    store.upsert(["chunk-0"], ["replaced"], dense[:1], sparse[:1], [{"source": "new.pdf"}])
+    store.delete(["chunk-5", "missing"])
+    assert store.count() == 9
+
+    store.flush()
+    reloaded = LocalHybridStore(tmp_path)
+    assert reloaded.count() == 9
+    docs = reloaded.query(dense[0].tolist(), sparse[0], top_k=1)
+    assert (docs[0].id, docs[0].page_content) == ("chunk-0", "replaced")
+    assert isinstance(reloaded._state["dense"], np.memmap)
+    assert "chunk-5" not in [d.id for d in reloaded.query(dense[5].tolist(), sparse[5], top_k=10)]
+
+    reloaded.reset()
+    assert reloaded.query(dense[0].tolist(), sparse[0], top_k=3) == []
+
+
+def test_rag_reopens_index_rewritten_by_another_worker(monkeypatch, tmp_path):
+    """A worker's open index is replaced once another worker's ingest flushes a new one."""
+    import os
+
+    from app.services import rag
+
+    monkeypatch.setattr(rag.settings, "vector_backend", "local")
+    monkeypatch.setattr(rag.settings, "local_index_dtype", "float16")
+    monkeypatch.setattr(rag, "LOCAL_INDEX_DIR", tmp_path)
+    monkeypatch.setattr(rag, "_get_bm25", lambda: object())
+    monkeypatch.setattr(rag, "_store", None)
+    assert rag._get_store() is None
+
+    ids, texts, dense, sparse, metadatas = _corpus(n=10)
+    ingest = LocalHybridStore(tmp_path)
+    ingest.upsert(ids[:5], texts[:5], dense[:5], sparse[:5], metadatas[:5])
+    ingest.flush()
+    opened = rag._get_store()
+    assert opened.count() == 5 and rag._get_store() is opened
+
+    ingest.upsert(ids[5:], texts[5:], dense[5:], sparse[5:], metadatas[5:])
+    ingest.flush()
+    # Ingests in quick succession can share an mtime tick
+    stat = os.stat(tmp_path / "docs.jsonl")
+    os.utime(tmp_path / "docs.jsonl", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    reopened = rag._get_store()
+    assert reopened is not opened and reopened.count() == 10
+    assert reopened.fetch(["chunk-9"])[0].id == "chunk-9"
@@ -0,0 +1,105 @@
+"""
+Tests for startup warm-up and the readiness endpoint.
+Run with: python -m pytest backend/test_warmup.py
+"""
+import asyncio
+import threading
+import time
+
+import langchain_google_genai
+from fastapi.testclient import TestClient
+
+from app.services import rag, warmup
+
+
+def test_concurrent_first_callers_build_once(monkeypatch):
+    """The init lock makes threads racing on a cold getter share one client."""
+    built = []
+
+    class SlowEmbeddings:
+        def __init__(self, **kwargs):
+            time.sleep(0.05)
+            built.append(self)
+
+    monkeypatch.setattr(langchain_google_genai, "GoogleGenerativeAIEmbeddings", SlowEmbeddings)
+    monkeypatch.setattr(rag, "_embeddings", None)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(rag._get_embeddings())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(result is results[0] for result in results)
+
+
+def _fake_components(monkeypatch, **overrides):
+    components = {
+        "embeddings": lambda: object(),
+        "bm25": lambda: object(),
+        "vector_store": lambda: None,
+        "reranker": lambda: object(),
+        "citation_index": lambda: object(),
+        "cross_ref_graph": lambda: object(),
+    }
+    components.update(overrides)
+    monkeypatch.setattr(warmup, "_components", lambda rag: components)
+    monkeypatch.setattr(warmup, "_started", None)
+    monkeypatch.setattr(warmup, "_finished", None)
+    monkeypatch.setattr(warmup, "_status", {})
+
+
+def test_warm_up_reports_each_component(monkeypatch):
+    """Components are timed; a missing index is "empty" (still ready), a failure blocks readiness."""
+    _fake_components(monkeypatch)
+    status = asyncio.run(warmup.warm_up(["elements of OWI"]))
+    assert status["ready"] and status["warmup"] == "done"
+    assert status["components"]["vector_store"]["state"] == "empty"
+    assert status["components"]["warmup_queries"]["state"] == "empty"
+    assert all(c["seconds"] is not None for c in status["components"].values())
+
+    def broken():
+        raise RuntimeError("no credentials")
+
+    _fake_components(monkeypatch, reranker=broken)
+    monkeypatch.setattr(warmup.settings, "warmup_retry_delay", 0)
+    status = asyncio.run(warmup.warm_up())
+    assert not status["ready"]
+    assert status["components"]["reranker"] == {"state": "error", "seconds": status["components"]["reranker"]["seconds"],
+                                                "error": "RuntimeError: no credentials"}
+
+
+def test_failed_components_are_retried(monkeypatch):
+    """A transient build failure only keeps the worker unready until a retry succeeds."""
+    attempts = []
+
+    def flaky():
+        attempts.append(time.perf_counter())
+        if len(attempts) < 3:
+            raise ConnectionError("reset by peer")
+        return object()
+
+    _fake_components(monkeypatch, reranker=flaky)
+    monkeypatch.setattr(warmup.settings, "warmup_retry_delay", 0.01)
+    monkeypatch.setattr(warmup.settings, "warmup_retry_max_delay", 0.02)
+
+    status = asyncio.run(warmup.warm_up())
+    assert status["ready"] and status["components"]["reranker"] == {
+        "state": "ready", "seconds": status["components"]["reranker"]["seconds"], "error": None}
+    # Backed off 0.01s, then 0.02s
+    assert len(attempts) == 3 and attempts[2] - attempts[0] >= 0.03
+
+
+def test_ready_endpoint(monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(warmup.settings, "warmup_on_startup", True)
+    _fake_components(monkeypatch)
+    client = TestClient(app)
+    assert client.get("/ready").status_code == 503
+
+    asyncio.run(warmup.warm_up())
+    response = client.get("/ready")
+    assert response.status_code == 200 and response.json()["warmup"] == "done"
@@ -0,0 +1,89 @@
+"""
+Tests for the precomputed cross-reference graph.
+Run with: python -m pytest backend/test_xref_graph.py
+"""
+import asyncio
+from types import SimpleNamespace
+
+from app.services.citation_index import CitationIndex, citation_keys
+from app.services.xref_graph import CrossReferenceGraph
+
+
+def _citations(tmp_path):
+    index = CitationIndex(tmp_path / "citation_index.json")
+    index.replace_file("ch939.pdf", [
+        ("toc", ["939.22", "939.44", "939.50"], []),
+        ("939.22", ["939.22"], []),
+        ("939.44", ["939.44"], ["939.22"]),
+        ("939.50", ["939.50"], []),
+    ])
+    index.replace_file("ch940.pdf", [
+        ("940.01", ["940.01"], ["939.44(1)", "939.44", "939.50", "2020 WI 45"]),
+        ("940.01(2)", ["940.01(2)", "940.01"], ["940.01"]),
+    ])
+    return index
+
+
+def test_cross_references_resolve_to_defining_chunks(tmp_path):
+    """Cross-reference targets are followed first; references resolve to the section, not a contents listing."""
+    _, cites = citation_keys({
+        "statutes_cited": ["§ 939.50"],
+        "cross_references": [{"target": "939.44(1) and", "type": "under"}],
+    })
+    assert cites == ["939.44(1)", "939.44", "939.50"]
+
+    graph = CrossReferenceGraph.build(_citations(tmp_path))
+    assert graph.neighbours("940.01") == ["939.44", "939.50"]
+    assert graph.neighbours("940.01(2)") == ["940.01"]
+    assert graph.neighbours("939.50") == []
+
+    graph.save(tmp_path / "graph.npz")
+    loaded = CrossReferenceGraph.load(tmp_path / "graph.npz")
+    assert loaded.ids == graph.ids and len(loaded) == len(graph) == 4
+    assert CrossReferenceGraph.load(tmp_path / "missing.npz").expand(["940.01"], 2, 2, 5) == []
+
+
+def test_expand_respects_hops_fan_out_and_limit(tmp_path):
+    graph = CrossReferenceGraph.build(_citations(tmp_path))
+
+    assert graph.expand(["940.01(2)"], hops=1, fan_out=2, limit=10) == ["940.01"]
+    assert graph.expand(["940.01(2)"], hops=2, fan_out=2, limit=10) == ["940.01", "939.44", "939.50"]
+    assert graph.expand(["940.01(2)"], hops=2, fan_out=1, limit=10) == ["940.01", "939.44"]
+    assert graph.expand(["940.01(2)"], hops=3, fan_out=2, limit=3) == ["940.01", "939.44", "939.50"]
+    # Seeds are never returned, even when reachable
+    assert graph.expand(["940.01", "939.44"], hops=2, fan_out=2, limit=10) == ["939.50", "939.22"]
+
+
+def test_chat_context_includes_cross_referenced_chunks(monkeypatch, tmp_path, rag_pipeline):
+    """Retrieved chunks pull in what they reference, within the context budget, without another search."""
+    from langchain_core.documents import Document
+    from app.services import rag
+
+    graph = CrossReferenceGraph.build(_citations(tmp_path))
+    graph.save(tmp_path / "graph.npz")
+    prompts = []
+
+    class FakeModel:
+        def generate_content(self, prompt):
+            prompts.append(prompt)
+            return SimpleNamespace(text="Answer")
+
+    def fetch(ids):
+        return [Document(id=i, page_content=f"{i} text " * (50 if i == "939.50" else 1),
+                         metadata={"source": "ch939.pdf"}) for i in ids]
+
+    def fake_search(store, query):
+        return [Document(id="940.01", page_content="940.01 First-degree intentional homicide.",
+                         metadata={"source": "ch940.pdf"})]
+
+    rag_pipeline(store=SimpleNamespace(name="fake", fetch=fetch), search=fake_search, model=FakeModel)
+    monkeypatch.setattr(rag, "CROSS_REF_GRAPH_PATH", tmp_path / "graph.npz")
+    monkeypatch.setattr(rag, "_cross_ref_graph", None)
+    monkeypatch.setattr(rag.settings, "cross_ref_max_chars", 100)
+
+    result = asyncio.run(rag.chat("what is first-degree homicide?"))
+
+    assert [s["text"].split()[0] for s in result["sources"]] == ["940.01", "939.44"]
+    assert result["sources"][1]["metadata"]["is_cross_reference"] is True
+    # 939.50 is referenced too, but does not fit the remaining character budget
+    assert "939.44 text" in prompts[0] and "939.50 text" not in prompts[0]
@@ -1,6 +1,6 @@
 "use client"
 
-import { useState, useCallback, useEffect } from "react"
+import { useState, useCallback, useEffect, useRef } from "react"
 import { flushSync } from "react-dom"
 import { streamChatMessage } from "@/lib/api"
 import { autoSaveConversation } from "@/lib/conversation-storage"
@@ -23,6 +23,8 @@ export function useChat() {
   const [messages, setMessages] = useState<Message[]>([])
   const [isLoading, setIsLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
+  // Server-side session; sent back so follow-ups can reuse its context
+  const sessionIdRef = useRef<string | null>(null)
 
   // Auto-save conversation whenever messages change
   useEffect(() => {
@@ -70,7 +72,11 @@ export function useChat() {
       let confidence: ConfidenceLevel = "medium"
       let isSensitive = false
 
-      for await (const event of streamChatMessage({ query, history })) {
+      for await (const event of streamChatMessage({
+        query,
+        history,
+        session_id: sessionIdRef.current ?? undefined,
+      })) {
         switch (event.type) {
           case "sources":
             sources = event.data
@@ -84,6 +90,9 @@ export function useChat() {
           case "metadata":
             confidence = event.data.confidence
             isSensitive = event.data.is_sensitive
+            if (event.data.session_id) {
+              sessionIdRef.current = event.data.session_id
+            }
             setMessages((prev) =>
               prev.map((m) =>
                 m.id === assistantId
@@ -143,6 +152,7 @@ export function useChat() {
   const clearMessages = useCallback(() => {
     setMessages([])
     setError(null)
+    sessionIdRef.current = null
     // Create new conversation ID for next conversation
     if (typeof window !== "undefined") {
       const newId = `conv_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`
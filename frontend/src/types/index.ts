@@ -13,6 +13,7 @@ export interface ChatMessage {
 export interface ChatRequest {
   query: string
   history: ChatMessage[]
+  session_id?: string
 }
 
 export interface CrossReference {
@@ -58,6 +59,7 @@ export interface ChatResponse {
   confidence: ConfidenceLevel
   is_sensitive: boolean
   disclaimer: string
+  session_id?: string
 }
 
 // Search Types
@@ -110,6 +112,7 @@ export interface SSEMetadataEvent {
   data: {
     confidence: ConfidenceLevel
     is_sensitive: boolean
+    session_id?: string
   }
 }
 